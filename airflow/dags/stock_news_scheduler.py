@@ -17,56 +17,73 @@ default_args = {
 dag = DAG(
     'stock_news_scheduler',
     default_args=default_args,
-    description='Schedule news crawling and financial data fetching every 4 hours',
+    description='Schedule financial data fetching every 4 hours',
     schedule_interval=timedelta(hours=4),
     catchup=False,
     max_active_runs=1,
     tags=['stock-news', 'scheduler'],
 )
 
-# News Service Scheduler Task
-news_scheduler_task = KubernetesPodOperator(
-    task_id='news_service_scheduler',
-    name='news-scheduler-pod',
-    namespace='stock-news',
-    image='news-service:latest',
-    cmds=["python"],
-    arguments=["scheduler_script.py"],
-    env_vars={
-        'NEWS_DATABASE_URL': os.getenv('NEWS_DATABASE_URL'),
-        'GOOGLE_API_KEY': os.getenv('GOOGLE_API_KEY'),
-        'RABBITMQ_URL': os.getenv('RABBITMQ_URL'),
-    },
-    secrets=[
-        k8s.V1Secret(
-            deploy_type='env',
-            deploy_target='NEWS_DATABASE_URL',
-            secret='db-secrets',
-            key='news-db-url',
-        ),
-        k8s.V1Secret(
-            deploy_type='env',
-            deploy_target='GOOGLE_API_KEY',
-            secret='api-secrets',
-            key='gemini-api-key',
-        ),
-        k8s.V1Secret(
-            deploy_type='env',
-            deploy_target='RABBITMQ_URL',
-            secret='queue-secrets',
-            key='rabbitmq-url',
-        ),
-    ],
-    resources={
-        'request_memory': '512Mi',
-        'request_cpu': '0.5',
-        'limit_memory': '1Gi',
-        'limit_cpu': '1.0',
-    },
-    is_delete_operator_pod=True,
-    dag=dag,
+# News crawl chạy dày hơn: mỗi lần chỉ crawl các nguồn đã đến hạn theo
+# tần suất thích ứng (next_crawl_at), nên tổng số request không tăng theo
+news_dag = DAG(
+    'news_crawl_scheduler',
+    default_args=default_args,
+    description='Crawl news sources that are due according to their adaptive crawl frequency',
+    schedule_interval=timedelta(minutes=int(os.getenv('NEWS_CRAWL_TICK_MINUTES', '5'))),
+    catchup=False,
+    max_active_runs=1,
+    tags=['stock-news', 'scheduler'],
 )
 
+# News Service Scheduler Tasks - mỗi pod claim các lô nguồn rời nhau bằng lease
+# trong Postgres, nên thêm pod là tăng năng lực crawl của một chu kỳ
+NEWS_CRAWL_WORKERS = int(os.getenv('NEWS_CRAWL_WORKERS', '2'))
+news_scheduler_tasks = []
+for shard in range(NEWS_CRAWL_WORKERS):
+    news_scheduler_tasks.append(KubernetesPodOperator(
+        task_id=f'news_service_scheduler_{shard}',
+        name=f'news-scheduler-pod-{shard}',
+        namespace='stock-news',
+        image='news-service:latest',
+        cmds=["python"],
+        arguments=["scheduler_script.py"],
+        env_vars={
+            'NEWS_DATABASE_URL': os.getenv('NEWS_DATABASE_URL'),
+            'GOOGLE_API_KEY': os.getenv('GOOGLE_API_KEY'),
+            'RABBITMQ_URL': os.getenv('RABBITMQ_URL'),
+            'CRAWL_DUE_ONLY': 'true',
+        },
+        secrets=[
+            k8s.V1Secret(
+                deploy_type='env',
+                deploy_target='NEWS_DATABASE_URL',
+                secret='db-secrets',
+                key='news-db-url',
+            ),
+            k8s.V1Secret(
+                deploy_type='env',
+                deploy_target='GOOGLE_API_KEY',
+                secret='api-secrets',
+                key='gemini-api-key',
+            ),
+            k8s.V1Secret(
+                deploy_type='env',
+                deploy_target='RABBITMQ_URL',
+                secret='queue-secrets',
+                key='rabbitmq-url',
+            ),
+        ],
+        resources={
+            'request_memory': '512Mi',
+            'request_cpu': '0.5',
+            'limit_memory': '1Gi',
+            'limit_cpu': '1.0',
+        },
+        is_delete_operator_pod=True,
+        dag=news_dag,
+    ))
+
 # Company Service Scheduler Task
 company_scheduler_task = KubernetesPodOperator(
     task_id='company_service_scheduler',
@@ -103,6 +120,6 @@ company_scheduler_task = KubernetesPodOperator(
     dag=dag,
 )
 
-# Set task dependencies - có thể chạy parallel
-news_scheduler_task
+# News và company chạy ở hai DAG độc lập với lịch riêng
+news_scheduler_tasks
 company_scheduler_task
@@ -0,0 +1,51 @@
+import os
+import sys
+import asyncio
+from datetime import datetime
+from app.services.analysis_worker import analysis_worker_pool
+from app.services.event_publisher import event_publisher
+from app.services.outbox_relay import outbox_relay
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "true": xử lý hết bài pending rồi thoát (chạy như job), "false": chạy liên tục như deployment
+ANALYSIS_RUN_ONCE = os.getenv("ANALYSIS_RUN_ONCE", "false").lower() == "true"
+
+async def run_analysis_workers(run_once: bool = ANALYSIS_RUN_ONCE):
+    """Chạy pool phân tích AI tách khỏi API và scheduler crawl"""
+    logger.info(f"\n🕐 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Bắt đầu analysis worker...")
+    try:
+        await event_publisher.connect()
+    except Exception as e:
+        logger.info(f"⚠️ Failed to connect to RabbitMQ: {e}")
+
+    try:
+        if run_once:
+            stats = await analysis_worker_pool.run_until_empty()
+            logger.info(f"✅ Đã xử lý hết bài chờ phân tích: {stats}")
+            logger.info(f"📮 Outbox: {await outbox_relay.drain()}")
+            return stats
+
+        await analysis_worker_pool.start()
+        await outbox_relay.start()
+        while True:
+            await asyncio.sleep(60)
+            logger.info(f"📊 Analysis worker: {analysis_worker_pool.stats()}")
+            logger.info(f"📮 Outbox relay: {outbox_relay.stats()}")
+    finally:
+        await analysis_worker_pool.stop()
+        await outbox_relay.stop()
+        await event_publisher.close()
+
+def main():
+    """Main function"""
+    logger.info("🚀 News Service Analysis Worker")
+    logger.info("=" * 60)
+    
+    asyncio.run(run_analysis_workers(run_once="--once" in sys.argv or ANALYSIS_RUN_ONCE))
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from app.models import ai_analysis_model as models
 from app.schemas import ai_analysis_schema as schemas
 from app.models.article_model import Article  
 from sqlalchemy.orm import Session, contains_eager
+from app.crud.pagination import paginate_keyset
 
 def create_ai_analysis(db: Session, analysis: schemas.AIAnalysisCreate) -> models.ArticleAIAnalysis:
     """Tạo AI analysis mới"""
@@ -26,24 +27,30 @@ def get_articles_with_ai_analysis(db: Session, skip: int = 0, limit: int = 20) -
         Article.id == models.ArticleAIAnalysis.article_id
     ).offset(skip).limit(limit).all()
 
-def get_articles_by_category(db: Session, category: str) -> List[Article]:
-    """Lấy articles theo category AI và tải kèm analysis"""
-    return db.query(Article).join(
+def get_articles_by_category(
+    db: Session, category: str, cursor: Optional[str] = None, limit: int = 50
+) -> Tuple[List[Article], Optional[str]]:
+    """Lấy một trang articles theo category AI (mới nhất trước) và tải kèm analysis"""
+    query = db.query(Article).join(
         Article.ai_analysis
     ).options(
         # ✅ SỬA: Tải kèm ai_analysis để có trong response
         contains_eager(Article.ai_analysis) 
     ).filter(
         models.ArticleAIAnalysis.category == category
-    ).all()
+    )
+    return paginate_keyset(query, Article.created_at, Article.id, cursor, limit)
 
-def get_high_impact_articles(db: Session, min_impact: float = 0.7) -> List[Article]:
-    """Lấy articles có impact cao và tải kèm analysis"""
-    return db.query(Article).join(
+def get_high_impact_articles(
+    db: Session, min_impact: float = 0.7, cursor: Optional[str] = None, limit: int = 50
+) -> Tuple[List[Article], Optional[str]]:
+    """Lấy một trang articles có impact cao (mới nhất trước) và tải kèm analysis"""
+    query = db.query(Article).join(
         Article.ai_analysis
     ).options(
         # ✅ SỬA: Tải kèm ai_analysis để có trong response
         contains_eager(Article.ai_analysis)
     ).filter(
         models.ArticleAIAnalysis.impact_score >= min_impact
-    ).all()
\ No newline at end of file
+    )
+    return paginate_keyset(query, Article.created_at, Article.id, cursor, limit)
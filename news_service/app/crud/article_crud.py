@@ -1,155 +1,642 @@
 from datetime import datetime
+from sqlalchemy import and_, column, func, insert, literal_column, or_, table, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 import hashlib
 import json
+import os
+import sqlite3
 
 from app.models import article_model as models
 from app.schemas import article_schema as schemas
 from app.models import ai_analysis_model
-from app.crud import ai_analysis_crud  
+from app.crud import ai_analysis_crud, event_outbox_crud
+from app.crud.pagination import clamp_limit, paginate_keyset
 from app.services import gemini_service
-from app.services.event_publisher import event_publisher
+from app.services.event_publisher import ARTICLE_EVENTS_EXCHANGE, ARTICLE_CREATED_ROUTING_KEY
+from app.services.outbox_relay import outbox_relay
+from app.services.url_canonicalizer import canonicalize_url
+from app.services.date_parser import parse_vietnamese_datetime
+from app.services.search_index import (
+    SEARCH_FTS_TABLE, SEARCH_TS_CONFIG, SEARCH_VECTOR_COLUMN,
+    build_search_text, fts5_match_query, query_terms, websearch_query
+)
+from app.services.seen_filter import seen_filter, SEEN_FILTER_ENABLED
+from app.services.near_duplicate import (
+    near_duplicate_index, NEAR_DUP_ENABLED, estimate_similarity, title_numbers
+)
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Thời điểm publish event article_created:
+# "after_analysis" (mặc định) - sau khi analysis worker xong, kèm ai_analysis
+# "on_create" - ngay khi lưu bài, không chờ phân tích AI
+ANALYSIS_PUBLISH_MODE = os.getenv("ANALYSIS_PUBLISH_MODE", "after_analysis")
+
+def compute_content_hash(title: Optional[str], summary: Optional[str]) -> str:
+    """MD5 của tiêu đề + tóm tắt, dùng để phát hiện bài trùng nội dung"""
+    content_to_hash = (title or "") + (summary or "")
+    return hashlib.md5(content_to_hash.encode('utf-8')).hexdigest()
+
+def parse_published_at(published_date_str: Optional[str], reference: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Giá trị published_at / published_at_status cho một bài.
+    reference là thời điểm thu thập (UTC) cho các chuỗi tương đối như "2 giờ trước".
+    Chuỗi không đọc được chỉ được đánh dấu failed, không làm hỏng việc lưu bài.
+    """
+    if not published_date_str or not published_date_str.strip():
+        return {"published_at": None, "published_at_status": models.PUBLISHED_AT_MISSING}
+    published_at = parse_vietnamese_datetime(published_date_str, reference)
+    if published_at is None:
+        logger.debug(f"⚠️ Không đọc được ngày đăng: {published_date_str!r}")
+        return {"published_at": None, "published_at_status": models.PUBLISHED_AT_FAILED}
+    return {"published_at": published_at, "published_at_status": models.PUBLISHED_AT_PARSED}
+
+def _filter_existing(db: Session, kind: str, column, keys: Set[str]) -> Set[str]:
+    """Chỉ hỏi DB cho các key mà seen filter báo "có thể đã có" """
+    if not keys:
+        return set()
+    if not SEEN_FILTER_ENABLED:
+        return {row[0] for row in db.query(column).filter(column.in_(keys)).all()}
+
+    seen_filter.ensure_fresh(db)
+    known, maybe = seen_filter.split(kind, keys)
+    if maybe:
+        found = {row[0] for row in db.query(column).filter(column.in_(maybe)).all()}
+        seen_filter.confirm(kind, maybe, found)
+        known |= found
+    return known
+
+def get_existing_urls(db: Session, urls: Iterable[str]) -> Set[str]:
+    """
+    Kiểm tra nhiều URL trong một truy vấn IN trên canonical_url,
+    trả về các URL đầu vào (dạng gốc) mà bài tương ứng đã có trong DB.
+    """
+    canonical_by_url = {u: canonicalize_url(u) for u in urls if u}
+    known = _filter_existing(db, "url", models.Article.canonical_url, set(canonical_by_url.values()))
+    return {u for u, canonical_url in canonical_by_url.items() if canonical_url in known}
+
+def get_existing_content_hashes(db: Session, content_hashes: Iterable[str]) -> Set[str]:
+    """Kiểm tra nhiều content hash trong một truy vấn IN"""
+    return _filter_existing(db, "hash", models.Article.content_hash, {h for h in content_hashes if h})
+
+def _link_near_duplicates(db: Session, new_articles: List[tuple]) -> Tuple[Dict[int, tuple], List[tuple]]:
+    """
+    Tìm bài gốc cho các article vừa chèn (id, title, summary) theo thứ tự chèn
+    (trong chỉ mục hoặc trong chính lô này); bài gần trùng được trỏ về bài gốc.
+    Không commit và không sửa chỉ mục: caller commit cùng transaction chèn bài rồi mới
+    gọi _index_originals, để transaction bị rollback không để lại id không tồn tại trong chỉ mục.
+    Trả về ({article_id: (canonical_id, similarity)}, các bài gốc mới để thêm vào chỉ mục).
+    """
+    if not NEAR_DUP_ENABLED or not new_articles:
+        return {}, []
+    matches = {}
+    originals = []
+    for article_id, title, summary in new_articles:
+        signature = near_duplicate_index.signature_for(title, summary)
+        numbers = title_numbers(title)
+        match = near_duplicate_index.find(signature, exclude_id=article_id, numbers=numbers)
+        for original_id, original_signature, original_numbers in originals:
+            if original_numbers != numbers:
+                continue
+            similarity = estimate_similarity(signature, original_signature)
+            if similarity >= near_duplicate_index.threshold and (match is None or similarity > match[1]):
+                match = (original_id, similarity)
+        if match:
+            matches[article_id] = match
+            logger.info(f"🔗 Bài gần trùng: {title[:50]}... -> article #{match[0]} ({match[1]:.2f})")
+        else:
+            originals.append((article_id, signature, numbers))
+    if matches:
+        db.execute(update(models.Article), [
+            {
+                "id": article_id,
+                "canonical_article_id": canonical_id,
+                "duplicate_similarity": similarity,
+                "analysis_status": models.ANALYSIS_SKIPPED,
+            }
+            for article_id, (canonical_id, similarity) in matches.items()
+        ])
+    return matches, originals
+
+def _index_originals(originals: List[tuple]):
+    """Thêm các bài gốc đã commit vào chỉ mục gần trùng"""
+    for article_id, signature, numbers in originals:
+        near_duplicate_index.add(article_id, signature, numbers=numbers)
+
 def get_article_by_url(db: Session, url: str) -> Optional[models.Article]:
-    """Lấy article theo URL"""
-    return db.query(models.Article).filter(models.Article.url == url).first()
+    """Lấy article theo URL (so theo canonical_url, sau đó url gốc cho bài cũ chưa backfill)"""
+    db_article = db.query(models.Article)\
+                   .filter(models.Article.canonical_url == canonicalize_url(url))\
+                   .first()
+    if db_article is None:
+        db_article = db.query(models.Article).filter(models.Article.url == url).first()
+    return db_article
 
 def get_article_by_content_hash(db: Session, content_hash: str) -> Optional[models.Article]:
     """Lấy article theo content hash"""
     return db.query(models.Article).filter(models.Article.content_hash == content_hash).first()
 
 async def create_article(db: Session, article: schemas.ArticleCreate) -> models.Article:
-    """Tạo article mới và publish event"""
+    """
+    Tạo article mới ở trạng thái chờ phân tích (analysis worker sẽ phân tích AI và publish event).
+    Kiểm tra trùng và chèn trong một câu lệnh (ON CONFLICT DO NOTHING), an toàn khi nhiều crawler chạy song song.
+    """
     
     # Tính content hash
-    content_to_hash = (article.title or "") + (article.summary or "")
-    content_hash = hashlib.md5(content_to_hash.encode('utf-8')).hexdigest()
+    content_hash = compute_content_hash(article.title, article.summary)
     
-    # Kiểm tra trùng lặp
-    existing_article_by_url = get_article_by_url(db, url=article.url)
-    if existing_article_by_url:
-        logger.info(f"📄 Article đã tồn tại (URL): {article.title[:50]}...")
-        return existing_article_by_url
+    # Nạp chỉ mục gần trùng trước khi chèn để bài mới không tự khớp với chính nó
+    if NEAR_DUP_ENABLED:
+        near_duplicate_index.ensure_loaded(db)
+    
+    # Tạo article mới, bỏ qua nếu URL hoặc nội dung đã có
+    now = datetime.utcnow()
+    article_dict = article.dict()
+    article_dict.update(
+        canonical_url=canonicalize_url(article.url),
+        search_text=build_search_text(article.title, article.summary),
+        content_hash=content_hash, created_at=now, updated_at=now,
+        analysis_status=models.ANALYSIS_PENDING, analysis_attempts=0,
+        **parse_published_at(article.published_date_str, now)
+    )
+    inserted = _insert_new_articles(db, [article_dict])
     
-    existing_article_by_hash = get_article_by_content_hash(db, content_hash=content_hash)
-    if existing_article_by_hash:
+    if not inserted:
+        db.rollback()
+        existing_article_by_url = get_article_by_url(db, url=article.url)
+        if existing_article_by_url:
+            logger.info(f"📄 Article đã tồn tại (URL): {article.title[:50]}...")
+            return existing_article_by_url
+        
+        existing_article_by_hash = get_article_by_content_hash(db, content_hash=content_hash)
         logger.info(f"📄 Article đã tồn tại (Content): {article.title[:50]}...")
         return existing_article_by_hash
     
-    # Tạo article mới
-    article_dict = article.dict()
-    article_dict['content_hash'] = content_hash
+    db_article = db.get(models.Article, inserted[0][0])
     
-    db_article = models.Article(**article_dict)
-    db.add(db_article)
+    # Tin đã có ở nguồn khác: chỉ liên kết về bài gốc, không phân tích AI / gửi alert lại
+    near_duplicates, originals = _link_near_duplicates(db, [(db_article.id, db_article.title, db_article.summary)])
+    queued = 0 if near_duplicates else enqueue_new_article_events(db, [db_article])
+    
+    # Bài, liên kết gần trùng và event outbox cùng một transaction
     db.commit()
     db.refresh(db_article)
+    _index_originals(originals)
+    if SEEN_FILTER_ENABLED:
+        seen_filter.add(db_article.canonical_url, content_hash)
+    if queued:
+        outbox_relay.notify()
     
     logger.info(f"✅ Tạo article mới: {article.title[:50]}...")
+    return db_article
+
+def analyze_and_store(db: Session, db_article: models.Article) -> Dict[str, Any]:
+    """
+    Phân tích bài viết bằng Gemini (đồng bộ) và ghi ai_analysis (flush, chưa commit:
+    complete_analysis commit cùng trạng thái và event outbox).
+    Trả về dữ liệu AI cho event; raise nếu Gemini không trả về kết quả nào để worker thử lại.
+    """
+    logger.info(f"🤖 Đang phân tích bài viết bằng Gemini...")
     
-    # **PHÂN TÍCH AI VỚI GEMINI**
-    ai_analysis_data = None
-    try:
-        logger.info(f"🤖 Đang phân tích bài viết bằng Gemini...")
-        
-        # 1. Tóm tắt
-        ai_summary = gemini_service.summarize_article_with_gemini(
-            title=db_article.title,
-            content=db_article.summary or ""
-        )
+    # Tóm tắt + phân tích toàn diện trong một lần gọi
+    full_analysis = gemini_service.analyze_article_unified(
+        title=db_article.title, content=db_article.summary or ""
+    )
+    return store_ai_analysis(db, db_article, full_analysis)
 
-        # 2. Phân tích toàn diện
-        full_analysis = gemini_service.analyze_article_with_gemini(
-            title=db_article.title,
-            content=db_article.summary or ""
-        )
+def store_ai_analysis(
+    db: Session, db_article: models.Article, full_analysis: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Ghi ai_analysis từ kết quả analyze_article_unified (hoặc một phần tử của analyze_articles_unified),
+    flush chưa commit. Trả về dữ liệu AI cho event; raise nếu không có kết quả để worker thử lại.
+    """
+    content = db_article.summary or ""
+    if full_analysis:
+        full_analysis = dict(full_analysis)
+        ai_summary = full_analysis.pop("summary") or None
+    elif len(content.strip()) < gemini_service.GEMINI_MIN_ANALYSIS_CHARS:
+        # Nội dung quá ngắn để phân tích: dùng luôn làm tóm tắt
+        ai_summary = content.strip() or None
+    else:
+        ai_summary = None
 
-        #Tạo rỗng data trước
+    if not ai_summary and not full_analysis:
+        raise RuntimeError("Gemini không trả về kết quả phân tích")
+
+    #Tạo rỗng data trước
+    db_ai_analysis = ai_analysis_model.ArticleAIAnalysis(
+            article_id=db_article.id,
+            summary="",                 # Chuỗi rỗng thay vì None
+            category="Không rõ",                   # Không có phân loại
+            sentiment_score=0.0,           # Mặc định trung lập
+            impact_score=0.0,              # Mặc định 0
+            keywords_extracted="[]",       # JSON rỗng
+            analysis_metadata="{}"         # Metadata rỗng
+        )
+    
+    if ai_summary:
         db_ai_analysis = ai_analysis_model.ArticleAIAnalysis(
-                article_id=db_article.id,
-                summary="",                 # Chuỗi rỗng thay vì None
-                category="Không rõ",                   # Không có phân loại
-                sentiment_score=0.0,           # Mặc định trung lập
-                impact_score=0.0,              # Mặc định 0
-                keywords_extracted="[]",       # JSON rỗng
-                analysis_metadata="{}"         # Metadata rỗng
-            )
-        
-        if ai_summary:
-            db_ai_analysis = ai_analysis_model.ArticleAIAnalysis(
-                article_id=db_article.id,
-                summary=ai_summary or "",  # Nếu None thì rỗng
-            )
-
-        if full_analysis:
-            db_ai_analysis.category = full_analysis.get("category", "")
-            sentiment_map = {"Tích cực": 1.0, "Trung tính": 0.0, "Tiêu cực": -1.0}
-            db_ai_analysis.sentiment_score = sentiment_map.get(full_analysis.get("sentiment"), 0.0)
-            impact_map = {"Cao": 1.0, "Trung bình": 0.5, "Thấp": 0.1}
-            db_ai_analysis.impact_score = impact_map.get(full_analysis.get("impact_level"), 0.0)
-            db_ai_analysis.keywords_extracted = json.dumps(full_analysis.get("key_entities", []), ensure_ascii=False)
-            db_ai_analysis.analysis_metadata = json.dumps(full_analysis, ensure_ascii=False)
-
-        # 5. Lưu AI analysis
-        db.add(db_ai_analysis)
-        db.commit()
-        db.refresh(db_ai_analysis)
-        
-        # Prepare data cho event
-        ai_analysis_data = {
-            "category": db_ai_analysis.category,
-            "sentiment_score": db_ai_analysis.sentiment_score,
-            "impact_score": db_ai_analysis.impact_score,
-            "keywords": full_analysis.get("key_entities", []) if full_analysis else [],
-            "analysis_summary": full_analysis.get("analysis_summary", "") if full_analysis else "",
-            "sentiment_text": full_analysis.get("sentiment", "") if full_analysis else "",
-            "impact_text": full_analysis.get("impact_level", "") if full_analysis else ""
-        }
-        
-        logger.info(f"✅ Đã lưu AI analysis với ID: {db_ai_analysis.id}")
-        
-    except Exception as e:
-        logger.info(f"⚠️ Lỗi khi phân tích AI: {e}")
-        ai_analysis_data = None
+            article_id=db_article.id,
+            summary=ai_summary or "",  # Nếu None thì rỗng
+        )
+
+    if full_analysis:
+        db_ai_analysis.category = full_analysis.get("category", "")
+        sentiment_map = {"Tích cực": 1.0, "Trung tính": 0.0, "Tiêu cực": -1.0}
+        db_ai_analysis.sentiment_score = sentiment_map.get(full_analysis.get("sentiment"), 0.0)
+        impact_map = {"Cao": 1.0, "Trung bình": 0.5, "Thấp": 0.1}
+        db_ai_analysis.impact_score = impact_map.get(full_analysis.get("impact_level"), 0.0)
+        db_ai_analysis.keywords_extracted = json.dumps(full_analysis.get("key_entities", []), ensure_ascii=False)
+        db_ai_analysis.analysis_metadata = json.dumps(full_analysis, ensure_ascii=False)
+
+    # Lần thử trước có thể đã lưu dở (worker bị dừng giữa chừng)
+    existing = ai_analysis_crud.get_ai_analysis_by_article_id(db, db_article.id)
+    if existing is not None:
+        db.delete(existing)
+        db.flush()
+
+    # 5. Lưu AI analysis, đưa tóm tắt AI vào chỉ mục tìm kiếm
+    db.add(db_ai_analysis)
+    db_article.search_text = build_search_text(db_article.title, db_article.summary, db_ai_analysis.summary)
+    db.flush()
     
-    # **PUBLISH EVENT THAY VÌ DIRECT CALL**
-    try:
-        event_data = {
-            "event_type": "article_created",
-            "article_id": db_article.id,
-            "title": db_article.title,
-            "url": db_article.url,
-            "summary": db_article.summary,
-            "source_url": db_article.source_url,
-            "created_at": db_article.created_at.isoformat(),
-            "ai_analysis": ai_analysis_data,
-            "timestamp": datetime.now().isoformat(),
-            "service_name": "news_service"
-        }
-        
-        # Publish event async
-        await event_publisher.publish_article_created(event_data)
-        logger.info(f"📤 Đã publish event cho article: {db_article.title[:50]}...")
-        
-    except Exception as e:
-        logger.info(f"⚠️ Lỗi khi publish event: {e}")
-        # Vẫn return article dù publish event thất bại
+    logger.info(f"✅ Đã lưu AI analysis với ID: {db_ai_analysis.id}")
     
-    return db_article
+    # Prepare data cho event
+    return {
+        "category": db_ai_analysis.category,
+        "sentiment_score": db_ai_analysis.sentiment_score,
+        "impact_score": db_ai_analysis.impact_score,
+        "keywords": full_analysis.get("key_entities", []) if full_analysis else [],
+        "analysis_summary": full_analysis.get("analysis_summary", "") if full_analysis else "",
+        "sentiment_text": full_analysis.get("sentiment", "") if full_analysis else "",
+        "impact_text": full_analysis.get("impact_level", "") if full_analysis else ""
+    }
+
+def build_article_event(db_article: models.Article, ai_analysis_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "event_type": "article_created",
+        "article_id": db_article.id,
+        "title": db_article.title,
+        "url": db_article.url,
+        "summary": db_article.summary,
+        "source_url": db_article.source_url,
+        "created_at": db_article.created_at.isoformat(),
+        "ai_analysis": ai_analysis_data,
+        "analysis_status": db_article.analysis_status,
+        "timestamp": datetime.now().isoformat(),
+        "service_name": "news_service"
+    }
+
+def enqueue_article_event(db: Session, db_article: models.Article, ai_analysis_data: Optional[Dict[str, Any]] = None):
+    """Ghi event article_created vào outbox (không commit), outbox relay sẽ gửi sang RabbitMQ"""
+    event_outbox_crud.add_event(
+        db,
+        event_type="article_created",
+        exchange=ARTICLE_EVENTS_EXCHANGE,
+        routing_key=ARTICLE_CREATED_ROUTING_KEY,
+        payload=build_article_event(db_article, ai_analysis_data),
+        aggregate_id=db_article.id
+    )
+
+def enqueue_new_article_events(db: Session, db_articles: List[models.Article]) -> int:
+    """
+    Bài vừa lưu ở trạng thái pending, analysis worker sẽ phân tích và ghi event.
+    Với ANALYSIS_PUBLISH_MODE=on_create, event được ghi outbox ngay (chưa có ai_analysis).
+    Trả về số event đã ghi.
+    """
+    if ANALYSIS_PUBLISH_MODE != "on_create":
+        return 0
+    for db_article in db_articles:
+        enqueue_article_event(db, db_article)
+    return len(db_articles)
+
+def claim_pending_articles(db: Session, limit: int, stale_before: datetime,
+                           retry_before: Optional[datetime] = None) -> List[int]:
+    """
+    Nhận một lô article cần phân tích (pending, hoặc processing quá hạn do worker chết).
+    Bài đã lỗi trước đó chỉ được nhận lại khi lần thử cuối cũ hơn retry_before,
+    bài bị hoãn do Gemini hết quota (defer_analysis) chỉ sau analysis_retry_at.
+    FOR UPDATE SKIP LOCKED để nhiều worker/pod không nhận trùng.
+    """
+    now = datetime.utcnow()
+    retry_before = retry_before or now
+    articles = db.query(models.Article)\
+                 .filter(or_(
+                     and_(
+                         models.Article.analysis_status == models.ANALYSIS_PENDING,
+                         or_(
+                             models.Article.analysis_retry_at <= now,
+                             and_(
+                                 models.Article.analysis_retry_at.is_(None),
+                                 or_(
+                                     models.Article.analysis_updated_at.is_(None),
+                                     models.Article.analysis_updated_at < retry_before
+                                 )
+                             )
+                         )
+                     ),
+                     and_(
+                         models.Article.analysis_status == models.ANALYSIS_PROCESSING,
+                         models.Article.analysis_updated_at < stale_before
+                     )
+                 ))\
+                 .order_by(models.Article.id)\
+                 .limit(limit)\
+                 .with_for_update(skip_locked=True)\
+                 .all()
+    for db_article in articles:
+        db_article.analysis_status = models.ANALYSIS_PROCESSING
+        db_article.analysis_attempts = (db_article.analysis_attempts or 0) + 1
+        db_article.analysis_updated_at = now
+    article_ids = [a.id for a in articles]
+    db.commit()
+    return article_ids
+
+def complete_analysis(
+    db: Session,
+    db_article: models.Article,
+    status: str,
+    error: Optional[str] = None,
+    ai_analysis_data: Optional[Dict[str, Any]] = None
+) -> bool:
+    """
+    Ghi trạng thái phân tích và (khi đã xong/failed) event article_created vào outbox,
+    commit cùng ai_analysis đã flush trong một transaction.
+    Trả về True nếu có event được ghi.
+    """
+    db_article.analysis_status = status
+    db_article.analysis_error = error
+    db_article.analysis_updated_at = datetime.utcnow()
+    db_article.analysis_retry_at = None
+    
+    # Bài failed vẫn được publish (không kèm ai_analysis) để không mất thông báo
+    queued = status != models.ANALYSIS_PENDING and ANALYSIS_PUBLISH_MODE != "on_create"
+    if queued:
+        enqueue_article_event(db, db_article, ai_analysis_data)
+    db.commit()
+    return queued
+
+def defer_analysis(db: Session, db_article: models.Article, error: str, retry_at: datetime):
+    """
+    Trả bài về hàng đợi khi Gemini hết quota / tạm thời không dùng được: không tính là một lần thử
+    (hoàn lại lượt claim_pending_articles đã cộng), chỉ được nhận lại sau retry_at.
+    """
+    db_article.analysis_status = models.ANALYSIS_PENDING
+    db_article.analysis_attempts = max(0, (db_article.analysis_attempts or 0) - 1)
+    db_article.analysis_error = error
+    db_article.analysis_updated_at = datetime.utcnow()
+    db_article.analysis_retry_at = retry_at
+    db.commit()
+
+def count_articles_by_analysis_status(db: Session) -> Dict[str, int]:
+    rows = db.query(models.Article.analysis_status, func.count(models.Article.id))\
+             .group_by(models.Article.analysis_status)\
+             .all()
+    return {status or "legacy": count for status, count in rows}
+
+def _on_conflict_insert(db: Session):
+    """
+    Hàm insert() có ON CONFLICT của dialect đang dùng, None nếu không hỗ trợ.
+    SQLite cần >= 3.35 cho RETURNING.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite" and sqlite3.sqlite_version_info >= (3, 35, 0):
+        return sqlite.insert
+    return None
+
+def _insert_new_articles(db: Session, rows: List[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    INSERT nhiều dòng trong một câu lệnh, trả về (id, row) của các dòng thực sự được chèn.
+    Dòng trùng URL / content hash với DB (kể cả do tiến trình khác vừa chèn) bị bỏ qua
+    bằng ON CONFLICT DO NOTHING thay vì làm hỏng cả transaction.
+    """
+    if not rows:
+        return []
+
+    dialect_insert = _on_conflict_insert(db)
+    if dialect_insert is None:
+        # Dialect không hỗ trợ: chèn từng dòng trong savepoint, dòng trùng chỉ rollback savepoint
+        inserted = []
+        for row in rows:
+            db_article = models.Article(**row)
+            try:
+                with db.begin_nested():
+                    db.add(db_article)
+            except IntegrityError:
+                continue
+            inserted.append((db_article.id, row))
+        return inserted
+
+    result = db.execute(
+        dialect_insert(models.Article)
+            .on_conflict_do_nothing()
+            .returning(models.Article.id, models.Article.url),
+        rows
+    )
+    ids_by_url = {row.url: row.id for row in result}
+    return [(ids_by_url[row['url']], row) for row in rows if row['url'] in ids_by_url]
+
+async def create_articles_bulk(
+    db: Session,
+    articles: List[schemas.ArticleCreate],
+    check_duplicates: bool = True,
+    process: bool = True
+) -> Dict[str, Any]:
+    """
+    Tạo nhiều article trong một transaction:
+    - Lọc trùng trong lô và với DB bằng hai truy vấn IN (canonical URL, content hash)
+    - INSERT ... ON CONFLICT DO NOTHING các dòng mới bằng một câu lệnh, commit một lần
+    - Ghi event outbox cho các bài mới trong cùng transaction (process=False để caller tự xử lý)
+    check_duplicates=False khi caller đã lọc trùng với DB (vẫn lọc trùng trong lô).
+    """
+    now = datetime.utcnow()
+    rows = []
+    batch_urls = set()
+    batch_hashes = set()
+    for article in articles:
+        canonical_url = canonicalize_url(article.url)
+        content_hash = compute_content_hash(article.title, article.summary)
+        if canonical_url in batch_urls or content_hash in batch_hashes:
+            continue
+        batch_urls.add(canonical_url)
+        batch_hashes.add(content_hash)
+        row = article.dict()
+        row.update(
+            canonical_url=canonical_url,
+            search_text=build_search_text(article.title, article.summary),
+            content_hash=content_hash, created_at=now, updated_at=now,
+            analysis_status=models.ANALYSIS_PENDING, analysis_attempts=0,
+            **parse_published_at(article.published_date_str, now)
+        )
+        rows.append(row)
+    duplicates_in_batch = len(articles) - len(rows)
+
+    def _drop_existing(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        known_urls = get_existing_urls(db, (r['url'] for r in candidates))
+        known_hashes = get_existing_content_hashes(db, (r['content_hash'] for r in candidates))
+        return [
+            r for r in candidates
+            if r['url'] not in known_urls and r['content_hash'] not in known_hashes
+        ]
+
+    new_rows = _drop_existing(rows) if check_duplicates else rows
+    inserted = []
+    near_duplicates = {}
+    queued = 0
+    if new_rows:
+        if NEAR_DUP_ENABLED:
+            near_duplicate_index.ensure_loaded(db)
+        # Dòng do tiến trình khác vừa chèn (sau bước lọc) bị ON CONFLICT bỏ qua
+        inserted = _insert_new_articles(db, new_rows)
+        near_duplicates, originals = _link_near_duplicates(db, [
+            (article_id, row['title'], row['summary']) for article_id, row in inserted
+        ])
+        # Bài gần trùng không cần phân tích / publish lại
+        canonical_ids = [article_id for article_id, _ in inserted if article_id not in near_duplicates]
+        if process and canonical_ids and ANALYSIS_PUBLISH_MODE == "on_create":
+            db_articles = db.query(models.Article)\
+                            .filter(models.Article.id.in_(canonical_ids))\
+                            .order_by(models.Article.id)\
+                            .all()
+            queued = enqueue_new_article_events(db, db_articles)
+        # Bài, liên kết gần trùng và event outbox commit cùng lúc
+        db.commit()
+        _index_originals(originals)
+        if SEEN_FILTER_ENABLED:
+            for _, row in inserted:
+                seen_filter.add(row['canonical_url'], row['content_hash'])
+        if queued:
+            outbox_relay.notify()
+    article_ids = [article_id for article_id, _ in inserted]
+
+    logger.info(
+        f"✅ Bulk ingest: {len(article_ids)} article mới ({len(near_duplicates)} gần trùng), "
+        f"{len(rows) - len(article_ids)} đã tồn tại, {duplicates_in_batch} trùng trong lô"
+    )
+
+    return {
+        "created": len(article_ids),
+        "skipped_existing": len(rows) - len(article_ids),
+        "skipped_duplicates": duplicates_in_batch,
+        "near_duplicates": len(near_duplicates),
+        "article_ids": article_ids,
+    }
 
 def get_articles(db: Session, skip: int = 0, limit: int = 20) -> List[models.Article]:
-    """Lấy danh sách articles với phân trang"""
+    """Lấy danh sách articles với phân trang OFFSET (giữ cho client cũ dùng skip)"""
     return db.query(models.Article)\
-             .order_by(models.Article.created_at.desc())\
+             .order_by(models.Article.created_at.desc(), models.Article.id.desc())\
              .offset(skip)\
-             .limit(limit)\
+             .limit(clamp_limit(limit))\
              .all()
 
+def get_articles_page(
+    db: Session, cursor: Optional[str] = None, limit: int = 20
+) -> Tuple[List[models.Article], Optional[str]]:
+    """Lấy một trang articles mới nhất trước theo cursor (created_at, id), kèm cursor trang sau"""
+    return paginate_keyset(
+        db.query(models.Article), models.Article.created_at, models.Article.id, cursor, limit
+    )
+
+def get_articles_published_between(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    source_url: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> List[models.Article]:
+    """Lấy articles có published_at trong [start, end) (UTC), mới nhất trước"""
+    query = db.query(models.Article).filter(models.Article.published_at.isnot(None))
+    if start is not None:
+        query = query.filter(models.Article.published_at >= start)
+    if end is not None:
+        query = query.filter(models.Article.published_at < end)
+    if source_url:
+        query = query.filter(models.Article.source_url == source_url)
+    return query.order_by(models.Article.published_at.desc(), models.Article.id.desc())\
+                .offset(skip)\
+                .limit(clamp_limit(limit))\
+                .all()
+
+def search_articles(
+    db: Session,
+    query: str,
+    source_url: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> List[models.Article]:
+    """
+    Tìm kiếm toàn văn (không phân biệt dấu) trên tiêu đề, tóm tắt và tóm tắt AI.
+    Xếp theo độ liên quan rồi mới nhất trước; bỏ các bài gần trùng đã liên kết về bài gốc.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    articles = db.query(models.Article)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # websearch_to_tsquery hỗ trợ "cụm từ" và -loại trừ; GIN index trên search_vector
+        tsquery = func.websearch_to_tsquery(SEARCH_TS_CONFIG, websearch_query(query))
+        vector = literal_column(f"articles.{SEARCH_VECTOR_COLUMN}")
+        articles = articles.filter(vector.op("@@")(tsquery))
+        rank = func.ts_rank_cd(vector, tsquery).desc()
+    elif dialect == "sqlite":
+        match = fts5_match_query(query)
+        if not match:
+            return []
+        fts = table(SEARCH_FTS_TABLE, column("rowid"))
+        articles = articles.join(fts, fts.c.rowid == models.Article.id)\
+                           .filter(literal_column(SEARCH_FTS_TABLE).op("MATCH")(match))
+        # bm25 càng nhỏ càng liên quan
+        rank = func.bm25(literal_column(SEARCH_FTS_TABLE)).asc()
+    else:
+        for term in terms:
+            articles = articles.filter(models.Article.search_text.like(f"%{term}%"))
+        rank = None
+
+    articles = articles.filter(models.Article.canonical_article_id.is_(None))
+    if source_url:
+        articles = articles.filter(models.Article.source_url == source_url)
+    order = [models.Article.created_at.desc(), models.Article.id.desc()]
+    if rank is not None:
+        order.insert(0, rank)
+    return articles.order_by(*order)\
+                   .offset(skip)\
+                   .limit(clamp_limit(limit))\
+                   .all()
+
+def count_articles_published_by_day(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Số bài đăng theo ngày (UTC) trong [start, end)"""
+    day = func.date(models.Article.published_at)
+    query = db.query(day, func.count(models.Article.id)).filter(models.Article.published_at.isnot(None))
+    if start is not None:
+        query = query.filter(models.Article.published_at >= start)
+    if end is not None:
+        query = query.filter(models.Article.published_at < end)
+    rows = query.group_by(day).order_by(day).all()
+    return [{"date": str(d), "count": count} for d, count in rows]
+
+def count_source_articles_since(db: Session, source_url: str, since: Optional[datetime]) -> int:
+    """Đếm số article mới của một nguồn được tạo sau thời điểm `since`"""
+    query = db.query(models.Article).filter(models.Article.source_url == source_url)
+    if since is not None:
+        query = query.filter(models.Article.created_at > since)
+    return query.count()
+
 def get_articles_count(db: Session) -> int:
     """Đếm tổng số articles"""
     return db.query(models.Article).count()
@@ -158,10 +645,10 @@ def get_articles_with_ai_analysis(db: Session, skip: int = 0, limit: int = 20):
     """Lấy articles kèm AI analysis"""
     return ai_analysis_crud.get_articles_with_ai_analysis(db, skip, limit)
 
-def get_articles_by_category(db: Session, category: str):
+def get_articles_by_category(db: Session, category: str, cursor: Optional[str] = None, limit: int = 50):
     """Lấy articles theo category AI"""
-    return ai_analysis_crud.get_articles_by_category(db, category)
+    return ai_analysis_crud.get_articles_by_category(db, category, cursor, limit)
 
-def get_high_impact_articles(db: Session, min_impact: float = 0.7):
+def get_high_impact_articles(db: Session, min_impact: float = 0.7, cursor: Optional[str] = None, limit: int = 50):
     """Lấy articles có impact cao"""
-    return ai_analysis_crud.get_high_impact_articles(db, min_impact)
+    return ai_analysis_crud.get_high_impact_articles(db, min_impact, cursor, limit)
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import or_
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.models import crawl_source_model as models
 from app.schemas import crawl_source_schema as schemas
+from app.services.crawl_frequency import plan_next_crawl
 
 def create_crawl_source(db: Session, source: schemas.CrawlSourceCreate) -> models.CrawlSource:
     """Tạo nguồn crawl mới"""
@@ -31,6 +33,58 @@ def get_active_crawl_sources(db: Session) -> List[models.CrawlSource]:
     """Lấy danh sách nguồn crawl đang hoạt động"""
     return db.query(models.CrawlSource).filter(models.CrawlSource.is_active == True).all()
 
+def get_due_crawl_sources(db: Session, now: Optional[datetime] = None) -> List[models.CrawlSource]:
+    """Lấy các nguồn đang hoạt động đã đến hạn crawl (hoặc chưa từng được lên lịch)"""
+    now = now or datetime.utcnow()
+    return db.query(models.CrawlSource).filter(
+        models.CrawlSource.is_active == True,
+        or_(models.CrawlSource.next_crawl_at == None, models.CrawlSource.next_crawl_at <= now)
+    ).order_by(models.CrawlSource.next_crawl_at.asc()).all()
+
+def claim_crawl_sources(
+    db: Session,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+    cycle_started_at: datetime,
+    due_only: bool = True
+) -> List[models.CrawlSource]:
+    """
+    Claim một lô nguồn cho worker bằng lease (SELECT ... FOR UPDATE SKIP LOCKED).
+    Các worker chạy song song nhận các lô rời nhau; nguồn đã crawl trong chu kỳ này
+    (last_crawled_at >= cycle_started_at) không bị claim lại.
+    """
+    now = datetime.utcnow()
+    query = db.query(models.CrawlSource).filter(
+        models.CrawlSource.is_active == True,
+        or_(models.CrawlSource.lease_expires_at == None, models.CrawlSource.lease_expires_at <= now),
+        or_(models.CrawlSource.last_crawled_at == None, models.CrawlSource.last_crawled_at < cycle_started_at)
+    )
+    if due_only:
+        query = query.filter(
+            or_(models.CrawlSource.next_crawl_at == None, models.CrawlSource.next_crawl_at <= now)
+        )
+    
+    sources = query.order_by(
+        models.CrawlSource.next_crawl_at.asc(), models.CrawlSource.id.asc()
+    ).limit(limit).with_for_update(skip_locked=True).all()
+    
+    lease_expires_at = now + timedelta(seconds=lease_seconds)
+    for db_source in sources:
+        db_source.claimed_by = worker_id
+        db_source.lease_expires_at = lease_expires_at
+    db.commit()
+    return sources
+
+def release_crawl_source(db: Session, source_id: int, worker_id: str) -> bool:
+    """Nhả lease nếu worker vẫn đang giữ nguồn"""
+    released = db.query(models.CrawlSource).filter(
+        models.CrawlSource.id == source_id,
+        models.CrawlSource.claimed_by == worker_id
+    ).update({"claimed_by": None, "lease_expires_at": None}, synchronize_session=False)
+    db.commit()
+    return released > 0
+
 def update_crawl_source(db: Session, source_id: int, source_update: schemas.CrawlSourceUpdate) -> Optional[models.CrawlSource]:
     """Cập nhật nguồn crawl"""
     db_source = get_crawl_source(db, source_id)
@@ -58,6 +112,71 @@ def update_crawl_source_last_crawled_at(db: Session, source_id: int, last_crawle
     db.refresh(db_source)
     return db_source
 
+def update_crawl_source_crawl_state(
+    db: Session,
+    source_id: int,
+    last_crawled_at: datetime,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    fingerprint: Optional[str] = None,
+    response_bytes: Optional[int] = None,
+    not_modified: bool = False,
+    worker_id: Optional[str] = None
+) -> Optional[models.CrawlSource]:
+    """
+    Cập nhật thời gian crawl cuối cùng với validator HTTP và fingerprint của trang.
+    Nếu `worker_id` đang giữ lease của nguồn thì nhả lease trong cùng transaction.
+    """
+    db_source = get_crawl_source(db, source_id)
+    if not db_source:
+        return None
+    
+    db_source.last_crawled_at = last_crawled_at
+    if worker_id and db_source.claimed_by == worker_id:
+        db_source.claimed_by = None
+        db_source.lease_expires_at = None
+    if not_modified:
+        # 304: giữ nguyên validator cũ, chỉ cập nhật nếu server gửi giá trị mới
+        db_source.http_etag = etag or db_source.http_etag
+        db_source.http_last_modified = last_modified or db_source.http_last_modified
+    else:
+        db_source.http_etag = etag
+        db_source.http_last_modified = last_modified
+        db_source.listing_fingerprint = fingerprint
+        db_source.last_response_bytes = response_bytes
+    db_source.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(db_source)
+    return db_source
+
+def update_crawl_source_schedule(
+    db: Session,
+    source_id: int,
+    crawled_at: datetime,
+    previous_crawled_at: Optional[datetime],
+    new_articles: int,
+    max_articles: Optional[int] = None
+) -> Optional[models.CrawlSource]:
+    """Cập nhật tốc độ đăng bài ước lượng và thời điểm crawl tiếp theo của nguồn"""
+    db_source = get_crawl_source(db, source_id)
+    if not db_source:
+        return None
+    
+    rate, interval, next_crawl_at = plan_next_crawl(
+        crawled_at=crawled_at,
+        previous_crawled_at=previous_crawled_at,
+        previous_rate=db_source.avg_new_articles_per_hour,
+        previous_interval=db_source.crawl_interval_minutes,
+        new_articles=new_articles,
+        max_articles=max_articles
+    )
+    db_source.avg_new_articles_per_hour = rate
+    db_source.crawl_interval_minutes = interval
+    db_source.next_crawl_at = next_crawl_at
+    db.commit()
+    db.refresh(db_source)
+    return db_source
+
 def delete_crawl_source(db: Session, source_id: int) -> bool:
     """Xóa nguồn crawl"""
     db_source = get_crawl_source(db, source_id)
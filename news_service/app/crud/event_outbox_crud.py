@@ -0,0 +1,74 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, update
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import json
+
+from app.models import event_outbox_model as models
+
+def add_event(
+    db: Session,
+    event_type: str,
+    exchange: str,
+    routing_key: str,
+    payload: Dict[str, Any],
+    aggregate_id: Optional[int] = None
+) -> models.EventOutbox:
+    """
+    Thêm event vào outbox, KHÔNG commit: caller commit cùng transaction với dữ liệu
+    để event chỉ tồn tại khi dữ liệu đã được lưu.
+    """
+    db_event = models.EventOutbox(
+        event_type=event_type,
+        exchange=exchange,
+        routing_key=routing_key,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload, ensure_ascii=False, default=str),
+        attempts=0
+    )
+    db.add(db_event)
+    return db_event
+
+def claim_unpublished_events(db: Session, limit: int, now: Optional[datetime] = None) -> List[models.EventOutbox]:
+    """
+    Lấy một lô event chưa gửi (đã đến hạn thử lại) theo thứ tự id.
+    FOR UPDATE SKIP LOCKED: khóa giữ đến khi caller commit nên nhiều relay không gửi trùng.
+    """
+    now = now or datetime.utcnow()
+    return db.query(models.EventOutbox)\
+             .filter(models.EventOutbox.published_at.is_(None))\
+             .filter(or_(
+                 models.EventOutbox.next_attempt_at.is_(None),
+                 models.EventOutbox.next_attempt_at <= now
+             ))\
+             .order_by(models.EventOutbox.id)\
+             .limit(limit)\
+             .with_for_update(skip_locked=True)\
+             .all()
+
+def mark_events_published(db: Session, event_ids: List[int]):
+    """Đánh dấu đã gửi (không commit)"""
+    if not event_ids:
+        return
+    now = datetime.utcnow()
+    db.execute(update(models.EventOutbox), [
+        {"id": event_id, "published_at": now} for event_id in event_ids
+    ])
+
+def mark_event_failed(db: Session, db_event: models.EventOutbox, error: str, retry_at: datetime):
+    """Ghi nhận lần gửi lỗi, event sẽ được thử lại sau retry_at (không commit)"""
+    db_event.attempts = (db_event.attempts or 0) + 1
+    db_event.last_error = error[:1000]
+    db_event.next_attempt_at = retry_at
+
+def count_unpublished_events(db: Session) -> int:
+    return db.query(models.EventOutbox).filter(models.EventOutbox.published_at.is_(None)).count()
+
+def delete_published_events(db: Session, before: datetime) -> int:
+    """Dọn các event đã gửi cũ hơn `before`"""
+    deleted = db.query(models.EventOutbox)\
+                .filter(models.EventOutbox.published_at.isnot(None))\
+                .filter(models.EventOutbox.published_at < before)\
+                .delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,87 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
+from datetime import datetime, timedelta
+
+from app.models import llm_cache_model as models
+
+# Không ghi last_hit_at cho mỗi lần hit, chỉ khi đã cũ hơn khoảng này (đủ chính xác cho LRU)
+_TOUCH_INTERVAL = timedelta(hours=1)
+
+def get_cached_response(db: Session, cache_key: str, now: Optional[datetime] = None) -> Optional[str]:
+    """JSON đã cache nếu còn hạn; chỉ ghi DB khi last_hit_at đã cũ (số hit đếm trong LLMResponseCache.counters)"""
+    now = now or datetime.utcnow()
+    entry = db.get(models.LLMResponseCache, cache_key)
+    if entry is None or entry.expires_at <= now:
+        return None
+    response = entry.response
+    if entry.last_hit_at is None or entry.last_hit_at < now - _TOUCH_INTERVAL:
+        entry.last_hit_at = now
+        db.commit()
+    return response
+
+def put_cached_response(
+    db: Session,
+    cache_key: str,
+    model_name: str,
+    operation: str,
+    response: str,
+    ttl: timedelta,
+    now: Optional[datetime] = None
+) -> None:
+    """Ghi / ghi đè một entry; tiến trình khác ghi cùng key trước thì bỏ qua"""
+    now = now or datetime.utcnow()
+    entry = db.get(models.LLMResponseCache, cache_key)
+    if entry is None:
+        entry = models.LLMResponseCache(cache_key=cache_key)
+        db.add(entry)
+    entry.model_name = model_name
+    entry.operation = operation
+    entry.response = response
+    entry.size_bytes = len(response.encode("utf-8"))
+    entry.created_at = now
+    entry.last_hit_at = now
+    entry.expires_at = now + ttl
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+def evict_cached_responses(
+    db: Session, max_entries: int, max_bytes: int, now: Optional[datetime] = None
+) -> int:
+    """Xóa entry hết hạn, rồi entry ít dùng gần đây nhất đến khi dưới giới hạn số lượng / dung lượng"""
+    now = now or datetime.utcnow()
+    deleted = db.query(models.LLMResponseCache)\
+                .filter(models.LLMResponseCache.expires_at <= now)\
+                .delete(synchronize_session=False)
+
+    count, total_bytes = db.query(
+        func.count(models.LLMResponseCache.cache_key),
+        func.coalesce(func.sum(models.LLMResponseCache.size_bytes), 0)
+    ).one()
+    if count > max_entries or total_bytes > max_bytes:
+        # Đi từ entry cũ nhất, cộng dồn đến khi phần còn lại nằm trong giới hạn
+        excess_entries = max(0, count - max_entries)
+        excess_bytes = max(0, total_bytes - max_bytes)
+        victims, freed = [], 0
+        while len(victims) < excess_entries or freed < excess_bytes:
+            rows = db.query(models.LLMResponseCache.cache_key, models.LLMResponseCache.size_bytes)\
+                     .order_by(models.LLMResponseCache.last_hit_at.asc(), models.LLMResponseCache.cache_key)\
+                     .offset(len(victims))\
+                     .limit(1000)\
+                     .all()
+            if not rows:
+                break
+            for cache_key, size_bytes in rows:
+                if len(victims) >= excess_entries and freed >= excess_bytes:
+                    break
+                victims.append(cache_key)
+                freed += size_bytes or 0
+        for start in range(0, len(victims), 1000):
+            deleted += db.query(models.LLMResponseCache)\
+                         .filter(models.LLMResponseCache.cache_key.in_(victims[start:start + 1000]))\
+                         .delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,52 @@
+import os
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import tuple_
+
+# Phân trang keyset theo (created_at, id) giảm dần: mỗi trang là một lần quét index
+# từ vị trí cursor, không phụ thuộc trang sâu bao nhiêu (khác với OFFSET)
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "200"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Cursor mờ (opaque) cho client: base64url của vị trí (created_at, id) cuối trang"""
+    raw = json.dumps({"t": created_at.isoformat(), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), int(data["i"])
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor không hợp lệ: {cursor}") from e
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def paginate_keyset(query, created_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Áp dụng ORDER BY created_at DESC, id DESC và điều kiện (created_at, id) < cursor.
+    Lấy dư một dòng để biết còn trang sau hay không.
+    Trả về (các dòng của trang, cursor trang sau hoặc None).
+    """
+    limit = clamp_limit(limit)
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_column, id_column) < tuple_(created_at, item_id))
+    rows: List = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
@@ -22,7 +23,43 @@ def get_db():
 
 def init_db():
     # Import models của service này
-    from app.models import article_model, ai_analysis_model, crawl_source_model
+    from app.models import article_model, ai_analysis_model, crawl_source_model, event_outbox_model, llm_cache_model
     Base.metadata.create_all(bind=engine)
+    sync_schema()
+    # tsvector + GIN (Postgres) / FTS5 (SQLite) trên articles.search_text
+    from app.services.search_index import ensure_search_index
+    ensure_search_index(engine)
     print("✅ Bảng của News Service đã được tạo trong news_db.")
 
+def sync_schema():
+    """
+    create_all không ALTER các bảng đã tồn tại, nên bổ sung các cột và index
+    mới được thêm vào model sau khi bảng đã được tạo.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+                print(f"✅ Đã thêm cột {table.name}.{column.name}")
+            except Exception as e:
+                print(f"⚠️ Không thể thêm cột {table.name}.{column.name}: {e}")
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                index.create(bind=engine)
+                print(f"✅ Đã tạo index {index.name}")
+            except Exception as e:
+                print(f"⚠️ Không thể tạo index {index.name}: {e}")
+
@@ -1,11 +1,12 @@
 # backend/app/api/endpoints/ai_analysis_endpoints.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.crud import ai_analysis_crud as crud
 from app.schemas import ai_analysis_schema as schemas
 from app.database import get_db
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/ai-analysis", tags=["ai-analysis"])
 
@@ -32,12 +33,38 @@ async def get_ai_analysis(article_id: int, db: Session = Depends(get_db)):
             detail=f"Error fetching AI analysis: {str(e)}"
         )
 
+def _set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
 @router.get("/category/{category}", response_model=List[schemas.ArticleWithAIResponse])
-async def get_articles_by_category(category: str, db: Session = Depends(get_db)):
-    """Lấy articles theo category"""
-    return crud.get_articles_by_category(db, category)
+async def get_articles_by_category(
+    category: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Lấy articles theo category, mới nhất trước; trang sau dùng header X-Next-Cursor"""
+    try:
+        articles, next_cursor = crud.get_articles_by_category(db, category, cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _set_next_cursor(response, next_cursor)
+    return articles
 
 @router.get("/high-impact", response_model=List[schemas.ArticleWithAIResponse])
-async def get_high_impact_articles(min_impact: float = 0.7, db: Session = Depends(get_db)):
-    """Lấy articles có impact cao"""
-    return crud.get_high_impact_articles(db, min_impact)
+async def get_high_impact_articles(
+    response: Response,
+    min_impact: float = 0.7,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Lấy articles có impact cao, mới nhất trước; trang sau dùng header X-Next-Cursor"""
+    try:
+        articles, next_cursor = crud.get_high_impact_articles(db, min_impact, cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _set_next_cursor(response, next_cursor)
+    return articles
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.crud import article_crud as crud
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, clamp_limit, encode_cursor
 from app.schemas import article_schema as schemas
 from app.database import get_db
+from app.services.date_parser import to_utc_naive
 
 # Tạo router
 router = APIRouter(prefix="/articles", tags=["articles"])
@@ -16,7 +19,7 @@ async def create_new_article(
 ):
     """Tạo article mới"""
     try:
-        db_article = crud.create_article(db=db, article=article)
+        db_article = await crud.create_article(db=db, article=article)
         return db_article
     except Exception as e:
         raise HTTPException(
@@ -24,16 +27,45 @@ async def create_new_article(
             detail=f"Lỗi khi tạo article: {str(e)}"
         )
 
+@router.post("/bulk", response_model=schemas.ArticleBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_articles_bulk(
+    payload: schemas.ArticleBulkCreate,
+    db: Session = Depends(get_db)
+):
+    """Tạo nhiều article trong một transaction, bỏ qua các bài đã tồn tại"""
+    try:
+        return await crud.create_articles_bulk(db=db, articles=payload.articles)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi tạo articles: {str(e)}"
+        )
+
 @router.get("", response_model=List[schemas.ArticleInDB])
 async def read_articles(
+    response: Response,
     skip: int = 0, 
     limit: int = 20, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Lấy danh sách articles"""
+    """
+    Lấy danh sách articles, mới nhất trước.
+    Trang sau: gửi lại giá trị header X-Next-Cursor vào `cursor` (không có header là hết dữ liệu).
+    `skip` chỉ còn để tương thích client cũ, bị bỏ qua khi có `cursor`.
+    """
     try:
-        articles = crud.get_articles(db=db, skip=skip, limit=limit)
+        if skip and not cursor:
+            articles = crud.get_articles(db=db, skip=skip, limit=limit)
+            next_cursor = encode_cursor(articles[-1].created_at, articles[-1].id) \
+                if articles and len(articles) == clamp_limit(limit) else None
+        else:
+            articles, next_cursor = crud.get_articles_page(db=db, cursor=cursor, limit=limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return articles
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -52,6 +84,70 @@ async def get_articles_count(db: Session = Depends(get_db)):
             detail=f"Lỗi khi đếm articles: {str(e)}"
         )
 
+def _published_range(start: Optional[datetime], end: Optional[datetime]):
+    """Chuẩn hóa khoảng thời gian về UTC naive như cột published_at"""
+    start, end = to_utc_naive(start), to_utc_naive(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start phải nhỏ hơn end"
+        )
+    return start, end
+
+@router.get("/published", response_model=List[schemas.ArticleInDB])
+async def read_articles_published_between(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    source_url: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db)
+):
+    """Lấy articles theo thời điểm đăng trong [start, end), mới nhất trước (không có múi giờ = UTC)"""
+    start, end = _published_range(start, end)
+    try:
+        return crud.get_articles_published_between(
+            db=db, start=start, end=end, source_url=source_url, skip=skip, limit=limit
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi lấy articles theo thời gian: {str(e)}"
+        )
+
+@router.get("/published/daily-counts")
+async def get_published_daily_counts(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Số bài đăng theo từng ngày (UTC) trong [start, end)"""
+    start, end = _published_range(start, end)
+    try:
+        return {"days": crud.count_articles_published_by_day(db=db, start=start, end=end)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi đếm articles theo ngày: {str(e)}"
+        )
+
+@router.get("/search", response_model=List[schemas.ArticleInDB])
+async def search_articles(
+    q: str = Query(..., min_length=1, max_length=200),
+    source_url: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db)
+):
+    """Tìm kiếm articles theo từ khóa (không phân biệt dấu), liên quan nhất trước"""
+    try:
+        return crud.search_articles(db=db, query=q, source_url=source_url, skip=skip, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi tìm kiếm articles: {str(e)}"
+        )
+
 @router.get("/{article_id}", response_model=schemas.ArticleInDB)
 async def read_article(article_id: int, db: Session = Depends(get_db)):
     """Lấy article theo ID"""
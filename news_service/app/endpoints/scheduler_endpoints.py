@@ -1,10 +1,13 @@
 from fastapi import APIRouter, BackgroundTasks, HTTPException
 from datetime import datetime
 import asyncio
+from app.services.crawl_engine import CrawlEngine
+from app.services.http_client import http_client
+from app.services.politeness import politeness_limiter
+from app.services.analysis_worker import analysis_worker_pool
+from app.services.outbox_relay import outbox_relay
 from app.database import SessionLocal
-from app.crud import crawl_source_crud, article_crud
-from app.services.generic_crawler import scrape_news_from_website
-from app.schemas.article_schema import ArticleCreate
+from app.crud import article_crud, event_outbox_crud
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -13,13 +16,13 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/news-scheduler", tags=["scheduler"])
 
 @router.post("/run")
-async def trigger_news_scheduler(background_tasks: BackgroundTasks):
+async def trigger_news_scheduler(background_tasks: BackgroundTasks, due_only: bool = False):
     """Manually trigger news crawling scheduler"""
     try:
         logger.info(f"🔄 Manual trigger news scheduler at {datetime.now()}")
         
         # Chạy scheduler trong background để không block request
-        background_tasks.add_task(run_news_scheduler)
+        background_tasks.add_task(run_news_scheduler, due_only)
         
         return {
             "message": "News scheduler triggered successfully",
@@ -43,70 +46,54 @@ async def get_scheduler_status():
         "endpoint": "/api/v1/scheduler/run"
     }
 
-async def run_news_scheduler():
-    """Function được gọi bởi endpoint để chạy scheduler"""
-    logger.info(f"🚀 News Service Scheduler - Manual Run")
-    logger.info("=" * 60)
-    
+@router.get("/http-stats")
+async def get_crawler_http_stats():
+    """Thống kê tái sử dụng kết nối HTTP của crawler theo host"""
+    return {
+        "service": "news_service",
+        "pool_maxsize": http_client.pool_maxsize,
+        "hosts": http_client.stats(),
+        "politeness": politeness_limiter.stats()
+    }
+
+@router.get("/analysis-stats")
+async def get_analysis_stats():
+    """Trạng thái hàng đợi phân tích AI"""
     db = SessionLocal()
-    total_articles = 0
-    
     try:
-        # Lấy danh sách nguồn crawl active
-        sources = crawl_source_crud.get_active_crawl_sources(db)
-        print(f"📊 Tìm thấy {len(sources)} nguồn đang hoạt động.")
-        logger.info(f"📊 Tìm thấy {len(sources)} nguồn đang hoạt động.")
-        
-        for source in sources:
-            try:
-                logger.info(f"🔄 Crawling: {source.name}")
-                
-                # Crawl articles từ nguồn
-                articles_data = scrape_news_from_website(
-                    page_url=source.url,
-                    article_container_selector=source.article_container_selector,
-                    title_selector=source.title_selector,
-                    link_selector=source.link_selector,
-                    summary_selector=source.summary_selector,
-                    date_selector=source.date_selector,
-                    source_name=source.name,
-                    max_articles=1
-                )
-                
-                # Lưu articles vào database
-                for article_data in articles_data:
-                    try:
-                        article_create = ArticleCreate(
-                            title=article_data['title'],
-                            url=article_data['url'],
-                            summary=article_data['summary'],
-                            published_date_str=article_data['published_date_str'],
-                            source_url=source.url
-                        )
-                        
-                        # Async create article sẽ tự động trigger AI analysis
-                        await article_crud.create_article(db, article_create)
-                        total_articles += 1
-                        
-                    except Exception as e:
-                        print(f"   ❌ Lỗi khi lưu article: {e}")
-                        continue
-                
-                # Cập nhật thời gian crawl cuối
-                crawl_source_crud.update_crawl_source_last_crawled_at(
-                    db, source.id, datetime.now()
-                )
-                
-            except Exception as e:
-                print(f"❌ Lỗi khi crawl {source.name}: {e}")
-                continue
-        
-        print(f"✅ Hoàn thành chu kỳ crawl: {total_articles} articles đã được xử lý")
-        logger.info(f"✅ Hoàn thành chu kỳ crawl: {total_articles} articles đã được xử lý")
-        
+        by_status = article_crud.count_articles_by_analysis_status(db)
+    finally:
+        db.close()
+    return {
+        "service": "news_service",
+        "articles_by_status": by_status,
+        "worker_pool": analysis_worker_pool.stats()
+    }
+
+@router.get("/outbox-stats")
+async def get_outbox_stats():
+    """Số event chờ gửi và thông lượng của outbox relay"""
+    db = SessionLocal()
+    try:
+        pending = event_outbox_crud.count_unpublished_events(db)
     finally:
         db.close()
+    return {
+        "service": "news_service",
+        "pending_events": pending,
+        "relay": outbox_relay.stats()
+    }
+
+async def run_news_scheduler(due_only: bool = False):
+    """Function được gọi bởi endpoint để chạy scheduler"""
+    logger.info(f"🚀 News Service Scheduler - Manual Run")
+    logger.info("=" * 60)
+    
+    # Crawl đồng thời nhiều nguồn, mỗi nguồn lưu bằng session riêng
+    # Dùng lease như các pod scheduler để không crawl trùng khi chạy chồng với Airflow
+    stats = await CrawlEngine().run_sharded(due_only=due_only)
+    total_articles = stats["articles_processed"]
     
     print("✅ News Service Scheduler completed!")
     logger.info("✅ News Service Scheduler completed!")
-    return {"total_articles_processed": total_articles}
+    return {"total_articles_processed": total_articles, "crawl_stats": stats}
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Index
 from datetime import datetime
 from app.database import Base
 from sqlalchemy.orm import relationship
 
 class ArticleAIAnalysis(Base):
     __tablename__ = "ai_analysis"
+    __table_args__ = (
+        # Lọc theo category / impact rồi nối sang articles để phân trang theo (created_at, id)
+        Index('ix_ai_analysis_category_article_id', 'category', 'article_id'),
+        Index('ix_ai_analysis_impact_score', 'impact_score'),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     article_id = Column(Integer, ForeignKey('articles.id'), unique=True, nullable=False)
@@ -1,18 +1,57 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index
 from datetime import datetime
 from app.database import Base
 from sqlalchemy.orm import relationship
 
+# Trạng thái phân tích AI (analysis_status), NULL là bài cũ trước khi có analysis worker
+ANALYSIS_PENDING = "pending"
+ANALYSIS_PROCESSING = "processing"
+ANALYSIS_DONE = "done"
+ANALYSIS_FAILED = "failed"
+ANALYSIS_SKIPPED = "skipped"  # Bài gần trùng, dùng phân tích của bài gốc
+
+# Kết quả đọc published_date_str thành published_at (published_at_status), NULL là chưa xử lý
+PUBLISHED_AT_PARSED = "parsed"
+PUBLISHED_AT_FAILED = "failed"  # Có chuỗi ngày nhưng không đọc được, giữ nguyên chuỗi gốc
+PUBLISHED_AT_MISSING = "missing"  # Nguồn không có ngày đăng
+
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        # Đếm bài mới theo nguồn để điều chỉnh tần suất crawl
+        Index('ix_articles_source_url_created_at', 'source_url', 'created_at'),
+        # Khóa trùng nội dung cho INSERT ... ON CONFLICT DO NOTHING (NULL không bị ràng buộc)
+        Index('uq_articles_content_hash', 'content_hash', unique=True),
+        # Cùng một bài dưới nhiều dạng URL (tracking, host mobile...) chỉ được lưu một lần
+        Index('uq_articles_canonical_url', 'canonical_url', unique=True),
+        # Phân trang keyset (created_at, id) cho các endpoint danh sách
+        Index('ix_articles_created_at_id', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String, nullable=False, index=True)
     url = Column(String, unique=True, nullable=False, index=True)
+    # URL đã chuẩn hóa (url_canonicalizer), khóa kiểm tra trùng; NULL là bài cũ chưa backfill
+    canonical_url = Column(String, nullable=True)
     summary = Column(Text, nullable=True)
     published_date_str = Column(String, nullable=True)
+    # Thời điểm đăng (UTC) đọc từ published_date_str, dùng để lọc / sắp xếp theo thời gian
+    published_at = Column(DateTime, nullable=True, index=True)
+    published_at_status = Column(String, nullable=True)
+    # Tiêu đề + tóm tắt + tóm tắt AI đã bỏ dấu, nguồn của chỉ mục tìm kiếm (services/search_index.py)
+    search_text = Column(Text, nullable=True)
     source_url = Column(String, nullable=False)
-    content_hash = Column(String, nullable=True, index=True)
+    content_hash = Column(String, nullable=True)
+    # Bài gần trùng (cùng tin ở nguồn khác) trỏ về bài gốc, không phân tích AI / publish lại
+    canonical_article_id = Column(Integer, ForeignKey('articles.id'), nullable=True, index=True)
+    duplicate_similarity = Column(Float, nullable=True)
+    # Phân tích AI chạy ở analysis worker, không chặn việc lưu bài
+    analysis_status = Column(String, nullable=True, default=ANALYSIS_PENDING, index=True)
+    analysis_attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    analysis_error = Column(Text, nullable=True)
+    analysis_updated_at = Column(DateTime, nullable=True)
+    # Gemini hết quota: bài được trả về hàng đợi và chỉ nhận lại sau thời điểm này
+    analysis_retry_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float
 from datetime import datetime
 from app.database import Base
 
@@ -15,6 +15,15 @@ class CrawlSource(Base):
     date_selector = Column(String, nullable=True)  # Selector ngày tháng
     is_active = Column(Boolean, default=True, nullable=False)  # Có hoạt động không
     last_crawled_at = Column(DateTime, nullable=True)  # Lần crawl cuối
+    http_etag = Column(String, nullable=True)  # ETag của lần tải trang gần nhất
+    http_last_modified = Column(String, nullable=True)  # Header Last-Modified của lần tải gần nhất
+    listing_fingerprint = Column(String, nullable=True)  # Hash của khối container đã trích xuất
+    last_response_bytes = Column(Integer, nullable=True)  # Kích thước trang tải về lần gần nhất
+    avg_new_articles_per_hour = Column(Float, nullable=True)  # Tốc độ đăng bài ước lượng (EWMA)
+    crawl_interval_minutes = Column(Float, nullable=True)  # Khoảng crawl hiện tại
+    next_crawl_at = Column(DateTime, nullable=True, index=True)  # Thời điểm đến hạn crawl tiếp theo
+    claimed_by = Column(String, nullable=True)  # Worker đang giữ lease crawl nguồn này
+    lease_expires_at = Column(DateTime, nullable=True, index=True)  # Hết hạn lease - worker chết thì nguồn tự được nhả
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class EventOutbox(Base):
+    """Event chờ gửi RabbitMQ, được ghi cùng transaction với thay đổi dữ liệu (transactional outbox)"""
+    __tablename__ = "event_outbox"
+    __table_args__ = (
+        # Relay quét các event chưa gửi theo thứ tự id
+        Index('ix_event_outbox_published_at_id', 'published_at', 'id'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    event_type = Column(String, nullable=False)  # VD: "article_created"
+    exchange = Column(String, nullable=False)
+    routing_key = Column(String, nullable=False)
+    aggregate_id = Column(Integer, nullable=True, index=True)  # ID bản ghi gốc (article_id)
+    payload = Column(Text, nullable=False)  # JSON của event
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # Gửi lỗi thì chờ đến thời điểm này mới thử lại
+    published_at = Column(DateTime, nullable=True)  # NULL là chưa gửi
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<EventOutbox(id={self.id}, type='{self.event_type}', published={self.published_at is not None})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.database import Base
+
+class LLMResponseCache(Base):
+    """Kết quả LLM đã parse, khóa theo hash(model, loại phân tích, phiên bản prompt, input đã chuẩn hóa)"""
+    __tablename__ = "llm_response_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256 hex
+    model_name = Column(String, nullable=False)
+    operation = Column(String, nullable=False, index=True)  # VD: "article_analysis", "gold"
+    response = Column(Text, nullable=False)  # JSON
+    size_bytes = Column(Integer, nullable=False, default=0, server_default='0')
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Dùng cho loại bỏ theo LRU khi bảng vượt giới hạn
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<LLMResponseCache(key='{self.cache_key[:12]}', operation='{self.operation}')>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class ArticleBase(BaseModel):
@@ -12,9 +12,24 @@ class ArticleBase(BaseModel):
 class ArticleCreate(ArticleBase):
     pass
 
+class ArticleBulkCreate(BaseModel):
+    articles: List[ArticleCreate]
+
+class ArticleBulkResult(BaseModel):
+    created: int
+    skipped_existing: int
+    skipped_duplicates: int
+    near_duplicates: int
+    article_ids: List[int]
+
 class ArticleInDB(ArticleBase):
     id: int
+    canonical_url: Optional[str] = None
     content_hash: Optional[str] = None
+    canonical_article_id: Optional[int] = None
+    duplicate_similarity: Optional[float] = None
+    analysis_status: Optional[str] = None
+    published_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
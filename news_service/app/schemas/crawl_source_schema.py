@@ -29,6 +29,14 @@ class CrawlSourceUpdate(BaseModel):
 class CrawlSourceInDB(CrawlSourceBase):
     id: int
     last_crawled_at: Optional[datetime] = None
+    http_etag: Optional[str] = None
+    http_last_modified: Optional[str] = None
+    listing_fingerprint: Optional[str] = None
+    avg_new_articles_per_hour: Optional[float] = None
+    crawl_interval_minutes: Optional[float] = None
+    next_crawl_at: Optional[datetime] = None
+    claimed_by: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -0,0 +1,298 @@
+import os
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.database import SessionLocal
+from app.crud import article_crud
+from app.models import article_model
+from app.services import gemini_service
+from app.services.llm_cache import llm_response_cache
+from app.services.gemini_rate_limiter import gemini_rate_limiter
+from app.services.outbox_relay import outbox_relay
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Số bài được phân tích đồng thời (mỗi bài gọi Gemini trong một thread riêng)
+ANALYSIS_WORKER_CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "4"))
+# Số bài nhận mỗi lần truy vấn DB
+ANALYSIS_CLAIM_BATCH_SIZE = int(os.getenv("ANALYSIS_CLAIM_BATCH_SIZE", "10"))
+ANALYSIS_POLL_SECONDS = float(os.getenv("ANALYSIS_POLL_SECONDS", "5"))
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+# Bài ở trạng thái processing quá lâu (worker chết giữa chừng) được nhận lại
+ANALYSIS_STALE_SECONDS = int(os.getenv("ANALYSIS_STALE_SECONDS", "600"))
+# Khoảng chờ trước khi thử lại bài phân tích lỗi
+ANALYSIS_RETRY_DELAY_SECONDS = int(os.getenv("ANALYSIS_RETRY_DELAY_SECONDS", "60"))
+# Số bài tối đa mỗi consumer gom lại để phân tích chung (1 = từng bài một)
+ANALYSIS_GEMINI_BATCH_SIZE = int(os.getenv(
+    "ANALYSIS_GEMINI_BATCH_SIZE",
+    str(gemini_service.GEMINI_BATCH_MAX_ARTICLES if gemini_service.GEMINI_BATCH_ENABLED else 1)
+))
+# Chạy worker ngay trong process API (uvicorn); tắt khi đã có pod worker riêng
+ANALYSIS_WORKERS_IN_APP = os.getenv("ANALYSIS_WORKERS_IN_APP", "true").lower() == "true"
+
+
+def _claim_batch(limit: int) -> List[int]:
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        return article_crud.claim_pending_articles(
+            db,
+            limit,
+            stale_before=now - timedelta(seconds=ANALYSIS_STALE_SECONDS),
+            retry_before=now - timedelta(seconds=ANALYSIS_RETRY_DELAY_SECONDS)
+        )
+    finally:
+        db.close()
+
+
+def _finish_article(db, db_article: article_model.Article, analyze, max_attempts: int) -> Tuple[str, bool]:
+    """Ghi kết quả phân tích (analyze() trả về dữ liệu AI hoặc raise) và trạng thái của một bài"""
+    article_id = db_article.id
+    try:
+        ai_analysis_data = analyze()
+        status, error = article_model.ANALYSIS_DONE, None
+    except gemini_service.GeminiUnavailableError as e:
+        db.rollback()
+        # Hết quota / Gemini lỗi tạm thời: không tính lượt thử, nhận lại khi limiter hết tạm dừng
+        delay = max(gemini_rate_limiter.retry_after_seconds(), gemini_service.GEMINI_RETRY_BASE_SECONDS)
+        article_crud.defer_analysis(db, db_article, str(e), datetime.utcnow() + timedelta(seconds=delay))
+        logger.info(f"⏸️ Hoãn phân tích article #{article_id} {delay:.0f}s: {e}")
+        return article_model.ANALYSIS_PENDING, False
+    except Exception as e:
+        db.rollback()
+        ai_analysis_data = None
+        error = str(e)
+        # Còn lượt thì trả về hàng đợi, hết lượt thì đánh dấu failed
+        if (db_article.analysis_attempts or 0) >= max_attempts:
+            status = article_model.ANALYSIS_FAILED
+        else:
+            status = article_model.ANALYSIS_PENDING
+        logger.info(f"⚠️ Lỗi khi phân tích AI article #{article_id} (lần {db_article.analysis_attempts}): {e}")
+
+    # ai_analysis, trạng thái và event outbox commit cùng lúc
+    queued = article_crud.complete_analysis(db, db_article, status, error, ai_analysis_data)
+    return status, queued
+
+
+def _analyze_article(article_id: int, max_attempts: int) -> Tuple[str, bool]:
+    """
+    Chạy trong thread: phân tích một bài bằng session riêng.
+    Trả về (trạng thái mới, có ghi event outbox hay không).
+    """
+    db = SessionLocal()
+    try:
+        db_article = db.get(article_model.Article, article_id)
+        if db_article is None:
+            return article_model.ANALYSIS_FAILED, False
+        return _finish_article(db, db_article, lambda: article_crud.analyze_and_store(db, db_article), max_attempts)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _analyze_articles(article_ids: List[int], max_attempts: int) -> List[Tuple[str, bool]]:
+    """
+    Chạy trong thread: phân tích một nhóm bài bằng session riêng, gọi Gemini theo lô
+    (gemini_service chia lô theo ngân sách token, bài lỗi trong lô được gọi lại riêng).
+    Mỗi bài vẫn commit riêng nên một bài lỗi không ảnh hưởng các bài khác.
+    Trả về (trạng thái mới, có ghi event outbox hay không) theo thứ tự article_ids.
+    """
+    if len(article_ids) == 1:
+        return [_analyze_article(article_ids[0], max_attempts)]
+
+    db = SessionLocal()
+    try:
+        articles = [db.get(article_model.Article, article_id) for article_id in article_ids]
+        try:
+            analyses = gemini_service.analyze_articles_unified([
+                {"id": a.id, "title": a.title, "content": a.summary or ""} for a in articles if a is not None
+            ])
+            unavailable = None
+        except gemini_service.GeminiUnavailableError as e:
+            # Hết quota / Gemini lỗi: trả cả nhóm về hàng đợi (kết quả lô đã xong nằm trong cache LLM)
+            analyses, unavailable = {}, e
+
+        def analyze(db_article):
+            if unavailable is not None:
+                raise unavailable
+            return article_crud.store_ai_analysis(db, db_article, analyses.get(db_article.id))
+
+        results = []
+        for db_article in articles:
+            if db_article is None:
+                results.append((article_model.ANALYSIS_FAILED, False))
+                continue
+            results.append(_finish_article(db, db_article, lambda: analyze(db_article), max_attempts))
+        return results
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class AnalysisWorkerPool:
+    """
+    Pool phân tích AI tách khỏi luồng crawl/lưu bài:
+    - Một producer nhận lô bài pending từ DB (SKIP LOCKED) và đưa vào hàng đợi
+    - N consumer gọi Gemini trong thread pool, ghi ai_analysis và trạng thái done/failed;
+      mỗi consumer lấy tối đa analysis_batch_size bài đang chờ để phân tích chung một request Gemini
+    - Ghi event article_created vào outbox sau khi phân tích xong (trừ ANALYSIS_PUBLISH_MODE=on_create),
+      outbox relay gửi event sang RabbitMQ
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        analysis_batch_size: Optional[int] = None
+    ):
+        self.concurrency = max(1, concurrency or ANALYSIS_WORKER_CONCURRENCY)
+        self.batch_size = max(1, batch_size or ANALYSIS_CLAIM_BATCH_SIZE)
+        self.poll_seconds = poll_seconds or ANALYSIS_POLL_SECONDS
+        self.max_attempts = max_attempts or ANALYSIS_MAX_ATTEMPTS
+        self.analysis_batch_size = max(1, analysis_batch_size or ANALYSIS_GEMINI_BATCH_SIZE)
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        # Chỉ True sau khi producer nhận lô và không có bài nào (run_until_empty dựa vào cờ này)
+        self._idle = False
+        self.counters = {"claimed": 0, "done": 0, "failed": 0, "retried": 0, "events_queued": 0, "analysis_seconds": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def notify(self):
+        """Báo có bài mới để producer nhận ngay thay vì chờ hết chu kỳ poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self.running:
+            return
+        self._idle = False
+        self._queue = asyncio.Queue(maxsize=self.concurrency * 2 * self.analysis_batch_size)
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="analysis")
+        self._tasks = [asyncio.ensure_future(self._producer())]
+        self._tasks += [asyncio.ensure_future(self._consumer()) for _ in range(self.concurrency)]
+        logger.info(f"🧠 Analysis worker pool đã chạy với {self.concurrency} worker")
+
+    async def stop(self):
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        # Các bài đã nhận nhưng chưa xử lý sẽ được nhận lại sau ANALYSIS_STALE_SECONDS
+        logger.info("🛑 Analysis worker pool đã dừng")
+
+    async def _producer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                article_ids = await loop.run_in_executor(self._executor, _claim_batch, self.batch_size)
+                self._idle = not article_ids
+                self.counters["claimed"] += len(article_ids)
+                # put() chờ khi hàng đợi đầy nên producer không nhận quá khả năng xử lý
+                for article_id in article_ids:
+                    await self._queue.put(article_id)
+                if article_ids:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"❌ Lỗi khi nhận bài cần phân tích: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _consumer(self):
+        while True:
+            article_ids = [await self._queue.get()]
+            # Gom thêm các bài đang chờ sẵn, không đợi
+            while len(article_ids) < self.analysis_batch_size and not self._queue.empty():
+                article_ids.append(self._queue.get_nowait())
+            self._in_flight += len(article_ids)
+            try:
+                await self._process(article_ids)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"❌ Lỗi analysis worker với article {article_ids}: {e}")
+            finally:
+                self._in_flight -= len(article_ids)
+                for _ in article_ids:
+                    self._queue.task_done()
+
+    async def _process(self, article_ids: List[int]):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        results = await loop.run_in_executor(
+            self._executor, _analyze_articles, article_ids, self.max_attempts
+        )
+        self.counters["analysis_seconds"] += time.monotonic() - started
+
+        queued_any = False
+        for status, queued in results:
+            if status == article_model.ANALYSIS_DONE:
+                self.counters["done"] += 1
+            elif status == article_model.ANALYSIS_FAILED:
+                self.counters["failed"] += 1
+            else:
+                self.counters["retried"] += 1
+            if queued:
+                self.counters["events_queued"] += 1
+                queued_any = True
+        if queued_any:
+            outbox_relay.notify()
+
+    async def run_until_empty(self) -> Dict[str, Any]:
+        """Dùng cho pod chạy một lần: xử lý đến khi không còn bài pending rồi dừng"""
+        await self.start()
+        try:
+            while True:
+                await asyncio.sleep(0.5)
+                if self._idle and self._queue.empty() and self._in_flight == 0:
+                    break
+        finally:
+            await self.stop()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.counters["done"] + self.counters["failed"] + self.counters["retried"]
+        return {
+            **self.counters,
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "analysis_batch_size": self.analysis_batch_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "avg_analysis_seconds": round(self.counters["analysis_seconds"] / finished, 3) if finished else 0.0,
+            "gemini": gemini_service.usage_stats(),
+            "llm_cache": llm_response_cache.stats(),
+            "gemini_rate_limit": gemini_rate_limiter.stats(),
+        }
+
+
+# Singleton instance
+analysis_worker_pool = AnalysisWorkerPool()
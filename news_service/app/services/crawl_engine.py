@@ -0,0 +1,420 @@
+import os
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+import logging
+
+from app.database import SessionLocal
+from app.crud import crawl_source_crud, article_crud
+from app.schemas.article_schema import ArticleCreate
+from app.services.generic_crawler import crawl_listing_page, CrawlResult
+from app.services.http_client import http_client
+from app.services.politeness import politeness_limiter, THROTTLE_STATUS_CODES
+from app.services.seen_filter import seen_filter
+from app.services.near_duplicate import near_duplicate_index
+from app.services.analysis_worker import analysis_worker_pool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Giới hạn số nguồn crawl đồng thời (toàn cục và theo từng host)
+CRAWL_MAX_CONCURRENCY = int(os.getenv("CRAWL_MAX_CONCURRENCY", "16"))
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "2"))
+# Chế độ incremental: duyệt container theo thứ tự trang, dừng khi gặp một chuỗi URL đã biết.
+# CRAWL_MAX_ARTICLES khi đó chỉ là giới hạn an toàn cho số container được trích xuất.
+CRAWL_INCREMENTAL = os.getenv("CRAWL_INCREMENTAL", "true").lower() == "true"
+CRAWL_MAX_ARTICLES = int(os.getenv("CRAWL_MAX_ARTICLES", "50"))
+CRAWL_KNOWN_RUN_STOP = int(os.getenv("CRAWL_KNOWN_RUN_STOP", "3"))
+# Chia nguồn giữa nhiều pod bằng lease trong Postgres
+CRAWL_WORKER_ID = os.getenv("CRAWL_WORKER_ID") or os.getenv("HOSTNAME") or f"worker-{uuid.uuid4().hex[:8]}"
+CRAWL_CLAIM_BATCH_SIZE = int(os.getenv("CRAWL_CLAIM_BATCH_SIZE", "10"))
+CRAWL_LEASE_SECONDS = int(os.getenv("CRAWL_LEASE_SECONDS", "600"))
+# Số lần thử lại khi domain trả 429/503 (sau khi chờ Retry-After/backoff)
+CRAWL_MAX_RETRIES = int(os.getenv("CRAWL_MAX_RETRIES", "2"))
+
+
+def take_until_known_run(
+    articles: List[Dict[str, str]],
+    known_urls: Set[str],
+    stop_after: int
+) -> Tuple[List[Dict[str, str]], bool]:
+    """
+    Duyệt articles theo thứ tự trên trang, giữ các URL chưa biết và dừng khi gặp
+    `stop_after` URL đã biết liên tiếp (bài ghim/nổi bật lẻ tẻ không làm dừng sớm).
+    Trả về (danh sách bài mới, có dừng sớm hay không).
+    """
+    new_articles = []
+    seen_urls = set()
+    known_run = 0
+    for article_data in articles:
+        url = article_data['url']
+        if url in known_urls:
+            known_run += 1
+            if known_run >= stop_after:
+                return new_articles, True
+            continue
+        known_run = 0
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        new_articles.append(article_data)
+    return new_articles, False
+
+
+def _merge_stats(totals: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Cộng dồn thống kê của nhiều lô crawl"""
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            totals[key] = totals.get(key, 0) + value
+        else:
+            totals[key] = value
+    return totals
+
+
+def _snapshot_source(source) -> Dict[str, Any]:
+    """Chụp lại các field cần thiết của CrawlSource để dùng ngoài session"""
+    return {
+        "id": source.id,
+        "name": source.name,
+        "url": source.url,
+        "article_container_selector": source.article_container_selector,
+        "title_selector": source.title_selector,
+        "link_selector": source.link_selector,
+        "summary_selector": source.summary_selector,
+        "date_selector": source.date_selector,
+        "http_etag": source.http_etag,
+        "http_last_modified": source.http_last_modified,
+        "listing_fingerprint": source.listing_fingerprint,
+        "last_response_bytes": source.last_response_bytes,
+        "last_crawled_at": source.last_crawled_at,
+        "claimed_by": source.claimed_by,
+    }
+
+
+class CrawlEngine:
+    """
+    Crawl nhiều nguồn cùng lúc bằng asyncio.
+    - Fetch chạy trong thread pool, giới hạn bởi semaphore toàn cục và semaphore theo host
+    - Kết quả được lưu ngay khi nguồn nào fetch xong (as_completed)
+    - Mỗi nguồn dùng session DB riêng, lỗi của nguồn này không ảnh hưởng nguồn khác
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None,
+        max_articles: Optional[int] = None,
+        incremental: Optional[bool] = None,
+        known_run_stop: Optional[int] = None,
+        claim_batch_size: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        max_retries: Optional[int] = None
+    ):
+        self.max_concurrency = max(1, max_concurrency or CRAWL_MAX_CONCURRENCY)
+        self.per_host_concurrency = max(1, per_host_concurrency or CRAWL_PER_HOST_CONCURRENCY)
+        self.max_articles = max_articles or CRAWL_MAX_ARTICLES
+        self.incremental = CRAWL_INCREMENTAL if incremental is None else incremental
+        self.known_run_stop = max(1, known_run_stop or CRAWL_KNOWN_RUN_STOP)
+        self.claim_batch_size = max(1, claim_batch_size or CRAWL_CLAIM_BATCH_SIZE)
+        self.lease_seconds = max(1, lease_seconds or CRAWL_LEASE_SECONDS)
+        self.max_retries = CRAWL_MAX_RETRIES if max_retries is None else max_retries
+        # Semaphore được tạo trong run() để gắn với event loop đang chạy
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _load_sources(self, due_only: bool) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            if due_only:
+                sources = crawl_source_crud.get_due_crawl_sources(db)
+            else:
+                sources = crawl_source_crud.get_active_crawl_sources(db)
+            return [_snapshot_source(s) for s in sources]
+        finally:
+            db.close()
+
+    def _claim_batch(self, worker_id: str, cycle_started_at: datetime, due_only: bool) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        # Snapshot ngay sau commit, không cần refresh lại từng nguồn
+        db.expire_on_commit = False
+        try:
+            sources = crawl_source_crud.claim_crawl_sources(
+                db,
+                worker_id=worker_id,
+                limit=self.claim_batch_size,
+                lease_seconds=self.lease_seconds,
+                cycle_started_at=cycle_started_at,
+                due_only=due_only
+            )
+            return [_snapshot_source(s) for s in sources]
+        finally:
+            db.close()
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_semaphores[host]
+
+    async def _fetch_source(self, job: Dict[str, Any], stats: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[CrawlResult], Optional[Exception]]:
+        """Fetch một nguồn, không bao giờ raise - lỗi được trả về cùng kết quả"""
+        try:
+            # Lấy slot của host trước để nguồn đang chờ host không giữ slot toàn cục
+            async with self._host_semaphore(job["url"]):
+                for attempt in range(self.max_retries + 1):
+                    # Chờ token của domain trước khi chiếm slot toàn cục
+                    stats["politeness_wait_seconds"] += await politeness_limiter.acquire(job["url"])
+                    async with self._global_semaphore:
+                        result = await self._fetch_once(job)
+
+                    politeness_limiter.record_response(job["url"], result.http_status, result.retry_after)
+                    if result.http_status not in THROTTLE_STATUS_CODES or attempt == self.max_retries:
+                        break
+                    stats["retries"] += 1
+                    logger.info(f"🔁 {job['name']}: thử lại lần {attempt + 1} sau khi bị giới hạn tốc độ")
+            return job, result, None
+        except Exception as e:
+            return job, None, e
+
+    async def _fetch_once(self, job: Dict[str, Any]) -> CrawlResult:
+        loop = asyncio.get_running_loop()
+        logger.info(f"🔄 Crawling: {job['name']}")
+        return await loop.run_in_executor(
+            self._executor,
+            partial(
+                crawl_listing_page,
+                page_url=job["url"],
+                article_container_selector=job["article_container_selector"],
+                title_selector=job["title_selector"],
+                link_selector=job["link_selector"],
+                summary_selector=job["summary_selector"],
+                date_selector=job["date_selector"],
+                source_name=job["name"],
+                max_articles=self.max_articles,
+                etag=job.get("http_etag"),
+                last_modified=job.get("http_last_modified"),
+                previous_fingerprint=job.get("listing_fingerprint")
+            )
+        )
+
+    def _select_new_articles(self, db, result: CrawlResult, stats: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Lọc bài mới theo lô: một truy vấn IN cho URL và một cho content hash"""
+        known_urls = article_crud.get_existing_urls(db, [a['url'] for a in result.articles])
+        candidates, stopped_early = take_until_known_run(result.articles, known_urls, self.known_run_stop)
+        if stopped_early:
+            stats["early_stops"] += 1
+
+        hashes = {
+            id(a): article_crud.compute_content_hash(a['title'], a['summary'])
+            for a in candidates
+        }
+        known_hashes = article_crud.get_existing_content_hashes(db, hashes.values())
+
+        new_articles = []
+        batch_hashes = set()
+        for article_data in candidates:
+            content_hash = hashes[id(article_data)]
+            if content_hash in known_hashes or content_hash in batch_hashes:
+                continue
+            batch_hashes.add(content_hash)
+            new_articles.append(article_data)
+
+        stats["articles_known_skipped"] += len(result.articles) - len(new_articles)
+        return new_articles
+
+    async def _save_source_articles(self, job: Dict[str, Any], result: CrawlResult, stats: Dict[str, Any]) -> int:
+        """Lưu articles của một nguồn bằng session riêng"""
+        db = SessionLocal()
+        saved = 0
+        save_failed = False
+        try:
+            if self.incremental:
+                articles_to_save = self._select_new_articles(db, result, stats)
+            else:
+                articles_to_save = result.articles
+
+            article_creates = [
+                ArticleCreate(
+                    title=article_data['title'],
+                    url=article_data['url'],
+                    summary=article_data['summary'],
+                    published_date_str=article_data['published_date_str'],
+                    source_url=job["url"]
+                )
+                for article_data in articles_to_save
+            ]
+            if article_creates:
+                # Một INSERT cho cả nguồn, AI analysis và publish event do analysis worker xử lý
+                # Chế độ incremental đã kiểm tra trùng lặp theo lô ở trên
+                try:
+                    bulk_result = await article_crud.create_articles_bulk(
+                        db, article_creates, check_duplicates=not self.incremental
+                    )
+                    saved = bulk_result["created"]
+                    # Bài mới ở trạng thái pending, báo analysis worker (nếu chạy cùng process)
+                    analysis_worker_pool.notify()
+                except Exception as e:
+                    db.rollback()
+                    save_failed = True
+                    logger.info(f"   ❌ Lỗi khi lưu articles của {job['name']}: {e}")
+
+            # Cập nhật thời gian crawl cuối cùng validator/fingerprint cho lần sau.
+            # Lưu lỗi thì xóa validator/fingerprint: lần sau tải lại đầy đủ thay vì nhận 304 / "unchanged"
+            # và bỏ qua vĩnh viễn các bài chưa lưu được
+            crawled_at = datetime.utcnow()
+            crawl_source_crud.update_crawl_source_crawl_state(
+                db,
+                job["id"],
+                last_crawled_at=crawled_at,
+                etag=None if save_failed else result.etag,
+                last_modified=None if save_failed else result.last_modified,
+                fingerprint=None if save_failed else result.fingerprint,
+                response_bytes=result.bytes_downloaded,
+                not_modified=result.status == "not_modified",
+                worker_id=job.get("claimed_by")
+            )
+
+            # Lên lịch lần crawl tiếp theo dựa trên số bài mới kể từ lần crawl trước
+            new_articles = article_crud.count_source_articles_since(
+                db, job["url"], job.get("last_crawled_at")
+            )
+            crawl_source_crud.update_crawl_source_schedule(
+                db,
+                job["id"],
+                crawled_at=crawled_at,
+                previous_crawled_at=job.get("last_crawled_at"),
+                new_articles=new_articles,
+                max_articles=self.max_articles
+            )
+        finally:
+            db.close()
+        return saved
+
+    async def run(self, sources: Optional[List[Any]] = None, due_only: bool = False) -> Dict[str, Any]:
+        """
+        Chạy một chu kỳ crawl. `sources` là danh sách CrawlSource (hoặc dict snapshot);
+        nếu bỏ trống sẽ lấy các nguồn đang hoạt động (chỉ các nguồn đến hạn nếu due_only).
+        """
+        started = time.monotonic()
+        if sources is None:
+            jobs = self._load_sources(due_only)
+        else:
+            jobs = [s if isinstance(s, dict) else _snapshot_source(s) for s in sources]
+
+        logger.info(f"📊 Tìm thấy {len(jobs)} nguồn {'đến hạn crawl' if due_only else 'đang hoạt động'}.")
+
+        stats = {
+            "sources_total": len(jobs),
+            "sources_crawled": 0,
+            "sources_failed": 0,
+            "sources_not_modified": 0,
+            "sources_unchanged": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved_estimate": 0,
+            "streams_stopped_early": 0,
+            "articles_found": 0,
+            "articles_known_skipped": 0,
+            "early_stops": 0,
+            "retries": 0,
+            "politeness_wait_seconds": 0.0,
+            "articles_processed": 0,
+            "duration_seconds": 0.0,
+        }
+        if not jobs:
+            return stats
+
+        self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._host_semaphores = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="crawler")
+
+        try:
+            tasks = [asyncio.ensure_future(self._fetch_source(job, stats)) for job in jobs]
+
+            # Xử lý nguồn nào xong trước thì lưu trước
+            for next_done in asyncio.as_completed(tasks):
+                job, result, error = await next_done
+                if error is None and result.status == "error":
+                    error = result.error
+                if error is not None:
+                    stats["sources_failed"] += 1
+                    logger.info(f"❌ Lỗi khi crawl {job['name']}: {error}")
+                    continue
+
+                stats["bytes_downloaded"] += result.bytes_downloaded
+                if result.stopped_early:
+                    stats["streams_stopped_early"] += 1
+                if result.status == "not_modified":
+                    # Không tải lại trang: ước tính bằng kích thước lần tải trước
+                    stats["sources_not_modified"] += 1
+                    stats["bytes_saved_estimate"] += job.get("last_response_bytes") or 0
+                elif result.status == "unchanged":
+                    stats["sources_unchanged"] += 1
+
+                stats["articles_found"] += len(result.articles)
+                try:
+                    stats["articles_processed"] += await self._save_source_articles(job, result, stats)
+                    stats["sources_crawled"] += 1
+                except Exception as e:
+                    stats["sources_failed"] += 1
+                    logger.info(f"❌ Lỗi khi lưu dữ liệu {job['name']}: {e}")
+        finally:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+        stats["duration_seconds"] = round(time.monotonic() - started, 3)
+        stats["politeness_wait_seconds"] = round(stats["politeness_wait_seconds"], 2)
+        stats["http_pools"] = http_client.stats()
+        stats["politeness"] = politeness_limiter.stats()
+        stats["seen_filter"] = seen_filter.stats()
+        stats["near_duplicates"] = near_duplicate_index.stats()
+        logger.info(
+            f"✅ Hoàn thành chu kỳ crawl: {stats['articles_processed']} articles đã được xử lý "
+            f"từ {stats['sources_crawled']}/{stats['sources_total']} nguồn trong {stats['duration_seconds']}s"
+        )
+        logger.info(
+            f"⏭️ Bỏ qua parse: {stats['sources_not_modified']} nguồn 304, "
+            f"{stats['sources_unchanged']} nguồn không đổi (~{stats['bytes_saved_estimate']} bytes tiết kiệm)"
+        )
+        return stats
+
+    async def run_sharded(self, worker_id: Optional[str] = None, due_only: bool = True) -> Dict[str, Any]:
+        """
+        Chạy chu kỳ crawl dạng shard: worker liên tục claim từng lô nguồn bằng lease
+        cho tới khi không còn nguồn nào. Nhiều pod có thể chạy song song và chia nhau
+        các nguồn; lease được nhả khi lưu xong, nguồn lỗi giữ lease tới khi hết hạn
+        (đóng vai trò backoff) và worker chết thì nguồn tự được nhả khi lease hết hạn.
+        """
+        worker_id = worker_id or CRAWL_WORKER_ID
+        started = time.monotonic()
+        cycle_started_at = datetime.utcnow()
+        totals: Dict[str, Any] = {}
+        batches = 0
+
+        while True:
+            jobs = self._claim_batch(worker_id, cycle_started_at, due_only)
+            if not jobs:
+                break
+            batches += 1
+            logger.info(f"🔒 {worker_id} đã claim {len(jobs)} nguồn (lô {batches})")
+            _merge_stats(totals, await self.run(sources=jobs))
+
+        if not batches:
+            logger.info(f"📊 {worker_id}: không còn nguồn nào cần crawl")
+            totals = await self.run(sources=[])
+
+        # Lưu filter để pod của chu kỳ sau khỏi phải nạp lại toàn bộ từ DB
+        try:
+            seen_filter.save()
+        except Exception as e:
+            logger.info(f"⚠️ Không lưu được seen filter: {e}")
+
+        totals["worker_id"] = worker_id
+        totals["batches"] = batches
+        totals["duration_seconds"] = round(time.monotonic() - started, 3)
+        return totals
@@ -0,0 +1,70 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# Khoảng crawl được điều chỉnh theo tốc độ đăng bài quan sát được của từng nguồn
+CRAWL_MIN_INTERVAL_MINUTES = float(os.getenv("CRAWL_MIN_INTERVAL_MINUTES", "5"))
+CRAWL_MAX_INTERVAL_MINUTES = float(os.getenv("CRAWL_MAX_INTERVAL_MINUTES", "1440"))
+CRAWL_DEFAULT_INTERVAL_MINUTES = float(os.getenv("CRAWL_DEFAULT_INTERVAL_MINUTES", "240"))
+# Số bài mới mong muốn mỗi lần crawl - nguồn đăng nhiều sẽ được crawl dày hơn
+CRAWL_TARGET_NEW_PER_CRAWL = float(os.getenv("CRAWL_TARGET_NEW_PER_CRAWL", "2"))
+# Hệ số làm mượt EWMA cho tốc độ đăng bài (0..1, càng lớn càng nhạy với lần crawl gần nhất)
+CRAWL_RATE_SMOOTHING = float(os.getenv("CRAWL_RATE_SMOOTHING", "0.3"))
+
+
+def _clamp_interval(minutes: float) -> float:
+    return max(CRAWL_MIN_INTERVAL_MINUTES, min(CRAWL_MAX_INTERVAL_MINUTES, minutes))
+
+
+def estimate_publish_rate(
+    previous_rate: Optional[float],
+    new_articles: int,
+    elapsed_hours: float
+) -> float:
+    """Ước lượng số bài mới mỗi giờ bằng trung bình trượt có trọng số (EWMA)"""
+    observed = new_articles / max(elapsed_hours, 1 / 60)
+    if previous_rate is None:
+        return observed
+    return CRAWL_RATE_SMOOTHING * observed + (1 - CRAWL_RATE_SMOOTHING) * previous_rate
+
+
+def compute_next_interval(
+    rate_per_hour: float,
+    previous_interval: Optional[float],
+    new_articles: int,
+    max_articles: Optional[int] = None
+) -> float:
+    """
+    Khoảng crawl tiếp theo (phút) sao cho mỗi lần crawl thu được khoảng
+    CRAWL_TARGET_NEW_PER_CRAWL bài mới.
+    """
+    if rate_per_hour <= 0:
+        interval = CRAWL_MAX_INTERVAL_MINUTES
+    else:
+        interval = CRAWL_TARGET_NEW_PER_CRAWL / rate_per_hour * 60
+
+    # Toàn bộ danh sách đều là bài mới: có thể đã bỏ lỡ bài, rút ngắn mạnh hơn
+    if max_articles and new_articles >= max_articles and previous_interval:
+        interval = min(interval, previous_interval / 2)
+
+    return _clamp_interval(interval)
+
+
+def plan_next_crawl(
+    crawled_at: datetime,
+    previous_crawled_at: Optional[datetime],
+    previous_rate: Optional[float],
+    previous_interval: Optional[float],
+    new_articles: int,
+    max_articles: Optional[int] = None
+) -> Tuple[Optional[float], float, datetime]:
+    """Trả về (tốc độ đăng bài mới, khoảng crawl phút, thời điểm crawl tiếp theo)"""
+    if previous_crawled_at is None:
+        # Lần crawl đầu tiên chưa có lịch sử để ước lượng
+        interval = _clamp_interval(previous_interval or CRAWL_DEFAULT_INTERVAL_MINUTES)
+        return previous_rate, interval, crawled_at + timedelta(minutes=interval)
+
+    elapsed_hours = (crawled_at - previous_crawled_at).total_seconds() / 3600
+    rate = estimate_publish_rate(previous_rate, new_articles, elapsed_hours)
+    interval = compute_next_interval(rate, previous_interval, new_articles, max_articles)
+    return rate, interval, crawled_at + timedelta(minutes=interval)
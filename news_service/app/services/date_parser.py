@@ -0,0 +1,170 @@
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Giờ trên các trang tin Việt Nam mặc định là GMT+7 khi chuỗi không ghi múi giờ
+DATE_PARSER_DEFAULT_UTC_OFFSET_HOURS = float(os.getenv("DATE_PARSER_DEFAULT_UTC_OFFSET_HOURS", "7"))
+# Số chuỗi đã chuẩn hóa được cache (các trang danh sách lặp lại rất nhiều chuỗi giống nhau)
+DATE_PARSER_CACHE_SIZE = int(os.getenv("DATE_PARSER_CACHE_SIZE", "65536"))
+
+_DEFAULT_OFFSET = timedelta(hours=DATE_PARSER_DEFAULT_UTC_OFFSET_HOURS)
+
+# "10 phút trước", "2 giờ trước", "3 ngày trước"
+_RELATIVE_RE = re.compile(r"(\d+)\s*(giây|phút|giờ|tiếng|ngày|tuần|tháng|năm)\s*(?:trước|qua)")
+_RELATIVE_UNITS = {
+    "giây": timedelta(seconds=1),
+    "phút": timedelta(minutes=1),
+    "giờ": timedelta(hours=1),
+    "tiếng": timedelta(hours=1),
+    "ngày": timedelta(days=1),
+    "tuần": timedelta(weeks=1),
+    "tháng": timedelta(days=30),
+    "năm": timedelta(days=365),
+}
+_JUST_NOW_RE = re.compile(r"vừa xong|vừa mới|mới đây|just now")
+# "hôm nay 10:30", "hôm qua, 08:15"
+_DAY_WORD_RE = re.compile(r"(hôm nay|hôm qua|hôm kia)")
+_DAY_WORD_OFFSETS = {"hôm nay": 0, "hôm qua": 1, "hôm kia": 2}
+# ISO 8601: "2025-07-14T10:30:00+07:00", "2025-07-14 10:30"
+_ISO_RE = re.compile(
+    r"(\d{4})-(\d{1,2})-(\d{1,2})(?:[t\s]+(\d{1,2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?)?\s*(z|[+-]\d{2}:?\d{2})?"
+)
+# "14/7/2025", "14-07-2025", "14.07.2025", "14/7" (không có năm)
+_DMY_RE = re.compile(r"(?<!\d)(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{2,4}))?(?!\d)")
+# "ngày 14 tháng 7 năm 2025"
+_DMY_WORDS_RE = re.compile(r"(?:ngày\s*)?(\d{1,2})\s*tháng\s*(\d{1,2})(?:\s*(?:năm|,)\s*(\d{4}))?")
+# "10:30", "10h30", "10 giờ 30"
+_TIME_RE = re.compile(r"(?<!\d)(\d{1,2})\s*(?::|h|giờ)\s*(\d{2})(?::(\d{2}))?(?!\d)")
+# "(GMT+7)", "GMT+07:00", "UTC+7"
+_GMT_RE = re.compile(r"(?:gmt|utc)\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?")
+
+# Kết quả phân tích chuỗi, không phụ thuộc thời điểm tham chiếu nên cache được:
+# ("relative", timedelta) | ("day_word", (số ngày lùi, giờ, phút)) | ("absolute", (datetime địa phương, offset, có năm?))
+_Parsed = Tuple[str, object]
+
+
+def _offset_from_match(sign: str, hours: str, minutes: Optional[str]) -> timedelta:
+    offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+    return -offset if sign == "-" else offset
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+def _parse_time(text: str) -> Tuple[int, int, int]:
+    match = _TIME_RE.search(text)
+    if not match:
+        return 0, 0, 0
+    hour, minute = int(match.group(1)), int(match.group(2))
+    second = int(match.group(3) or 0)
+    if hour > 23 or minute > 59 or second > 59:
+        return 0, 0, 0
+    return hour, minute, second
+
+
+@lru_cache(maxsize=DATE_PARSER_CACHE_SIZE)
+def _parse_normalized(text: str) -> Optional[_Parsed]:
+    # Thứ tự kiểm tra theo tần suất gặp trên trang danh sách: tương đối trước, tuyệt đối sau
+    match = _RELATIVE_RE.search(text)
+    if match:
+        return "relative", int(match.group(1)) * _RELATIVE_UNITS[match.group(2)]
+    if _JUST_NOW_RE.search(text):
+        return "relative", timedelta(0)
+
+    match = _DAY_WORD_RE.search(text)
+    if match:
+        hour, minute, second = _parse_time(text)
+        return "day_word", (_DAY_WORD_OFFSETS[match.group(1)], hour, minute, second)
+
+    offset = _DEFAULT_OFFSET
+    gmt = _GMT_RE.search(text)
+    if gmt:
+        offset = _offset_from_match(gmt.group(1), gmt.group(2), gmt.group(3))
+
+    match = _ISO_RE.search(text)
+    if match:
+        year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        hour, minute, second = int(match.group(4) or 0), int(match.group(5) or 0), int(match.group(6) or 0)
+        tz = match.group(7)
+        if tz == "z":
+            offset = timedelta(0)
+        elif tz:
+            digits = tz[1:].replace(":", "")
+            offset = _offset_from_match(tz[0], digits[:2], digits[2:])
+        return "absolute", (datetime(year, month, day, hour, minute, second), offset, True)
+
+    match = _DMY_RE.search(text) or _DMY_WORDS_RE.search(text)
+    if match:
+        day, month = int(match.group(1)), int(match.group(2))
+        year = match.group(3)
+        has_year = year is not None
+        year = int(year) if has_year else 2000  # Năm tạm, thay bằng năm của thời điểm tham chiếu
+        if has_year and year < 100:
+            year += 2000
+        # Bỏ phần ngày đã khớp để "14/7" không bị đọc nhầm thành giờ
+        hour, minute, second = _parse_time(text[:match.start()] + " " + text[match.end():])
+        return "absolute", (datetime(year, month, day, hour, minute, second), offset, has_year)
+
+    return None
+
+
+def parse_vietnamese_datetime(text: Optional[str], reference: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Đọc thời điểm đăng bài từ chuỗi trên trang tin, trả về datetime UTC (naive, như datetime.utcnow()).
+    Hỗ trợ: "Thứ hai, 14/7/2025, 10:30 (GMT+7)", "14/07/2025 10:30", "10:30 14/7",
+    "ngày 14 tháng 7 năm 2025", ISO 8601, "2 giờ trước", "vừa xong", "hôm qua 08:15".
+    reference (UTC) là thời điểm thu thập, dùng cho chuỗi tương đối; mặc định là hiện tại.
+    Trả về None nếu không đọc được - không raise.
+    """
+    if not text:
+        return None
+    reference = reference or datetime.utcnow()
+    try:
+        parsed = _parse_normalized(_normalize(text))
+    except ValueError:
+        # Ngày / tháng ngoài phạm vi (VD "31/2/2025")
+        return None
+    if parsed is None:
+        return None
+
+    kind, value = parsed
+    if kind == "relative":
+        return reference - value
+
+    if kind == "day_word":
+        days_back, hour, minute, second = value
+        local_day = (reference + _DEFAULT_OFFSET).date() - timedelta(days=days_back)
+        local = datetime(local_day.year, local_day.month, local_day.day, hour, minute, second)
+        return local - _DEFAULT_OFFSET
+
+    local, offset, has_year = value
+    if not has_year:
+        # "14/7" lấy năm của thời điểm tham chiếu; nếu thành tương lai thì là năm trước
+        local_reference = reference + offset
+        try:
+            local = local.replace(year=local_reference.year)
+            if local > local_reference + timedelta(days=1):
+                local = local.replace(year=local_reference.year - 1)
+        except ValueError:
+            return None
+    return local - offset
+
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Chuyển datetime có múi giờ (VD từ query param) về UTC naive để so với các cột DateTime"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def cache_stats() -> dict:
+    info = _parse_normalized.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
@@ -1,13 +1,18 @@
 import os
 import json
 import asyncio
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from aio_pika import connect_robust, Message
 from aio_pika.exceptions import AMQPException
 import logging
 
 logger = logging.getLogger(__name__)
 
+ARTICLE_EVENTS_EXCHANGE = "article_events"
+ARTICLE_CREATED_ROUTING_KEY = "article.created"
+# Thời gian chờ broker xác nhận (publisher confirm) cho mỗi message
+PUBLISH_CONFIRM_TIMEOUT_SECONDS = float(os.getenv("PUBLISH_CONFIRM_TIMEOUT_SECONDS", "10"))
+
 class EventPublisher:
     def __init__(self, rabbitmq_url: Optional[str] = None):
         # Đọc từ environment variable, fallback to service name
@@ -19,13 +24,16 @@ class EventPublisher:
         )
         self.connection = None
         self.channel = None
+        self._exchanges: Dict[str, object] = {}
         logger.info(f"🔧 EventPublisher using RabbitMQ URL: {self.rabbitmq_url}")
         
     async def connect(self):
         """Kết nối đến RabbitMQ"""
         try:
             self.connection = await connect_robust(self.rabbitmq_url)
-            self.channel = await self.connection.channel()
+            # publisher_confirms: publish() chỉ trả về khi broker đã nhận và lưu message
+            self.channel = await self.connection.channel(publisher_confirms=True)
+            self._exchanges = {}
             logger.info("✅ Connected to RabbitMQ")
         except AMQPException as e:
             logger.error(f"❌ Failed to connect to RabbitMQ: {e}")
@@ -35,31 +43,43 @@ class EventPublisher:
         """Đóng kết nối"""
         if self.connection:
             await self.connection.close()
+            self.connection = None
+            self.channel = None
+            self._exchanges = {}
             logger.info("🔌 Disconnected from RabbitMQ")
     
+    async def _get_exchange(self, name: str):
+        """Declare exchange một lần cho mỗi channel thay vì mỗi lần publish"""
+        if not self.channel:
+            await self.connect()
+        exchange = self._exchanges.get(name)
+        if exchange is None:
+            exchange = await self.channel.declare_exchange(name, type="topic", durable=True)
+            self._exchanges[name] = exchange
+        return exchange
+    
+    @staticmethod
+    def _build_message(body: bytes) -> Message:
+        return Message(
+            body,
+            content_type="application/json",
+            delivery_mode=2  # Persistent message
+        )
+    
     async def publish_article_created(self, event_data: dict):
         """Publish event khi có article mới"""
         try:
-            if not self.channel:
-                await self.connect()
-            
-            # Declare exchange và queue
-            exchange = await self.channel.declare_exchange(
-                "article_events", 
-                type="topic",
-                durable=True
-            )
+            exchange = await self._get_exchange(ARTICLE_EVENTS_EXCHANGE)
             
             # Publish message
-            message = Message(
-                json.dumps(event_data, ensure_ascii=False, default=str).encode('utf-8'),
-                content_type="application/json",
-                delivery_mode=2  # Persistent message
+            message = self._build_message(
+                json.dumps(event_data, ensure_ascii=False, default=str).encode('utf-8')
             )
             
             await exchange.publish(
                 message,
-                routing_key="article.created"
+                routing_key=ARTICLE_CREATED_ROUTING_KEY,
+                timeout=PUBLISH_CONFIRM_TIMEOUT_SECONDS
             )
             
             logger.info(f"📤 Published article_created event: {event_data['article_id']}")
@@ -67,6 +87,29 @@ class EventPublisher:
         except Exception as e:
             logger.error(f"❌ Failed to publish event: {e}")
             raise
+    
+    async def publish_batch(self, messages: List[Tuple[str, str, bytes]]) -> List[Optional[BaseException]]:
+        """
+        Publish một lô (exchange, routing_key, body) và chờ xác nhận của cả lô cùng lúc:
+        các message được gửi liên tiếp, không chờ confirm từng cái một.
+        Trả về lỗi của từng message theo thứ tự (None nếu broker đã xác nhận).
+        """
+        if not messages:
+            return []
+        exchanges = {}
+        for exchange_name, _, _ in messages:
+            if exchange_name not in exchanges:
+                exchanges[exchange_name] = await self._get_exchange(exchange_name)
+        
+        results = await asyncio.gather(*[
+            exchanges[exchange_name].publish(
+                self._build_message(body),
+                routing_key=routing_key,
+                timeout=PUBLISH_CONFIRM_TIMEOUT_SECONDS
+            )
+            for exchange_name, routing_key, body in messages
+        ], return_exceptions=True)
+        return [result if isinstance(result, BaseException) else None for result in results]
 
 # Singleton instance
 event_publisher = EventPublisher()
@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Deque, Optional
+from prometheus_client import Gauge, Histogram
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Quota Gemini theo phút của process này (nhiều pod dùng chung một API key thì chia quota cho số pod)
+GEMINI_RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "60"))
+GEMINI_TPM_LIMIT = int(os.getenv("GEMINI_TPM_LIMIT", "1000000"))
+# Chờ ngân sách tối đa bao lâu trước khi báo lỗi cho caller
+GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", "120"))
+
+_WINDOW_SECONDS = 60.0
+
+GEMINI_BUDGET_UTILIZATION = Gauge(
+    "news_gemini_budget_utilization", "Tỷ lệ quota Gemini đã dùng trong 60 giây gần nhất", ["budget"]
+)
+GEMINI_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "news_gemini_rate_limit_wait_seconds", "Thời gian request Gemini phải chờ ngân sách RPM / TPM",
+    buckets=(0.01, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+)
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class GeminiRateLimiter:
+    """
+    Cửa sổ trượt 60 giây đếm số request và token (ước lượng trước, cập nhật bằng số thực tế sau)
+    so với GEMINI_RPM_LIMIT / GEMINI_TPM_LIMIT. Hết ngân sách thì request chờ
+    cho tới khi các request cũ ra khỏi cửa sổ. Dùng chung cho mọi thread trong process.
+    """
+
+    def __init__(self, rpm_limit: int = GEMINI_RPM_LIMIT, tpm_limit: int = GEMINI_TPM_LIMIT):
+        self.rpm_limit = max(1, rpm_limit)
+        self.tpm_limit = max(1, tpm_limit)
+        self._condition = threading.Condition()
+        # [thời điểm, số token] của từng request trong cửa sổ
+        self._window: Deque[list] = deque()
+        self._tokens = 0
+        self._paused_until = 0.0
+
+    def _expire(self, now: float):
+        while self._window and self._window[0][0] <= now - _WINDOW_SECONDS:
+            _, tokens = self._window.popleft()
+            self._tokens -= tokens
+
+    def _wait_seconds(self, now: float, tokens: int) -> float:
+        """0 nếu gửi được ngay, ngược lại số giây cần chờ (ước lượng)"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if len(self._window) >= self.rpm_limit:
+            return self._window[0][0] + _WINDOW_SECONDS - now
+        # Request lớn hơn cả quota TPM vẫn được gửi khi cửa sổ trống, tránh chờ mãi
+        if self._window and self._tokens + tokens > self.tpm_limit:
+            freed, target = 0, self._tokens + tokens - self.tpm_limit
+            for started, used in self._window:
+                freed += used
+                if freed >= target:
+                    return started + _WINDOW_SECONDS - now
+        return 0.0
+
+    def acquire(
+        self, estimated_tokens: int, timeout: float = GEMINI_QUEUE_TIMEOUT_SECONDS,
+        cancelled: Optional[threading.Event] = None
+    ) -> list:
+        """Chờ đến khi còn ngân sách rồi giữ chỗ trong cửa sổ; trả về reservation cho settle()"""
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_seconds(now, estimated_tokens)
+                if wait <= 0:
+                    break
+                if cancelled is not None and cancelled.is_set():
+                    raise RateLimitTimeout("Request đã bị hủy khi chờ ngân sách Gemini")
+                if now >= deadline:
+                    raise RateLimitTimeout(f"Quá {timeout:g}s chờ ngân sách Gemini (RPM / TPM)")
+                # Thức dậy ít nhất mỗi giây để kiểm tra cờ hủy
+                self._condition.wait(timeout=min(wait, deadline - now, 1.0))
+            reservation = [now, estimated_tokens]
+            self._window.append(reservation)
+            self._tokens += estimated_tokens
+        GEMINI_RATE_LIMIT_WAIT_SECONDS.observe(time.monotonic() - started)
+        return reservation
+
+    def settle(self, reservation: list, actual_tokens: Optional[int]):
+        """Thay số token ước lượng bằng số thực tế Gemini báo về"""
+        if actual_tokens is None:
+            return
+        with self._condition:
+            if reservation in self._window:
+                self._tokens += actual_tokens - reservation[1]
+            reservation[1] = actual_tokens
+            self._condition.notify_all()
+
+    def release(self, reservation: list):
+        """Request đã giữ chỗ nhưng không được gửi (hết lượt / bị hủy): trả lại chỗ trong cửa sổ"""
+        with self._condition:
+            if reservation in self._window:
+                self._window.remove(reservation)
+                self._tokens -= reservation[1]
+            self._condition.notify_all()
+
+    def pause(self, seconds: float):
+        """Gemini trả 429: tạm dừng mọi request của process, không chỉ request vừa lỗi"""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def retry_after_seconds(self) -> float:
+        """Số giây ước lượng đến khi gửi được request tiếp theo (còn tạm dừng sau 429 / hết RPM)"""
+        with self._condition:
+            now = time.monotonic()
+            self._expire(now)
+            return max(0.0, self._wait_seconds(now, 0))
+
+    def utilization(self, budget: str) -> float:
+        with self._condition:
+            self._expire(time.monotonic())
+            if budget == "rpm":
+                return len(self._window) / self.rpm_limit
+            return self._tokens / self.tpm_limit
+
+    def stats(self) -> dict:
+        return {
+            "rpm_limit": self.rpm_limit,
+            "tpm_limit": self.tpm_limit,
+            "rpm_utilization": round(self.utilization("rpm"), 3),
+            "tpm_utilization": round(self.utilization("tpm"), 3),
+        }
+
+
+# Singleton instance
+gemini_rate_limiter = GeminiRateLimiter()
+GEMINI_BUDGET_UTILIZATION.labels("rpm").set_function(lambda: gemini_rate_limiter.utilization("rpm"))
+GEMINI_BUDGET_UTILIZATION.labels("tpm").set_function(lambda: gemini_rate_limiter.utilization("tpm"))
@@ -1,11 +1,23 @@
 import os
+import time
+import random
+import asyncio
+import threading
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
-from typing import Optional, Dict, Any
+from google.api_core import exceptions as google_exceptions
+from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge, Histogram
 import json
 import re
 import logging
 
+from app.services.llm_cache import llm_response_cache, make_cache_key
+from app.services.gemini_rate_limiter import RateLimitTimeout, gemini_rate_limiter
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -16,20 +28,337 @@ if GOOGLE_API_KEY:
 else:
     logger.info("CẢNH BÁO: GOOGLE_API_KEY không được tìm thấy trong file .env")
 
-def call_gemini(prompt: str, model_name: str = "gemini-1.5-flash") -> Optional[str]:
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+# Số request Gemini đồng thời tối đa trong process (chung cho worker thread và lớp async)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# Timeout mỗi lần gọi (gồm cả thời gian chờ lượt)
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "45"))
+# Thử lại khi Gemini trả 429 / 5xx / timeout: chờ ngẫu nhiên trong [0, min(MAX, BASE * 2^lần)]
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+GEMINI_RETRY_BASE_SECONDS = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "2"))
+GEMINI_RETRY_MAX_SECONDS = float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "60"))
+# Nội dung ngắn hơn thì không phân tích (không đủ thông tin)
+GEMINI_MIN_ANALYSIS_CHARS = int(os.getenv("GEMINI_MIN_ANALYSIS_CHARS", "50"))
+# Nội dung ngắn hơn thì dùng luôn làm tóm tắt
+GEMINI_MIN_SUMMARY_CHARS = int(os.getenv("GEMINI_MIN_SUMMARY_CHARS", "100"))
+
+# Phiên bản prompt theo loại phân tích, nằm trong khóa cache LLM: sửa prompt thì tăng số
+GEMINI_PROMPT_VERSIONS = {
+    "article_analysis": 1,
+    "geopolitics": 1,
+    "policy": 1,
+    "gold": 1,
+    "usd_index": 1,
+}
+
+ARTICLE_CATEGORIES = [
+    "Địa chính trị", "Chính sách tiền tệ", "Chính sách tài khóa", "Giá vàng",
+    "Tỷ giá USD", "Tin tức doanh nghiệp", "Thị trường chung", "Không liên quan",
+]
+ARTICLE_SENTIMENTS = ["Tích cực", "Tiêu cực", "Trung tính"]
+ARTICLE_IMPACT_LEVELS = ["Cao", "Trung bình", "Thấp"]
+ARTICLE_MAX_ENTITIES = 5
+
+# Schema JSON mà Gemini bắt buộc tuân theo (response_schema), không cần bóc JSON khỏi markdown
+ARTICLE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "category": {"type": "string", "enum": ARTICLE_CATEGORIES},
+        "sentiment": {"type": "string", "enum": ARTICLE_SENTIMENTS},
+        "impact_level": {"type": "string", "enum": ARTICLE_IMPACT_LEVELS},
+        "key_entities": {"type": "array", "items": {"type": "string"}},
+        "analysis_summary": {"type": "string"},
+    },
+    "required": ["summary", "category", "sentiment", "impact_level", "key_entities", "analysis_summary"],
+}
+
+# Phân tích theo lô: nhiều bài trong một request, chung phần hướng dẫn
+GEMINI_BATCH_ENABLED = os.getenv("GEMINI_BATCH_ENABLED", "true").lower() == "true"
+GEMINI_BATCH_MAX_ARTICLES = int(os.getenv("GEMINI_BATCH_MAX_ARTICLES", "10"))
+# Tổng token (prompt + output ước lượng) tối đa mỗi request lô
+GEMINI_BATCH_TOKEN_BUDGET = int(os.getenv("GEMINI_BATCH_TOKEN_BUDGET", "12000"))
+# Giới hạn output của model; lô bị cắt giữa chừng sẽ hỏng JSON của cả lô
+GEMINI_BATCH_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_BATCH_MAX_OUTPUT_TOKENS", "8192"))
+# Ước lượng ban đầu, được hiệu chỉnh theo usage thực tế sau mỗi lô
+GEMINI_CHARS_PER_TOKEN = float(os.getenv("GEMINI_CHARS_PER_TOKEN", "3.0"))
+GEMINI_OUTPUT_TOKENS_PER_ARTICLE = float(os.getenv("GEMINI_OUTPUT_TOKENS_PER_ARTICLE", "500"))
+
+ARTICLE_BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"article_id": {"type": "integer"}, **ARTICLE_ANALYSIS_SCHEMA["properties"]},
+        "required": ["article_id"] + ARTICLE_ANALYSIS_SCHEMA["required"],
+    },
+}
+
+_ANALYSIS_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=ARTICLE_ANALYSIS_SCHEMA,
+)
+_BATCH_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=ARTICLE_BATCH_SCHEMA,
+    max_output_tokens=GEMINI_BATCH_MAX_OUTPUT_TOKENS,
+)
+
+# Metrics cho Prometheus (endpoint /metrics)
+GEMINI_REQUEST_SECONDS = Histogram(
+    "news_gemini_request_seconds", "Thời gian một lần gọi Gemini", ["operation"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+)
+GEMINI_REQUESTS = Counter(
+    "news_gemini_requests_total", "Số lần gọi Gemini theo kết quả", ["operation", "status"]
+)
+GEMINI_TOKENS = Counter(
+    "news_gemini_tokens_total", "Số token Gemini đã dùng", ["operation", "kind"]
+)
+GEMINI_ARTICLE_TOKENS = Histogram(
+    "news_gemini_article_tokens", "Tổng token (prompt + output) cho mỗi bài được phân tích",
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000)
+)
+
+GEMINI_BATCH_ARTICLES = Histogram(
+    "news_gemini_batch_articles", "Số bài mỗi request phân tích theo lô",
+    buckets=(2, 3, 4, 5, 6, 8, 10, 15, 20, 30)
+)
+GEMINI_BATCH_PARTIAL_FAILURES = Counter(
+    "news_gemini_batch_partial_failures_total", "Số bài không có kết quả hợp lệ trong request lô (được gọi lại riêng)"
+)
+
+_batch_lock = threading.Lock()
+_batch_estimates = {
+    "chars_per_token": GEMINI_CHARS_PER_TOKEN,
+    "output_tokens_per_article": GEMINI_OUTPUT_TOKENS_PER_ARTICLE,
+}
+
+GEMINI_IN_FLIGHT = Gauge(
+    "news_gemini_in_flight_requests", "Số request Gemini đang chạy"
+)
+GEMINI_RETRIES = Counter(
+    "news_gemini_retries_total", "Số lần thử lại request Gemini", ["operation", "reason"]
+)
+
+
+class GeminiUnavailableError(RuntimeError):
+    """Gemini hết quota / lỗi server sau khi đã thử lại: caller nên thử lại sau, không ghi kết quả rỗng"""
+    pass
+
+
+# Tổng hợp trong process cho log / stats của worker
+_usage_lock = threading.Lock()
+_usage = {"calls": 0, "errors": 0, "prompt_tokens": 0, "output_tokens": 0, "seconds": 0.0}
+
+
+def _record_usage(operation: str, status: str, seconds: float, response=None) -> Dict[str, Any]:
+    GEMINI_REQUEST_SECONDS.labels(operation).observe(seconds)
+    GEMINI_REQUESTS.labels(operation, status).inc()
+    usage = {"model": GEMINI_MODEL_NAME, "latency_ms": round(seconds * 1000), "prompt_tokens": 0, "output_tokens": 0}
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None:
+        usage["prompt_tokens"] = metadata.prompt_token_count or 0
+        usage["output_tokens"] = metadata.candidates_token_count or 0
+        GEMINI_TOKENS.labels(operation, "prompt").inc(usage["prompt_tokens"])
+        GEMINI_TOKENS.labels(operation, "output").inc(usage["output_tokens"])
+    with _usage_lock:
+        _usage["calls"] += 1
+        _usage["errors"] += status != "ok"
+        _usage["prompt_tokens"] += usage["prompt_tokens"]
+        _usage["output_tokens"] += usage["output_tokens"]
+        _usage["seconds"] += seconds
+    return usage
+
+
+def usage_stats() -> Dict[str, Any]:
+    with _usage_lock:
+        calls = _usage["calls"]
+        stats = {
+            **_usage,
+            "seconds": round(_usage["seconds"], 3),
+            "avg_seconds": round(_usage["seconds"] / calls, 3) if calls else 0.0,
+        }
+    with _batch_lock:
+        stats["chars_per_token"] = round(_batch_estimates["chars_per_token"], 2)
+        stats["output_tokens_per_article"] = round(_batch_estimates["output_tokens_per_article"])
+    return stats
+
+
+# Client model dùng lại giữa các lần gọi (generation_config truyền theo từng request)
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+_concurrency = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+# Lớp async chạy client đồng bộ trong executor riêng: client grpc.aio của thư viện
+# gắn với event loop đầu tiên, không dùng được qua nhiều asyncio.run / thread
+_executor = ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCY * 2, thread_name_prefix="gemini")
+
+
+class _AsyncCallState:
+    """
+    Trạng thái một lời gọi async, dùng chung giữa event loop và thread chạy lời gọi:
+    cờ hủy (đã hủy / timeout thì không gửi request nữa) và lời gọi có đang bị giới hạn
+    (chờ quota RPM / TPM / lượt gọi hoặc đã phải thử lại sau 429 / 5xx) hay không.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.waiting_for_quota = False
+        self.retried = False
+
+    @property
+    def throttled(self) -> bool:
+        return self.waiting_for_quota or self.retried
+
+
+_call_state: contextvars.ContextVar[Optional[_AsyncCallState]] = contextvars.ContextVar(
+    "gemini_call_state", default=None
+)
+
+
+def _get_model(model_name: str):
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = _models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+
+def _retry_reason(error: Exception) -> Optional[str]:
+    """Loại lỗi đáng thử lại (429 / 5xx / timeout), None nếu thử lại cũng vô ích"""
+    if isinstance(error, google_exceptions.TooManyRequests):
+        return "rate_limited"
+    if isinstance(error, google_exceptions.DeadlineExceeded):
+        return "timeout"
+    if isinstance(error, google_exceptions.ServerError):
+        return "server_error"
+    return None
+
+
+def _generate(
+    prompt: str, operation: str, model_name: Optional[str] = None, generation_config=None,
+    expected_articles: int = 1
+):
+    """
+    Gọi Gemini (giới hạn GEMINI_MAX_CONCURRENCY và quota RPM / TPM), ghi latency / token;
+    trả về (response hoặc None, usage).
+    429 / 5xx / timeout được thử lại tối đa GEMINI_MAX_RETRIES lần; vẫn lỗi hoặc chờ quota quá
+    GEMINI_QUEUE_TIMEOUT_SECONDS / chờ lượt gọi quá GEMINI_TIMEOUT_SECONDS thì raise GeminiUnavailableError
+    để caller thử lại sau; quota đã giữ cho request không được gửi được trả lại.
+    """
+    started = time.monotonic()
+    state = _call_state.get()
+    cancelled = state.cancelled if state is not None else None
+    with _batch_lock:
+        output_per_article = _batch_estimates["output_tokens_per_article"]
+    estimated_tokens = _estimate_tokens(prompt) + int(output_per_article * expected_articles)
+
+    attempt = 0
+    while True:
+        if state is not None:
+            state.waiting_for_quota = True
+        try:
+            reservation = gemini_rate_limiter.acquire(estimated_tokens, cancelled=cancelled)
+        except RateLimitTimeout as e:
+            if cancelled is not None and cancelled.is_set():
+                return None, _record_usage(operation, "cancelled", time.monotonic() - started)
+            _record_usage(operation, "rate_limited", time.monotonic() - started)
+            raise GeminiUnavailableError(f"Gemini ({operation}): {e}") from e
+        if not _concurrency.acquire(timeout=GEMINI_TIMEOUT_SECONDS):
+            # Request chưa được gửi: trả lại quota đã giữ và báo caller thử lại sau
+            gemini_rate_limiter.release(reservation)
+            _record_usage(operation, "timeout", time.monotonic() - started)
+            raise GeminiUnavailableError(
+                f"Gemini ({operation}): quá {GEMINI_TIMEOUT_SECONDS:g}s chờ lượt gọi (GEMINI_MAX_CONCURRENCY)"
+            )
+        if state is not None:
+            state.waiting_for_quota = False
+        GEMINI_IN_FLIGHT.inc()
+        try:
+            if cancelled is not None and cancelled.is_set():
+                gemini_rate_limiter.release(reservation)
+                return None, _record_usage(operation, "cancelled", time.monotonic() - started)
+            response = _get_model(model_name or GEMINI_MODEL_NAME).generate_content(
+                prompt,
+                generation_config=generation_config,
+                request_options={"timeout": GEMINI_TIMEOUT_SECONDS},
+            )
+            # .text raise nếu bị chặn / không có candidate
+            response.text
+            break
+        except Exception as e:
+            reason = _retry_reason(e)
+            if reason is None:
+                logger.info(f"Lỗi khi gọi Gemini API ({operation}): {e}")
+                return None, _record_usage(operation, "error", time.monotonic() - started)
+            error = e
+        finally:
+            GEMINI_IN_FLIGHT.dec()
+            _concurrency.release()
+
+        if attempt >= GEMINI_MAX_RETRIES:
+            _record_usage(operation, reason, time.monotonic() - started)
+            raise GeminiUnavailableError(
+                f"Gemini ({operation}) vẫn lỗi sau {attempt + 1} lần thử: {error}"
+            ) from error
+        delay = random.uniform(0, min(GEMINI_RETRY_MAX_SECONDS, GEMINI_RETRY_BASE_SECONDS * 2 ** attempt))
+        if reason == "rate_limited":
+            # Quota thực tế đã hết (có thể do process khác dùng chung key): các request khác cũng chờ
+            gemini_rate_limiter.pause(delay)
+        GEMINI_RETRIES.labels(operation, reason).inc()
+        if state is not None:
+            state.retried = True
+        logger.info(f"🔁 Gemini {operation} lỗi {reason}, thử lại sau {delay:.1f}s (lần {attempt + 1}): {error}")
+        if cancelled is not None:
+            if cancelled.wait(delay):
+                return None, _record_usage(operation, "cancelled", time.monotonic() - started)
+        else:
+            time.sleep(delay)
+        attempt += 1
+
+    metadata = getattr(response, "usage_metadata", None)
+    gemini_rate_limiter.settle(reservation, getattr(metadata, "total_token_count", None))
+    return response, _record_usage(operation, "ok", time.monotonic() - started, response)
+
+
+async def run_gemini_async(fn, *args, timeout: Optional[float] = None):
+    """
+    Chạy một hàm Gemini đồng bộ của module này (gồm cả đọc / ghi cache) mà không chặn event loop.
+    Hết timeout hoặc bị hủy thì trả về None / raise CancelledError ngay; request chưa kịp gửi sẽ không được gửi.
+    Hết timeout trong lúc đang chờ quota hoặc đang thử lại sau 429 / 5xx thì raise GeminiUnavailableError
+    như lời gọi đồng bộ, không trả None.
+    """
+    timeout = timeout or GEMINI_TIMEOUT_SECONDS
+    state = _AsyncCallState()
+    context = contextvars.copy_context()
+    context.run(_call_state.set, state)
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, functools.partial(context.run, fn, *args))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        name = getattr(fn, '__name__', fn)
+        if state.throttled:
+            raise GeminiUnavailableError(f"Gemini {name} quá {timeout:g}s khi chờ quota / thử lại")
+        logger.info(f"⏱️ Gemini {name} quá {timeout:g}s")
+        return None
+    finally:
+        state.cancelled.set()
+
+
+def call_gemini(prompt: str, model_name: Optional[str] = None, operation: str = "text") -> Optional[str]:
     """
     Gửi một prompt đến Gemini API và nhận về text response.
+    Raise GeminiUnavailableError nếu hết quota / Gemini lỗi sau khi đã thử lại.
     """
     if not GOOGLE_API_KEY:
         logger.info("Lỗi: Không thể gọi Gemini API vì thiếu API Key.")
         return None
-    try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        logger.info(f"Lỗi khi gọi Gemini API: {e}")
-        return None
+    response, _ = _generate(prompt, operation, model_name)
+    return response.text if response is not None else None
+
+async def call_gemini_async(prompt: str, model_name: Optional[str] = None, operation: str = "text") -> Optional[str]:
+    """call_gemini cho code async"""
+    return await run_gemini_async(call_gemini, prompt, model_name, operation)
 
 def extract_json_from_markdown(text: str) -> str:
     """
@@ -63,83 +392,296 @@ def extract_json_from_markdown(text: str) -> str:
     # Fallback: trả về text gốc
     return text
 
-def summarize_article_with_gemini(title: str, content: str) -> Optional[str]:
-    """
-    Tóm tắt một bài báo bằng cách sử dụng Gemini API.
-    """
-    if not content or len(content.strip()) < 100:
-        return content
-
-    prompt = f"""
-    Bạn là một trợ lý phân tích tài chính chuyên nghiệp. Nhiệm vụ của bạn là đọc tiêu đề và đoạn trích của một bài báo kinh tế bằng tiếng Việt và tóm tắt lại các ý chính một cách ngắn gọn, súc tích, tập trung vào những thông tin có thể ảnh hưởng đến thị trường chứng khoán.
+def _coerce_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Đưa các trường về giá trị hợp lệ (phòng khi model trả thiếu / sai enum)"""
+    entities = data.get("key_entities") or []
+    if not isinstance(entities, list):
+        entities = [entities]
+    return {
+        "summary": str(data.get("summary") or "").strip(),
+        "category": data.get("category") if data.get("category") in ARTICLE_CATEGORIES else "Không liên quan",
+        "sentiment": data.get("sentiment") if data.get("sentiment") in ARTICLE_SENTIMENTS else "Trung tính",
+        "impact_level": data.get("impact_level") if data.get("impact_level") in ARTICLE_IMPACT_LEVELS else "Thấp",
+        "key_entities": [str(e) for e in entities if e][:ARTICLE_MAX_ENTITIES],
+        "analysis_summary": str(data.get("analysis_summary") or "").strip(),
+    }
 
-    **Yêu cầu:**
-    1.  Tóm tắt trong khoảng 6-7 câu (khoảng 175 từ).
-    2.  Giữ giọng văn trung lập, khách quan.
-    3.  Loại bỏ các thông tin không cần thiết, chỉ giữ lại những gì quan trọng nhất.
-    4.  Trả lời chỉ bằng nội dung tóm tắt, không thêm lời chào hay câu dẫn.
+def _parse_json_response(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(extract_json_from_markdown(text))
+    except json.JSONDecodeError as e:
+        logger.info(f"Lỗi khi parse JSON từ Gemini: {e}\nResponse gốc: {text}")
+        return None
 
-    **Tiêu đề bài báo:**
-    "{title}"
+def _cache_key(operation: str, title: str, content: str) -> str:
+    return make_cache_key(GEMINI_MODEL_NAME, operation, GEMINI_PROMPT_VERSIONS[operation], title, content)
 
-    **Nội dung trích dẫn:**
-    "{content}"
+def _cached_usage() -> Dict[str, Any]:
+    return {"model": GEMINI_MODEL_NAME, "latency_ms": 0, "prompt_tokens": 0, "output_tokens": 0, "cached": True}
 
-    **Bản tóm tắt của bạn:**
+def _call_json_cached(operation: str, title: str, content: str, prompt: str) -> Optional[Dict[str, Any]]:
+    """call_gemini + parse JSON, đọc / ghi cache LLM theo (operation, title, content)"""
+    cache_key = _cache_key(operation, title, content)
+    cached = llm_response_cache.get(cache_key, operation)
+    if cached is not None:
+        return cached
+    result = call_gemini(prompt, operation=operation)
+    if not result:
+        return None
+    try:
+        parsed = json.loads(extract_json_from_markdown(result))
+    except Exception as e:
+        logger.info(f"Lỗi parse JSON {operation}: {e}\n{result}")
+        return None
+    llm_response_cache.set(cache_key, operation, GEMINI_MODEL_NAME, parsed)
+    return parsed
+
+# Yêu cầu phân tích dùng chung cho chế độ một bài và chế độ lô
+_ANALYSIS_INSTRUCTIONS = f"""
+    1.  "summary": Tóm tắt các ý chính trong khoảng 6-7 câu (khoảng 175 từ), giọng văn trung lập, khách quan, tập trung vào những thông tin có thể ảnh hưởng đến thị trường chứng khoán. Không thêm lời chào hay câu dẫn.
+    2.  "category": Phân loại bài báo vào một trong các danh mục: {", ".join(f'"{c}"' for c in ARTICLE_CATEGORIES)}.
+    3.  "sentiment": Cảm xúc của tin tức đối với thị trường chứng khoán Việt Nam: "Tích cực", "Tiêu cực" hoặc "Trung tính".
+    4.  "impact_level": Mức độ tác động dự kiến đến thị trường: "Cao", "Trung bình" hoặc "Thấp".
+    5.  "key_entities": Danh sách các thực thể quan trọng nhất (quốc gia, tổ chức, công ty, chỉ số kinh tế), tối đa {ARTICLE_MAX_ENTITIES} thực thể.
+    6.  "analysis_summary": Một câu ngắn gọn (tối đa 25 từ) giải thích TẠI SAO tin tức có sentiment và mức độ tác động như vậy.
     """
-    summary = call_gemini(prompt)
-    return summary
 
-def analyze_article_with_gemini(title: str, content: str) -> Optional[Dict[str, Any]]:
+def analyze_article_unified(title: str, content: str) -> Optional[Dict[str, Any]]:
     """
-    Phân tích một bài báo toàn diện bằng Gemini API, bao gồm phân loại,
-    đánh giá sentiment, tác động và trích xuất thông tin.
+    Tóm tắt + phân loại + sentiment + tác động + thực thể + lý do trong MỘT lần gọi Gemini,
+    kết quả là JSON theo ARTICLE_ANALYSIS_SCHEMA (response_schema).
+    Trả về dict các key trên kèm "usage" (model, latency_ms, prompt_tokens, output_tokens);
+    None nếu nội dung quá ngắn hoặc gọi Gemini lỗi.
     """
-    if not content or len(content.strip()) < 50:
+    if not content or len(content.strip()) < GEMINI_MIN_ANALYSIS_CHARS:
+        return None
+    cache_key = _cache_key("article_analysis", title, content)
+    cached = llm_response_cache.get(cache_key, "article_analysis")
+    if cached is not None:
+        return {**cached, "usage": _cached_usage()}
+    if not GOOGLE_API_KEY:
+        logger.info("Lỗi: Không thể gọi Gemini API vì thiếu API Key.")
         return None
 
     prompt = f"""
     Bạn là một chuyên gia phân tích tài chính vĩ mô cho thị trường chứng khoán Việt Nam.
-    Hãy phân tích bài báo sau đây và trả về kết quả dưới dạng một JSON object.
+    Hãy đọc bài báo sau và trả về một JSON object.
 
     **Bài báo:**
     - Tiêu đề: "{title}"
     - Nội dung: "{content}"
 
-    **Yêu cầu phân tích (trả về dưới dạng JSON object với các key sau):**
+    **Yêu cầu:**
+    {_ANALYSIS_INSTRUCTIONS}
+    """
 
-    1.  "category": Phân loại bài báo vào một trong các danh mục sau: "Địa chính trị", "Chính sách tiền tệ", "Chính sách tài khóa", "Giá vàng", "Tỷ giá USD", "Tin tức doanh nghiệp", "Thị trường chung", "Không liên quan".
-    2.  "sentiment": Đánh giá cảm xúc của tin tức đối với thị trường chứng khoán Việt Nam. Chỉ trả về một trong ba giá trị: "Tích cực", "Tiêu cực", "Trung tính".
-    3.  "impact_level": Đánh giá mức độ tác động dự kiến của tin tức này đến thị trường. Chỉ trả về một trong ba giá trị: "Cao", "Trung bình", "Thấp".
-    4.  "key_entities": Trích xuất một danh sách (array) các thực thể quan trọng nhất được đề cập, ví dụ như tên quốc gia, tổ chức, công ty, hoặc các chỉ số kinh tế (tối đa 5 thực thể).
-    5.  "analysis_summary": Viết một câu phân tích ngắn gọn (tối đa 25 từ) giải thích TẠI SAO tin tức này lại có sentiment và mức độ tác động như vậy.
+    response, usage = _generate(prompt, "article_analysis", generation_config=_ANALYSIS_GENERATION_CONFIG)
+    if response is None:
+        return None
+    GEMINI_ARTICLE_TOKENS.observe(usage["prompt_tokens"] + usage["output_tokens"])
 
-    **Ví dụ định dạng JSON output mong muốn:**
-    {{
-      "category": "Chính sách tiền tệ",
-      "sentiment": "Tiêu cực",
-      "impact_level": "Cao",
-      "key_entities": ["FED", "Lãi suất", "Lạm phát"],
-      "analysis_summary": "Việc FED tăng lãi suất có thể gây áp lực rút vốn ngoại và ảnh hưởng tiêu cực đến tỷ giá."
-    }}
+    analysis = _parse_json_response(response.text)
+    if not isinstance(analysis, dict):
+        return None
+    analysis = _coerce_analysis(analysis)
+    if analysis["summary"]:
+        llm_response_cache.set(cache_key, "article_analysis", GEMINI_MODEL_NAME, analysis)
+    return {**analysis, "usage": usage}
 
-    **QUAN TRỌNG: Chỉ trả về JSON object thuần túy, không bao bọc trong markdown code block. Không sử dụng backticks. Bắt đầu trực tiếp bằng dấu {{ và kết thúc bằng dấu }}.**
+# ===== PHÂN TÍCH THEO LÔ =====
 
-    **JSON object kết quả phân tích của bạn:**
+_BATCH_PROMPT_TEMPLATE = f"""
+    Bạn là một chuyên gia phân tích tài chính vĩ mô cho thị trường chứng khoán Việt Nam.
+    Dưới đây là danh sách bài báo dạng JSON (mỗi bài có article_id, title, content).
+    Hãy phân tích TỪNG bài một cách độc lập và trả về một JSON array, mỗi phần tử ứng với một bài,
+    giữ nguyên "article_id" của bài đó.
+
+    **Yêu cầu cho mỗi bài:**
+    {_ANALYSIS_INSTRUCTIONS}
+
+    **Danh sách bài báo:**
+    {{articles}}
     """
 
-    analysis_str = call_gemini(prompt)
-    if not analysis_str:
-        return None
+def _estimate_tokens(text: str) -> int:
+    with _batch_lock:
+        chars_per_token = _batch_estimates["chars_per_token"]
+    return int(len(text) / chars_per_token) + 1
+
+def _update_estimates(prompt_chars: int, usage: Dict[str, Any], articles: int):
+    """Hiệu chỉnh ước lượng token theo số token thực tế Gemini báo về (trung bình trượt)"""
+    with _batch_lock:
+        if usage["prompt_tokens"]:
+            observed = prompt_chars / usage["prompt_tokens"]
+            _batch_estimates["chars_per_token"] += 0.2 * (observed - _batch_estimates["chars_per_token"])
+        if usage["output_tokens"] and articles:
+            observed = usage["output_tokens"] / articles
+            _batch_estimates["output_tokens_per_article"] += 0.2 * (observed - _batch_estimates["output_tokens_per_article"])
+
+def _batch_article_payload(article: Dict[str, Any]) -> str:
+    return json.dumps(
+        {"article_id": article["id"], "title": article["title"], "content": article["content"]},
+        ensure_ascii=False
+    )
+
+def plan_analysis_batches(articles: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Chia các bài ({"id", "title", "content"}) thành các lô sao cho mỗi request không vượt
+    GEMINI_BATCH_TOKEN_BUDGET (prompt + output ước lượng), GEMINI_BATCH_MAX_OUTPUT_TOKENS
+    và GEMINI_BATCH_MAX_ARTICLES. Bài dài hơn ngân sách vẫn được gửi thành lô một bài.
+    """
+    with _batch_lock:
+        output_per_article = _batch_estimates["output_tokens_per_article"]
+    preamble_tokens = _estimate_tokens(_BATCH_PROMPT_TEMPLATE)
+    max_by_output = max(1, int(GEMINI_BATCH_MAX_OUTPUT_TOKENS // output_per_article))
+    max_articles = max(1, min(GEMINI_BATCH_MAX_ARTICLES, max_by_output))
+
+    batches: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = preamble_tokens
+    for article in articles:
+        cost = _estimate_tokens(_batch_article_payload(article)) + output_per_article
+        if current and (len(current) >= max_articles or used + cost > GEMINI_BATCH_TOKEN_BUDGET):
+            batches.append(current)
+            current, used = [], preamble_tokens
+        current.append(article)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def analyze_articles_batch(articles: List[Dict[str, Any]]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Phân tích nhiều bài ({"id", "title", "content"}) trong MỘT lần gọi Gemini,
+    kết quả là JSON array theo ARTICLE_BATCH_SCHEMA, ghép lại theo article_id.
+    Bài bị thiếu / trùng / sai trong kết quả có giá trị None (caller thử lại riêng từng bài).
+    "usage" của mỗi bài là phần chia đều của cả request, kèm batch_size.
+    """
+    results: Dict[int, Optional[Dict[str, Any]]] = {article["id"]: None for article in articles}
+    if not articles or not GOOGLE_API_KEY:
+        return results
+
+    prompt = _BATCH_PROMPT_TEMPLATE.replace(
+        "{articles}", "[\n" + ",\n".join(_batch_article_payload(a) for a in articles) + "\n]"
+    )
+    response, usage = _generate(
+        prompt, "article_analysis_batch", generation_config=_BATCH_GENERATION_CONFIG,
+        expected_articles=len(articles)
+    )
+    GEMINI_BATCH_ARTICLES.observe(len(articles))
+    if response is None:
+        return results
+    _update_estimates(len(prompt), usage, len(articles))
+
+    items = _parse_json_response(response.text)
+    if not isinstance(items, list):
+        logger.info(f"⚠️ Gemini trả về kết quả lô không phải JSON array ({len(articles)} bài)")
+        return results
+
+    returned = set()
+    duplicated = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            article_id = int(item.get("article_id"))
+        except (TypeError, ValueError):
+            continue
+        if article_id not in results:
+            continue
+        if article_id in returned:
+            duplicated.add(article_id)
+        returned.add(article_id)
+        analysis = _coerce_analysis(item)
+        if analysis["summary"]:
+            results[article_id] = analysis
+    # id trả về nhiều lần: không biết phần tử nào đúng, để caller gọi lại riêng
+    for article_id in duplicated:
+        results[article_id] = None
+
+    valid = [analysis for analysis in results.values() if analysis is not None]
+    share = {
+        **usage,
+        "batch_size": len(articles),
+        "prompt_tokens": usage["prompt_tokens"] // len(articles),
+        "output_tokens": usage["output_tokens"] // max(1, len(valid)),
+    }
+    by_id = {article["id"]: article for article in articles}
+    for article_id, analysis in results.items():
+        if analysis is not None:
+            article = by_id[article_id]
+            llm_response_cache.set(
+                _cache_key("article_analysis", article["title"], article["content"]),
+                "article_analysis", GEMINI_MODEL_NAME, analysis
+            )
+    for analysis in valid:
+        analysis["usage"] = dict(share)
+        GEMINI_ARTICLE_TOKENS.observe(share["prompt_tokens"] + share["output_tokens"])
+    missing = len(articles) - len(valid)
+    if missing:
+        GEMINI_BATCH_PARTIAL_FAILURES.inc(missing)
+        logger.info(f"⚠️ Lô Gemini {len(articles)} bài thiếu kết quả hợp lệ cho {missing} bài")
+    return results
+
+def analyze_articles_unified(articles: List[Dict[str, Any]]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Phân tích nhiều bài, kết quả như analyze_article_unified theo từng id.
+    Các bài được đóng lô theo ngân sách token (plan_analysis_batches); bài không có kết quả hợp lệ
+    trong lô được gọi lại riêng bằng analyze_article_unified. Bài quá ngắn trả về None.
+    """
+    results: Dict[int, Optional[Dict[str, Any]]] = {article["id"]: None for article in articles}
+    analyzable = []
+    for article in articles:
+        if not article.get("content") or len(article["content"].strip()) < GEMINI_MIN_ANALYSIS_CHARS:
+            continue
+        # Bài đã có trong cache (kể cả từ lô khác) không cần đưa vào lô
+        cached = llm_response_cache.get(
+            _cache_key("article_analysis", article["title"], article["content"]), "article_analysis"
+        )
+        if cached is not None:
+            results[article["id"]] = {**cached, "usage": _cached_usage()}
+        else:
+            analyzable.append(article)
+    if not GEMINI_BATCH_ENABLED:
+        for article in analyzable:
+            results[article["id"]] = analyze_article_unified(article["title"], article["content"])
+        return results
+
+    for batch in plan_analysis_batches(analyzable):
+        if len(batch) == 1:
+            results[batch[0]["id"]] = analyze_article_unified(batch[0]["title"], batch[0]["content"])
+            continue
+        batch_results = analyze_articles_batch(batch)
+        for article in batch:
+            analysis = batch_results.get(article["id"])
+            if analysis is None:
+                analysis = analyze_article_unified(article["title"], article["content"])
+            results[article["id"]] = analysis
+    return results
 
-    try:
-        # Sử dụng hàm extract_json_from_markdown để parse JSON
-        clean_json_str = extract_json_from_markdown(analysis_str)
-        analysis_json = json.loads(clean_json_str)
-        return analysis_json
-    except json.JSONDecodeError as e:
-        logger.info(f"Lỗi khi parse JSON từ Gemini: {e}\nResponse gốc: {analysis_str}")
+def summarize_article_with_gemini(title: str, content: str) -> Optional[str]:
+    """
+    Tóm tắt một bài báo bằng cách sử dụng Gemini API (phần summary của analyze_article_unified).
+    """
+    if not content or len(content.strip()) < GEMINI_MIN_SUMMARY_CHARS:
+        return content
+    analysis = analyze_article_unified(title, content)
+    return analysis["summary"] if analysis else None
+
+def analyze_article_with_gemini(title: str, content: str) -> Optional[Dict[str, Any]]:
+    """
+    Phân tích một bài báo toàn diện bằng Gemini API, bao gồm phân loại,
+    đánh giá sentiment, tác động và trích xuất thông tin (analyze_article_unified bỏ summary).
+    """
+    analysis = analyze_article_unified(title, content)
+    if not analysis:
         return None
+    analysis.pop("summary")
+    return analysis
 
 # ===== CÁC MODULE PHÂN TÍCH CHUYÊN BIỆT =====
 
@@ -156,15 +698,7 @@ def analyze_geopolitics_with_gemini(title: str, content: str) -> Optional[Dict[s
 
     Chỉ trả về JSON object thuần túy:
     """
-    result = call_gemini(prompt)
-    if not result:
-        return None
-    try:
-        clean_json_str = extract_json_from_markdown(result)
-        return json.loads(clean_json_str)
-    except Exception as e:
-        logger.info(f"Lỗi parse JSON Geopolitics: {e}\n{result}")
-        return None
+    return _call_json_cached("geopolitics", title, content, prompt)
 
 def analyze_policy_with_gemini(title: str, content: str) -> Optional[Dict[str, Any]]:
     """Module phân tích chính sách"""
@@ -180,15 +714,7 @@ def analyze_policy_with_gemini(title: str, content: str) -> Optional[Dict[str, A
 
     Chỉ trả về JSON object thuần túy:
     """
-    result = call_gemini(prompt)
-    if not result:
-        return None
-    try:
-        clean_json_str = extract_json_from_markdown(result)
-        return json.loads(clean_json_str)
-    except Exception as e:
-        logger.info(f"Lỗi parse JSON Policy: {e}\n{result}")
-        return None
+    return _call_json_cached("policy", title, content, prompt)
 
 def analyze_gold_with_gemini(title: str, content: str) -> Optional[Dict[str, Any]]:
     """Module phân tích giá vàng"""
@@ -203,15 +729,7 @@ def analyze_gold_with_gemini(title: str, content: str) -> Optional[Dict[str, Any
 
     Chỉ trả về JSON object thuần túy:
     """
-    result = call_gemini(prompt)
-    if not result:
-        return None
-    try:
-        clean_json_str = extract_json_from_markdown(result)
-        return json.loads(clean_json_str)
-    except Exception as e:
-        logger.info(f"Lỗi parse JSON Gold: {e}\n{result}")
-        return None
+    return _call_json_cached("gold", title, content, prompt)
 
 def analyze_usd_index_with_gemini(title: str, content: str) -> Optional[Dict[str, Any]]:
     """Module phân tích giá Dollar Index"""
@@ -226,26 +744,55 @@ def analyze_usd_index_with_gemini(title: str, content: str) -> Optional[Dict[str
 
     Chỉ trả về JSON object thuần túy:
     """
-    result = call_gemini(prompt)
-    if not result:
-        return None
-    try:
-        clean_json_str = extract_json_from_markdown(result)
-        return json.loads(clean_json_str)
-    except Exception as e:
-        logger.info(f"Lỗi parse JSON USD Index: {e}\n{result}")
-        return None
+    return _call_json_cached("usd_index", title, content, prompt)
 
-def analyze_article_all_with_gemini(title: str, content: str) -> Dict[str, Any]:
+SPECIALIZED_ANALYZERS = {
+    "geopolitics": analyze_geopolitics_with_gemini,
+    "policy": analyze_policy_with_gemini,
+    "gold": analyze_gold_with_gemini,
+    "usd_index": analyze_usd_index_with_gemini,
+}
+
+async def analyze_article_unified_async(title: str, content: str) -> Optional[Dict[str, Any]]:
+    """analyze_article_unified cho code async"""
+    return await run_gemini_async(analyze_article_unified, title, content)
+
+async def analyze_article_all_async(title: str, content: str) -> Dict[str, Any]:
     """
-    Module tổng hợp - gọi tất cả các module phân tích chuyên biệt
+    Module tổng hợp: phân tích chung (kèm tóm tắt) và các module chuyên biệt chạy song song,
+    tổng thời gian xấp xỉ lời gọi chậm nhất. Module chuyên biệt lỗi / quá timeout có giá trị None;
+    phân tích chung hết quota thì raise GeminiUnavailableError.
     """
+    names = ["general_analysis"] + list(SPECIALIZED_ANALYZERS)
+    results = await asyncio.gather(
+        run_gemini_async(analyze_article_unified, title, content),
+        *(run_gemini_async(fn, title, content) for fn in SPECIALIZED_ANALYZERS.values()),
+        return_exceptions=True
+    )
+    if isinstance(results[0], GeminiUnavailableError):
+        raise results[0]
+    for name, value in zip(names, results):
+        if isinstance(value, Exception):
+            logger.info(f"⚠️ Module {name} lỗi: {value}")
     result = {
-        "summary": summarize_article_with_gemini(title, content),
-        "general_analysis": analyze_article_with_gemini(title, content),
-        "geopolitics": analyze_geopolitics_with_gemini(title, content),
-        "policy": analyze_policy_with_gemini(title, content),
-        "gold": analyze_gold_with_gemini(title, content),
-        "usd_index": analyze_usd_index_with_gemini(title, content)
+        name: None if isinstance(value, Exception) else value
+        for name, value in zip(names, results)
     }
-    return result
+    general_analysis = result["general_analysis"]
+    if general_analysis:
+        summary = general_analysis.pop("summary")
+    else:
+        summary = content if content and len(content.strip()) < GEMINI_MIN_SUMMARY_CHARS else None
+    return {"summary": summary, **result}
+
+def analyze_article_all_with_gemini(title: str, content: str) -> Dict[str, Any]:
+    """
+    Module tổng hợp - gọi tất cả các module phân tích chuyên biệt (song song, xem analyze_article_all_async)
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(analyze_article_all_async(title, content))
+    # Đang ở trong event loop (code async nên await analyze_article_all_async): chạy trên thread khác
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, analyze_article_all_async(title, content)).result()
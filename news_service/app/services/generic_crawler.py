@@ -1,14 +1,139 @@
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, List, Dict, Optional
 from datetime import datetime
+from urllib.parse import urljoin
+import hashlib
 import logging
-import time
+import os
+
+from app.services.html_parser import get_selector_plan
+from app.services.http_client import http_client, response_wire_bytes
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def scrape_news_from_website(
+# Đọc response theo từng chunk và dừng tải khi đã đủ container (chỉ với backend hỗ trợ parse tăng dần).
+# Đánh đổi: body chưa đọc hết thì kết nối keep-alive không trả được về pool mà bị đóng,
+# request sau tới host đó phải bắt tay TCP/TLS lại (xem connections_discarded trong http_client.stats())
+CRAWL_STREAMING = os.getenv("CRAWL_STREAMING", "true").lower() == "true"
+CRAWL_STREAM_CHUNK_SIZE = int(os.getenv("CRAWL_STREAM_CHUNK_SIZE", "16384"))
+# Sau khi dừng sớm vẫn đọc nốt body nếu phần còn lại (byte qua mạng) không quá ngưỡng này để giữ kết nối;
+# 0 = luôn đóng kết nối ngay khi dừng sớm
+CRAWL_STREAM_DRAIN_BYTES = int(os.getenv("CRAWL_STREAM_DRAIN_BYTES", "131072"))
+
+@dataclass
+class CrawlResult:
+    """Kết quả crawl một trang danh sách"""
+    articles: List[Dict[str, str]] = field(default_factory=list)
+    status: str = "ok"  # ok | not_modified (HTTP 304) | unchanged (fingerprint trùng) | error
+    http_status: Optional[int] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fingerprint: Optional[str] = None
+    bytes_downloaded: int = 0
+    retry_after: Optional[str] = None  # Header Retry-After khi bị 429/503
+    stopped_early: bool = False  # Dừng đọc stream trước khi hết trang
+    error: Optional[str] = None
+
+def compute_listing_fingerprint(containers, plan) -> str:
+    """Hash của khối container - nếu không đổi thì không cần trích xuất lại"""
+    digest = hashlib.md5()
+    for container in containers:
+        digest.update(plan.backend.outer_html(container).encode('utf-8'))
+    return digest.hexdigest()
+
+def _drain_body(response: requests.Response, body, max_wire_bytes: int):
+    """Đọc nốt phần còn lại của body nếu không quá `max_wire_bytes` byte qua mạng"""
+    if max_wire_bytes <= 0:
+        return
+    try:
+        started = response.raw.tell()
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) - started > max_wire_bytes:
+            return
+        for _ in body:
+            if response.raw.tell() - started > max_wire_bytes:
+                return
+    except Exception:
+        # Lỗi mạng khi đọc nốt: kết nối sẽ bị đóng cùng response
+        return
+
+def _fetch_containers(
+    plan,
+    page_url: str,
+    headers: Dict[str, str],
+    max_articles: int,
+    result: CrawlResult,
+    source_name: str
+) -> Optional[List[Any]]:
+    """
+    Tải trang và trả về tối đa `max_articles` container, hoặc None nếu server trả 304.
+    Ở chế độ stream, ngừng parse ngay khi đã có đủ container; phần body còn lại chỉ được đọc nốt
+    (để giữ kết nối keep-alive) khi không quá CRAWL_STREAM_DRAIN_BYTES.
+    """
+    use_stream = CRAWL_STREAMING and plan.backend.supports_streaming
+    response = http_client.get(page_url, headers=headers, stream=use_stream)
+    decoded_bytes = 0
+    body_complete = False
+
+    def chunks():
+        nonlocal decoded_bytes, body_complete
+        for chunk in response.iter_content(chunk_size=CRAWL_STREAM_CHUNK_SIZE):
+            decoded_bytes += len(chunk)
+            yield chunk
+        body_complete = True
+
+    body = chunks()
+    try:
+        result.http_status = response.status_code
+        result.etag = response.headers.get('ETag')
+        result.last_modified = response.headers.get('Last-Modified')
+        result.retry_after = response.headers.get('Retry-After')
+
+        if response.status_code == 304:
+            result.status = "not_modified"
+            logger.info(f"⏭️ {source_name}: 304 Not Modified, bỏ qua")
+            return None
+
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+
+        if not use_stream:
+            root = plan.parse(response.content, response.encoding)
+
+            # Tìm các container chứa bài viết
+            article_containers = plan.containers(root)
+            logger.info(f"Tìm thấy {len(article_containers)} containers từ {source_name}")
+
+            # Giới hạn số lượng bài viết
+            return article_containers[:max_articles]
+
+        _, article_containers, result.stopped_early = plan.stream_containers(
+            body, max_articles, response.encoding
+        )
+        logger.info(
+            f"Tìm thấy {len(article_containers)} containers từ {source_name}"
+            + (f" (dừng sau {decoded_bytes} bytes)" if result.stopped_early else "")
+        )
+        return article_containers
+    finally:
+        if use_stream:
+            _drain_body(response, body, CRAWL_STREAM_DRAIN_BYTES)
+            # Body đã đọc hết thì kết nối được trả về pool, ngược lại bị đóng
+            response.close()
+            try:
+                wire_bytes = response.raw.tell()
+            except Exception:
+                wire_bytes = 0
+            result.bytes_downloaded = wire_bytes or decoded_bytes
+            http_client.record_stream_bytes(page_url, result.bytes_downloaded, decoded_bytes)
+            if not body_complete:
+                http_client.record_discarded_connection(page_url)
+        else:
+            result.bytes_downloaded = response_wire_bytes(response)
+
+def crawl_listing_page(
     page_url: str,
     article_container_selector: str,
     title_selector: str,
@@ -16,86 +141,111 @@ def scrape_news_from_website(
     summary_selector: Optional[str] = None,
     date_selector: Optional[str] = None,
     source_name: str = "Unknown",
-    max_articles: int = 1
-) -> List[Dict[str, str]]:
+    max_articles: int = 1,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    previous_fingerprint: Optional[str] = None,
+    parser_backend: Optional[str] = None
+) -> CrawlResult:
     """
-    Generic crawler function để crawl từ bất kỳ website nào
+    Crawl trang danh sách với conditional GET (If-None-Match / If-Modified-Since).
+    Bỏ qua việc parse khi server trả 304 hoặc khối container không thay đổi.
     """
-    articles = []
-    
+    result = CrawlResult()
+
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
-        }
-        
-        response = requests.get(page_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Tìm các container chứa bài viết
-        article_containers = soup.select(article_container_selector)
-        logger.info(f"Tìm thấy {len(article_containers)} containers từ {source_name}")
-        
-        # Giới hạn số lượng bài viết
-        article_containers = article_containers[:max_articles]
-        
+        # Selector plan được biên dịch một lần và cache theo bộ selector của nguồn
+        plan = get_selector_plan(
+            article_container_selector,
+            title_selector,
+            link_selector,
+            summary_selector,
+            date_selector,
+            parser_backend
+        )
+
+        # Header mặc định (User-Agent, Accept-Encoding...) đã được gắn vào session của host
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        article_containers = _fetch_containers(
+            plan, page_url, headers, max_articles, result, source_name
+        )
+        if article_containers is None:
+            return result
+
+        result.fingerprint = compute_listing_fingerprint(article_containers, plan)
+        if previous_fingerprint and result.fingerprint == previous_fingerprint:
+            result.status = "unchanged"
+            logger.info(f"⏭️ {source_name}: danh sách không thay đổi, bỏ qua")
+            return result
+
         for idx, container in enumerate(article_containers):
             try:
-                # Trích xuất tiêu đề
-                title_element = container.select_one(title_selector)
-                title = title_element.get_text(strip=True) if title_element else ""
-                
+                # Trích xuất tiêu đề, link, tóm tắt, ngày tháng theo plan
+                fields = plan.extract(container)
+                title = fields['title']
+
                 if not title:
                     logger.info(f"Bỏ qua container {idx+1}: Không có tiêu đề")
                     continue
-                
-                # Trích xuất link
-                link_element = container.select_one(link_selector)
-                if link_element:
-                    url = link_element.get('href', '')
-                    if url.startswith('/'):
-                        from urllib.parse import urljoin
-                        url = urljoin(page_url, url)
-                else:
-                    url = ""
-                
-                # Trích xuất tóm tắt
-                summary = ""
-                if summary_selector:
-                    summary_element = container.select_one(summary_selector)
-                    summary = summary_element.get_text(strip=True) if summary_element else ""
-                
-                # Trích xuất ngày tháng
-                published_date = ""
-                if date_selector:
-                    date_element = container.select_one(date_selector)
-                    published_date = date_element.get_text(strip=True) if date_element else ""
-                
+
+                # URL tuyệt đối giữ nguyên dạng gốc để người dùng mở được;
+                # dạng chuẩn hóa (canonical_url) chỉ dùng để kiểm tra trùng, do tầng CRUD tính
+                url = urljoin(page_url, fields['href']) if fields['href'] else fields['href']
+
                 article_data = {
                     'title': title,
                     'url': url,
-                    'summary': summary,
-                    'published_date_str': published_date,
+                    'summary': fields['summary'],
+                    'published_date_str': fields['published_date_str'],
                     'source_page': source_name,
                     'collected_at_iso': datetime.now().isoformat()
                 }
-                
-                articles.append(article_data)
+
+                result.articles.append(article_data)
                 logger.info(f"✅ Crawled: {title[:50]}...")
-                
+
             except Exception as e:
                 logger.error(f"Lỗi khi xử lý container {idx+1}: {str(e)}")
                 continue
-        
-        time.sleep(1)  # Delay để tránh bị block
-        
+
     except requests.RequestException as e:
+        result.status = "error"
+        result.error = str(e)
         logger.error(f"Lỗi kết nối khi crawl {source_name}: {str(e)}")
     except Exception as e:
+        result.status = "error"
+        result.error = str(e)
         logger.error(f"Lỗi không xác định khi crawl {source_name}: {str(e)}")
-    
-    return articles
\ No newline at end of file
+
+    return result
+
+def scrape_news_from_website(
+    page_url: str,
+    article_container_selector: str,
+    title_selector: str,
+    link_selector: str,
+    summary_selector: Optional[str] = None,
+    date_selector: Optional[str] = None,
+    source_name: str = "Unknown",
+    max_articles: int = 1,
+    parser_backend: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    Generic crawler function để crawl từ bất kỳ website nào
+    """
+    return crawl_listing_page(
+        page_url=page_url,
+        article_container_selector=article_container_selector,
+        title_selector=title_selector,
+        link_selector=link_selector,
+        summary_selector=summary_selector,
+        date_selector=date_selector,
+        source_name=source_name,
+        max_articles=max_articles,
+        parser_backend=parser_backend
+    ).articles
@@ -0,0 +1,244 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+    LXML_AVAILABLE = True
+except ImportError:  # lxml/cssselect là tùy chọn, fallback về html.parser
+    LXML_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Backend parse HTML: "lxml" (nhanh, mặc định) hoặc "html.parser" (BeautifulSoup thuần Python)
+CRAWL_PARSER_BACKEND = os.getenv("CRAWL_PARSER_BACKEND", "lxml")
+
+
+class HtmlParserBackend:
+    """Giao diện chung cho các backend parse HTML"""
+    name = ""
+    supports_streaming = False
+
+    def parse(self, content: bytes, encoding: Optional[str] = None) -> Any:
+        raise NotImplementedError
+
+    def parse_stream(
+        self,
+        chunks: Iterable[bytes],
+        container: Any,
+        limit: int,
+        encoding: Optional[str] = None
+    ) -> Tuple[Any, List[Any], bool]:
+        """
+        Parse từ các chunk bytes, trả về (root, containers, đã dừng sớm hay chưa).
+        Mặc định đọc hết rồi parse một lần - backend hỗ trợ parse tăng dần sẽ override.
+        """
+        root = self.parse(b"".join(chunks), encoding)
+        return root, self.select(root, container)[:limit], False
+
+    def compile(self, selector: str) -> Any:
+        raise NotImplementedError
+
+    def select(self, node: Any, compiled: Any) -> List[Any]:
+        raise NotImplementedError
+
+    def select_one(self, node: Any, compiled: Any) -> Optional[Any]:
+        raise NotImplementedError
+
+    def text(self, node: Any) -> str:
+        raise NotImplementedError
+
+    def attr(self, node: Any, name: str) -> str:
+        raise NotImplementedError
+
+    def outer_html(self, node: Any) -> str:
+        raise NotImplementedError
+
+
+class SoupBackend(HtmlParserBackend):
+    """BeautifulSoup + html.parser, selector được biên dịch sẵn bằng soupsieve"""
+    name = "html.parser"
+
+    def parse(self, content: bytes, encoding: Optional[str] = None) -> Any:
+        return BeautifulSoup(content, 'html.parser')
+
+    def compile(self, selector: str) -> Any:
+        return soupsieve.compile(selector)
+
+    def select(self, node: Any, compiled: Any) -> List[Any]:
+        return compiled.select(node)
+
+    def select_one(self, node: Any, compiled: Any) -> Optional[Any]:
+        return compiled.select_one(node)
+
+    def text(self, node: Any) -> str:
+        return node.get_text(strip=True)
+
+    def attr(self, node: Any, name: str) -> str:
+        return node.get(name, '')
+
+    def outer_html(self, node: Any) -> str:
+        return str(node)
+
+
+class LxmlBackend(HtmlParserBackend):
+    """lxml.html, selector CSS được dịch một lần sang XPath bằng cssselect"""
+    name = "lxml"
+    supports_streaming = True
+
+    def parse(self, content: bytes, encoding: Optional[str] = None) -> Any:
+        parser = lxml.html.HTMLParser(encoding=encoding or 'utf-8')
+        return lxml.html.document_fromstring(content, parser=parser)
+
+    def parse_stream(
+        self,
+        chunks: Iterable[bytes],
+        container: Any,
+        limit: int,
+        encoding: Optional[str] = None
+    ) -> Tuple[Any, List[Any], bool]:
+        """
+        Đưa từng chunk vào HTMLPullParser và dừng đọc khi đã có đủ `limit` container hoàn chỉnh.
+        Container thứ limit+1 xuất hiện nghĩa là container thứ limit đã đóng thẻ.
+        """
+        parser = etree.HTMLPullParser(events=('start',), encoding=encoding or 'utf-8')
+        root = None
+        for chunk in chunks:
+            if not chunk:
+                continue
+            parser.feed(chunk)
+            if root is None:
+                for _, element in parser.read_events():
+                    root = element.getroottree().getroot()
+                    break
+            if root is None:
+                continue
+            # Bỏ các event đã xử lý để hàng đợi không phình ra
+            for _ in parser.read_events():
+                pass
+            containers = container(root)
+            if len(containers) > limit:
+                return root, containers[:limit], True
+
+        root = parser.close()
+        return root, container(root)[:limit], False
+
+    def compile(self, selector: str) -> Any:
+        return CSSSelector(selector, translator='html')
+
+    def select(self, node: Any, compiled: Any) -> List[Any]:
+        return compiled(node)
+
+    def select_one(self, node: Any, compiled: Any) -> Optional[Any]:
+        matches = compiled(node)
+        return matches[0] if matches else None
+
+    def text(self, node: Any) -> str:
+        # Tương đương get_text(strip=True) của BeautifulSoup
+        return "".join(part.strip() for part in node.itertext())
+
+    def attr(self, node: Any, name: str) -> str:
+        return node.get(name, '')
+
+    def outer_html(self, node: Any) -> str:
+        return lxml.html.tostring(node, encoding='unicode', with_tail=False)
+
+
+_BACKENDS: Dict[str, HtmlParserBackend] = {"html.parser": SoupBackend()}
+if LXML_AVAILABLE:
+    _BACKENDS["lxml"] = LxmlBackend()
+
+
+def get_parser_backend(name: Optional[str] = None) -> HtmlParserBackend:
+    """Lấy backend theo tên, fallback về html.parser nếu không có lxml"""
+    name = name or CRAWL_PARSER_BACKEND
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        logger.warning(f"⚠️ Parser backend '{name}' không khả dụng, dùng html.parser")
+        backend = _BACKENDS["html.parser"]
+    return backend
+
+
+def available_backends() -> List[str]:
+    return list(_BACKENDS.keys())
+
+
+class SelectorPlan:
+    """
+    Bộ selector của một CrawlSource đã được biên dịch sẵn cho một backend.
+    Dùng get_selector_plan() để lấy plan đã cache thay vì tạo trực tiếp.
+    """
+
+    def __init__(
+        self,
+        backend: HtmlParserBackend,
+        article_container_selector: str,
+        title_selector: str,
+        link_selector: str,
+        summary_selector: Optional[str] = None,
+        date_selector: Optional[str] = None
+    ):
+        self.backend = backend
+        self.container = backend.compile(article_container_selector)
+        self.title = backend.compile(title_selector)
+        self.link = backend.compile(link_selector)
+        self.summary = backend.compile(summary_selector) if summary_selector else None
+        self.date = backend.compile(date_selector) if date_selector else None
+
+    def parse(self, content: bytes, encoding: Optional[str] = None) -> Any:
+        return self.backend.parse(content, encoding)
+
+    def containers(self, root: Any) -> List[Any]:
+        return self.backend.select(root, self.container)
+
+    def stream_containers(
+        self,
+        chunks: Iterable[bytes],
+        limit: int,
+        encoding: Optional[str] = None
+    ) -> Tuple[Any, List[Any], bool]:
+        """Parse dạng stream và dừng sớm khi đủ `limit` container (nếu backend hỗ trợ)"""
+        return self.backend.parse_stream(chunks, self.container, limit, encoding)
+
+    def _text_of(self, container: Any, compiled: Any) -> str:
+        if compiled is None:
+            return ""
+        element = self.backend.select_one(container, compiled)
+        return self.backend.text(element) if element is not None else ""
+
+    def extract(self, container: Any) -> Dict[str, str]:
+        """Trích xuất title / href / summary / date thô từ một container"""
+        link_element = self.backend.select_one(container, self.link)
+        return {
+            'title': self._text_of(container, self.title),
+            'href': self.backend.attr(link_element, 'href') if link_element is not None else "",
+            'summary': self._text_of(container, self.summary),
+            'published_date_str': self._text_of(container, self.date),
+        }
+
+
+@lru_cache(maxsize=256)
+def get_selector_plan(
+    article_container_selector: str,
+    title_selector: str,
+    link_selector: str,
+    summary_selector: Optional[str] = None,
+    date_selector: Optional[str] = None,
+    backend_name: Optional[str] = None
+) -> SelectorPlan:
+    """Plan được cache theo các cột selector của nguồn, chỉ biên dịch một lần"""
+    return SelectorPlan(
+        get_parser_backend(backend_name),
+        article_container_selector,
+        title_selector,
+        link_selector,
+        summary_selector,
+        date_selector
+    )
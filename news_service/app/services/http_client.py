@@ -0,0 +1,156 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kích thước pool kết nối keep-alive cho mỗi host
+CRAWL_POOL_MAXSIZE = int(os.getenv("CRAWL_POOL_MAXSIZE", "4"))
+CRAWL_HTTP_TIMEOUT = float(os.getenv("CRAWL_HTTP_TIMEOUT", "30"))
+
+try:
+    # urllib3 tự giải nén brotli khi có package brotli/brotlicffi
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
+    # Chỉ quảng bá br khi có thể giải nén
+    'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
+}
+
+
+def response_wire_bytes(response: requests.Response) -> int:
+    """Số byte thực tế nhận qua mạng (trước khi giải nén), fallback về độ dài nội dung"""
+    try:
+        wire_bytes = response.raw.tell()
+        if wire_bytes:
+            return wire_bytes
+    except Exception:
+        pass
+    return len(response.content)
+
+
+class CrawlerHttpClient:
+    """
+    HTTP client dùng chung cho crawler:
+    - Mỗi host một requests.Session riêng với pool kết nối keep-alive (tái sử dụng TCP/TLS)
+    - Tự thương lượng nén gzip/brotli
+    - Thống kê số request, số kết nối mở mới, số lần tái sử dụng và số kết nối bị bỏ
+      (response stream đóng khi chưa đọc hết body) theo host
+    """
+
+    def __init__(self, pool_maxsize: Optional[int] = None, timeout: Optional[float] = None):
+        self.pool_maxsize = max(1, pool_maxsize or CRAWL_POOL_MAXSIZE)
+        self.timeout = timeout or CRAWL_HTTP_TIMEOUT
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=0
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._adapters[host] = adapter
+                self._counters[host] = {"requests": 0, "wire_bytes": 0, "decoded_bytes": 0, "connections_discarded": 0}
+            return session
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None, stream: bool = False) -> requests.Response:
+        """
+        GET qua session của host tương ứng.
+        Với stream=True caller tự đọc body và gọi record_stream_bytes() sau khi đóng response.
+        """
+        host = urlparse(url).netloc.lower()
+        session = self._session_for(host)
+        response = session.get(url, headers=headers, timeout=timeout or self.timeout, stream=stream)
+        with self._lock:
+            self._counters[host]["requests"] += 1
+        if not stream:
+            self.record_stream_bytes(url, response_wire_bytes(response), len(response.content))
+        return response
+
+    def record_stream_bytes(self, url: str, wire_bytes: int, decoded_bytes: int):
+        """Ghi nhận số byte đã nhận (qua mạng và sau giải nén) cho host"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            counters = self._counters.get(host)
+            if counters is not None:
+                counters["wire_bytes"] += wire_bytes
+                counters["decoded_bytes"] += decoded_bytes
+
+    def record_discarded_connection(self, url: str):
+        """Response stream bị đóng khi body chưa đọc hết: kết nối không được trả về pool"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            counters = self._counters.get(host)
+            if counters is not None:
+                counters["connections_discarded"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Thống kê tái sử dụng kết nối theo host"""
+        result = {}
+        with self._lock:
+            hosts = list(self._adapters.items())
+            counters = {host: dict(c) for host, c in self._counters.items()}
+
+        for host, adapter in hosts:
+            connections_opened = 0
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+
+            host_counters = counters.get(host, {})
+            requests_count = host_counters.get("requests", 0)
+            # Kết nối bị đóng sớm được urllib3 mở lại mà không tăng num_connections
+            discarded = host_counters.get("connections_discarded", 0)
+            reused = max(0, requests_count - connections_opened - discarded)
+            result[host] = {
+                "requests": requests_count,
+                "connections_opened": connections_opened,
+                "connections_reused": reused,
+                "reuse_ratio": round(reused / requests_count, 3) if requests_count else 0.0,
+                "connections_discarded": discarded,
+                "wire_bytes": host_counters.get("wire_bytes", 0),
+                "decoded_bytes": host_counters.get("decoded_bytes", 0),
+            }
+        return result
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._adapters.clear()
+            self._counters.clear()
+
+
+# Singleton instance
+http_client = CrawlerHttpClient()
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from prometheus_client import Counter
+import logging
+
+from app.database import SessionLocal
+from app.crud import llm_cache_crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cache kết quả LLM trong DB (bảng llm_response_cache), dùng chung giữa các pod và các lần chạy
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "720"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "512"))
+LLM_CACHE_EVICT_INTERVAL_SECONDS = float(os.getenv("LLM_CACHE_EVICT_INTERVAL_SECONDS", "600"))
+
+# Metrics cho Prometheus (endpoint /metrics)
+LLM_CACHE_REQUESTS = Counter(
+    "news_llm_cache_requests_total", "Số lần tra cache kết quả LLM", ["operation", "result"]
+)
+LLM_CACHE_EVICTIONS = Counter(
+    "news_llm_cache_evictions_total", "Số entry cache LLM bị xóa (hết hạn / vượt giới hạn)"
+)
+LLM_CACHE_ERRORS = Counter(
+    "news_llm_cache_errors_total", "Số lỗi DB khi đọc / ghi cache LLM (coi như miss)", ["action"]
+)
+
+
+def _normalize(value: Any) -> Any:
+    """Chuẩn hóa input để khác biệt khoảng trắng / dạng Unicode không làm trượt cache"""
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    return value
+
+
+def make_cache_key(model_name: str, operation: str, prompt_version: int, *inputs: Any) -> str:
+    raw = json.dumps(
+        [model_name, operation, prompt_version, [_normalize(v) for v in inputs]],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache persistent cho kết quả LLM đã parse (JSON), khóa theo nội dung:
+    sha256(model, loại phân tích, phiên bản prompt, input đã chuẩn hóa).
+    Đổi prompt thì tăng phiên bản để không dùng lại kết quả cũ.
+    Lỗi DB chỉ được log và coi như miss - cache không bao giờ làm hỏng việc phân tích.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = LLM_CACHE_ENABLED,
+        ttl_hours: float = LLM_CACHE_TTL_HOURS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_mb: float = LLM_CACHE_MAX_MB,
+        evict_interval_seconds: float = LLM_CACHE_EVICT_INTERVAL_SECONDS
+    ):
+        self.enabled = enabled
+        self.ttl = timedelta(hours=ttl_hours)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.evict_interval_seconds = evict_interval_seconds
+        self._lock = threading.Lock()
+        self._last_evict = time.monotonic()
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0, "errors": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def get(self, cache_key: str, operation: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        db = SessionLocal()
+        try:
+            cached = llm_cache_crud.get_cached_response(db, cache_key)
+        except Exception as e:
+            db.rollback()
+            LLM_CACHE_ERRORS.labels("get").inc()
+            self._count("errors")
+            logger.info(f"⚠️ Lỗi khi đọc cache LLM: {e}")
+            cached = None
+        finally:
+            db.close()
+
+        if cached is None:
+            LLM_CACHE_REQUESTS.labels(operation, "miss").inc()
+            self._count("misses")
+            return None
+        LLM_CACHE_REQUESTS.labels(operation, "hit").inc()
+        self._count("hits")
+        return json.loads(cached)
+
+    def set(self, cache_key: str, operation: str, model_name: str, value: Any):
+        if not self.enabled:
+            return
+        db = SessionLocal()
+        try:
+            llm_cache_crud.put_cached_response(
+                db, cache_key, model_name, operation,
+                json.dumps(value, ensure_ascii=False), self.ttl
+            )
+            self._count("writes")
+        except Exception as e:
+            db.rollback()
+            LLM_CACHE_ERRORS.labels("set").inc()
+            self._count("errors")
+            logger.info(f"⚠️ Lỗi khi ghi cache LLM: {e}")
+        finally:
+            db.close()
+        self._maybe_evict()
+
+    def _maybe_evict(self):
+        with self._lock:
+            if time.monotonic() - self._last_evict < self.evict_interval_seconds:
+                return
+            self._last_evict = time.monotonic()
+        self.evict()
+
+    def evict(self) -> int:
+        db = SessionLocal()
+        try:
+            deleted = llm_cache_crud.evict_cached_responses(db, self.max_entries, self.max_bytes)
+        except Exception as e:
+            db.rollback()
+            LLM_CACHE_ERRORS.labels("evict").inc()
+            self._count("errors")
+            logger.info(f"⚠️ Lỗi khi dọn cache LLM: {e}")
+            return 0
+        finally:
+            db.close()
+        if deleted:
+            LLM_CACHE_EVICTIONS.inc(deleted)
+            self._count("evicted", deleted)
+            logger.info(f"🧹 Đã xóa {deleted} entry cache LLM")
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "enabled": self.enabled,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+llm_response_cache = LLMResponseCache()
@@ -0,0 +1,220 @@
+import os
+import re
+import time
+import random
+import threading
+import unicodedata
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Phát hiện bài gần trùng (cùng tin đăng lại ở nhiều nguồn với câu chữ hơi khác)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+# Ngưỡng Jaccard ước lượng trên shingle của tiêu đề + tóm tắt
+# (tin theo mẫu hằng ngày như "Giá vàng hôm nay 14/7..." giống nhau ~0.5-0.7 dù khác tin)
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "64"))
+# Số âm tiết mỗi shingle
+NEAR_DUP_SHINGLE_SIZE = int(os.getenv("NEAR_DUP_SHINGLE_SIZE", "2"))
+# Chỉ so với các bài trong khoảng thời gian gần đây
+NEAR_DUP_WINDOW_HOURS = float(os.getenv("NEAR_DUP_WINDOW_HOURS", "72"))
+# Định kỳ nạp thêm bài do pod khác vừa chèn
+NEAR_DUP_REFRESH_SECONDS = float(os.getenv("NEAR_DUP_REFRESH_SECONDS", "30"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize_text(text: Optional[str]) -> List[str]:
+    """NFC + chữ thường + bỏ dấu câu, trả về danh sách âm tiết"""
+    if not text:
+        return []
+    return _WORD_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+
+def title_numbers(title: Optional[str]) -> frozenset:
+    """Các số trong tiêu đề (ngày, giá, tỷ lệ...): bài theo mẫu chỉ khác nhau ở phần này"""
+    return frozenset(_NUMBER_RE.findall(title or ""))
+
+
+def shingles(title: Optional[str], summary: Optional[str], size: int = NEAR_DUP_SHINGLE_SIZE) -> set:
+    words = normalize_text(title) + normalize_text(summary)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Chọn (số band, số hàng mỗi band) sao cho ngưỡng LSH (1/b)^(1/r) gần nhất
+    và không vượt quá threshold (ưu tiên không bỏ sót, ứng viên sẽ được kiểm tra lại).
+    """
+    best = (num_perm, 1)
+    best_gap = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        lsh_threshold = (1 / bands) ** (1 / rows)
+        if lsh_threshold > threshold:
+            continue
+        gap = threshold - lsh_threshold
+        if best_gap is None or gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NEAR_DUP_NUM_PERM, seed: int = 1):
+        # Seed cố định để chữ ký giống nhau giữa các pod / lần chạy
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, tokens: set) -> Tuple[int, ...]:
+        if not tokens:
+            return tuple([_MAX_HASH] * self.num_perm)
+        hashes = [zlib.crc32(token.encode('utf-8')) for token in tokens]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+            for a, b in self.permutations
+        )
+
+
+def estimate_similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """
+    Chỉ mục MinHash LSH trong bộ nhớ cho các bài gốc (canonical) trong NEAR_DUP_WINDOW_HOURS gần nhất.
+    Tra cứu: băm chữ ký thành các band, lấy ứng viên trùng band rồi kiểm tra Jaccard ước lượng.
+    Ứng viên phải có cùng tập số trong tiêu đề: tin theo mẫu khác ngày / khác giá không bị gộp.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, num_perm: Optional[int] = None,
+                 window_hours: Optional[float] = None):
+        self.threshold = threshold or NEAR_DUP_THRESHOLD
+        self.window = timedelta(hours=window_hours or NEAR_DUP_WINDOW_HOURS)
+        self.hasher = MinHasher(num_perm or NEAR_DUP_NUM_PERM)
+        self.bands, self.rows = optimal_bands(self.threshold, self.hasher.num_perm)
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: Dict[int, Tuple[Tuple[int, ...], datetime, frozenset]] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.last_article_id = 0
+        self.refreshed_at = 0.0
+        self.counters = {"lookups": 0, "candidates": 0, "matches": 0, "lookup_seconds": 0.0}
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def signature_for(self, title: Optional[str], summary: Optional[str]) -> Tuple[int, ...]:
+        return self.hasher.signature(shingles(title, summary))
+
+    def add(self, article_id: int, signature: Tuple[int, ...], created_at: Optional[datetime] = None,
+            numbers: frozenset = frozenset()):
+        with self._lock:
+            if article_id in self._signatures:
+                return
+            self._signatures[article_id] = (signature, created_at or datetime.utcnow(), numbers)
+            for band, key in self._band_keys(signature):
+                self._buckets[band][key].append(article_id)
+
+    def find(self, signature: Tuple[int, ...], exclude_id: Optional[int] = None,
+             numbers: frozenset = frozenset()) -> Optional[Tuple[int, float]]:
+        """Trả về (id bài gốc giống nhất, độ tương đồng) nếu vượt ngưỡng, ngược lại None"""
+        started = time.perf_counter()
+        cutoff = datetime.utcnow() - self.window
+        best = None
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates.discard(exclude_id)
+            for candidate_id in candidates:
+                candidate_signature, created_at, candidate_numbers = self._signatures[candidate_id]
+                if created_at < cutoff or candidate_numbers != numbers:
+                    continue
+                similarity = estimate_similarity(signature, candidate_signature)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (candidate_id, similarity)
+            self.counters["lookups"] += 1
+            self.counters["candidates"] += len(candidates)
+            self.counters["matches"] += 1 if best else 0
+            self.counters["lookup_seconds"] += time.perf_counter() - started
+        return best
+
+    def prune(self):
+        """Bỏ các bài đã ra khỏi cửa sổ thời gian"""
+        cutoff = datetime.utcnow() - self.window
+        with self._lock:
+            expired = [aid for aid, (_, created_at, _) in self._signatures.items() if created_at < cutoff]
+            for article_id in expired:
+                signature, _, _ = self._signatures.pop(article_id)
+                for band, key in self._band_keys(signature):
+                    bucket = self._buckets[band].get(key)
+                    if bucket is None:
+                        continue
+                    if article_id in bucket:
+                        bucket.remove(article_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+        return len(expired)
+
+    def warm_load(self, db, min_id: int = 0):
+        """Nạp các bài gốc trong cửa sổ thời gian (có id > min_id) từ DB"""
+        from app.models.article_model import Article
+
+        started = time.monotonic()
+        rows = db.query(Article.id, Article.title, Article.summary, Article.created_at)\
+                 .filter(Article.id > min_id)\
+                 .filter(Article.created_at >= datetime.utcnow() - self.window)\
+                 .filter(Article.canonical_article_id.is_(None))\
+                 .execution_options(yield_per=5000)
+        loaded = 0
+        for article_id, title, summary, created_at in rows:
+            if article_id not in self._signatures:
+                self.add(article_id, self.signature_for(title, summary), created_at, title_numbers(title))
+                loaded += 1
+            self.last_article_id = max(self.last_article_id, article_id)
+        self.loaded = True
+        self.refreshed_at = time.monotonic()
+        if loaded or not min_id:
+            logger.info(f"🧬 Near-duplicate index: nạp {loaded} bài trong {time.monotonic() - started:.2f}s")
+
+    def ensure_loaded(self, db):
+        """Gọi trước khi chèn bài mới: lần đầu nạp toàn bộ, sau đó định kỳ nạp thêm và dọn bài cũ"""
+        if not self.loaded:
+            self.warm_load(db)
+        elif time.monotonic() - self.refreshed_at >= NEAR_DUP_REFRESH_SECONDS:
+            self.warm_load(db, min_id=self.last_article_id)
+            self.prune()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["lookups"]
+        return {
+            "indexed": len(self._signatures),
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+            "lookups": lookups,
+            "matches": self.counters["matches"],
+            "avg_candidates": round(self.counters["candidates"] / lookups, 2) if lookups else 0.0,
+            "avg_lookup_ms": round(self.counters["lookup_seconds"] / lookups * 1000, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+near_duplicate_index = NearDuplicateIndex()
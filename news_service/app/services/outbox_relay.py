@@ -0,0 +1,248 @@
+import os
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.database import SessionLocal
+from app.crud import event_outbox_crud
+from app.services.event_publisher import event_publisher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Số event gửi mỗi lô (cả lô chờ publisher confirm cùng lúc)
+OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "200"))
+OUTBOX_RELAY_POLL_SECONDS = float(os.getenv("OUTBOX_RELAY_POLL_SECONDS", "2"))
+# Gửi lỗi thì thử lại với backoff lũy thừa, event không bao giờ bị bỏ
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "5"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "300"))
+# Giữ event đã gửi để tra cứu, sau đó xóa
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+OUTBOX_CLEANUP_INTERVAL_SECONDS = float(os.getenv("OUTBOX_CLEANUP_INTERVAL_SECONDS", "3600"))
+# Chạy relay trong process API; các pod khác cùng chạy vẫn an toàn nhờ SKIP LOCKED
+OUTBOX_RELAY_IN_APP = os.getenv("OUTBOX_RELAY_IN_APP", "true").lower() == "true"
+
+# Metrics cho Prometheus (endpoint /metrics)
+OUTBOX_EVENTS_PUBLISHED = Counter(
+    "news_outbox_events_published_total", "Số event outbox đã được broker xác nhận", ["event_type"]
+)
+OUTBOX_PUBLISH_FAILURES = Counter(
+    "news_outbox_publish_failures_total", "Số lần gửi event outbox bị lỗi", ["event_type"]
+)
+OUTBOX_BATCH_SECONDS = Histogram(
+    "news_outbox_relay_batch_seconds", "Thời gian gửi một lô event (gồm chờ publisher confirm)"
+)
+OUTBOX_BATCH_SIZE = Histogram(
+    "news_outbox_relay_batch_size", "Số event mỗi lô relay",
+    buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000)
+)
+OUTBOX_PUBLISH_LAG_SECONDS = Histogram(
+    "news_outbox_publish_lag_seconds", "Độ trễ từ lúc ghi outbox đến khi broker xác nhận",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+)
+OUTBOX_PENDING_EVENTS = Gauge(
+    "news_outbox_pending_events", "Số event trong outbox chưa được gửi"
+)
+
+
+def _retry_at(attempts: int) -> datetime:
+    delay = min(OUTBOX_RETRY_BASE_SECONDS * (2 ** attempts), OUTBOX_RETRY_MAX_SECONDS)
+    return datetime.utcnow() + timedelta(seconds=delay)
+
+
+class OutboxRelay:
+    """
+    Đọc bảng event_outbox và gửi sang RabbitMQ theo lô:
+    - Claim lô event chưa gửi bằng FOR UPDATE SKIP LOCKED (giữ khóa đến khi ghi kết quả)
+    - Gửi cả lô liên tiếp rồi chờ publisher confirm của cả lô
+    - Event được xác nhận -> published_at; lỗi -> tăng attempts và lên lịch thử lại
+    Giao hàng at-least-once: nếu relay chết sau khi gửi mà trước khi commit, event sẽ được gửi lại.
+    """
+
+    def __init__(self, publisher=None, batch_size: Optional[int] = None, poll_seconds: Optional[float] = None):
+        self.publisher = publisher or event_publisher
+        self.batch_size = max(1, batch_size or OUTBOX_RELAY_BATCH_SIZE)
+        self.poll_seconds = poll_seconds or OUTBOX_RELAY_POLL_SECONDS
+        # Một thread cho mọi thao tác DB: session của lô được dùng tuần tự trên cùng thread
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_cleanup = 0.0
+        self.counters = {"batches": 0, "published": 0, "failed": 0, "publish_seconds": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def notify(self):
+        """Báo có event mới trong outbox để relay gửi ngay thay vì chờ hết chu kỳ poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        return self._executor
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"📮 Outbox relay đã chạy (lô {self.batch_size} event)")
+
+    async def stop(self):
+        was_running = self.running
+        if was_running:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if was_running:
+            logger.info("🛑 Outbox relay đã dừng")
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.relay_batch()
+                # Lô đầy: có thể còn event, gửi tiếp ngay
+                if sent >= self.batch_size:
+                    continue
+                await self._maybe_cleanup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"❌ Lỗi outbox relay: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def relay_batch(self) -> int:
+        """Gửi một lô event, trả về số event đã claim"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        db = SessionLocal()
+        try:
+            events = await loop.run_in_executor(
+                executor, event_outbox_crud.claim_unpublished_events, db, self.batch_size
+            )
+            if not events:
+                await loop.run_in_executor(executor, self._finish_idle, db)
+                return 0
+
+            started = time.monotonic()
+            try:
+                errors = await self.publisher.publish_batch([
+                    (event.exchange, event.routing_key, event.payload.encode('utf-8'))
+                    for event in events
+                ])
+            except Exception as e:
+                # Không kết nối được broker: cả lô thử lại sau
+                errors = [e] * len(events)
+            elapsed = time.monotonic() - started
+
+            # Ghi metrics trước khi commit (sau commit các object bị expire)
+            self._record_batch(events, errors, elapsed)
+            await loop.run_in_executor(executor, self._finish_batch, db, events, errors)
+            return len(events)
+        finally:
+            await loop.run_in_executor(executor, db.close)
+
+    def _finish_idle(self, db):
+        db.rollback()
+        OUTBOX_PENDING_EVENTS.set(event_outbox_crud.count_unpublished_events(db))
+
+    def _finish_batch(self, db, events: List[Any], errors: List[Optional[BaseException]]):
+        """Ghi kết quả gửi trong cùng transaction đang giữ khóa các event"""
+        try:
+            published_ids = []
+            for event, error in zip(events, errors):
+                if error is None:
+                    published_ids.append(event.id)
+                else:
+                    event_outbox_crud.mark_event_failed(db, event, repr(error), _retry_at(event.attempts or 0))
+            event_outbox_crud.mark_events_published(db, published_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        OUTBOX_PENDING_EVENTS.set(event_outbox_crud.count_unpublished_events(db))
+
+    def _record_batch(self, events: List[Any], errors: List[Optional[BaseException]], elapsed: float):
+        now = datetime.utcnow()
+        published = 0
+        for event, error in zip(events, errors):
+            if error is None:
+                published += 1
+                OUTBOX_EVENTS_PUBLISHED.labels(event.event_type).inc()
+                if event.created_at is not None:
+                    OUTBOX_PUBLISH_LAG_SECONDS.observe(max(0.0, (now - event.created_at).total_seconds()))
+            else:
+                OUTBOX_PUBLISH_FAILURES.labels(event.event_type).inc()
+        OUTBOX_BATCH_SECONDS.observe(elapsed)
+        OUTBOX_BATCH_SIZE.observe(len(events))
+
+        self.counters["batches"] += 1
+        self.counters["published"] += published
+        self.counters["failed"] += len(events) - published
+        self.counters["publish_seconds"] += elapsed
+        if published < len(events):
+            first_error = next(error for error in errors if error is not None)
+            logger.info(f"⚠️ Outbox: {len(events) - published}/{len(events)} event gửi lỗi, sẽ thử lại: {first_error}")
+        else:
+            logger.info(f"📤 Outbox: đã gửi {published} event trong {elapsed * 1000:.0f}ms")
+
+    async def _maybe_cleanup(self):
+        if time.monotonic() - self._last_cleanup < OUTBOX_CLEANUP_INTERVAL_SECONDS:
+            return
+        self._last_cleanup = time.monotonic()
+        loop = asyncio.get_running_loop()
+        before = datetime.utcnow() - timedelta(hours=OUTBOX_RETENTION_HOURS)
+        db = SessionLocal()
+        try:
+            deleted = await loop.run_in_executor(
+                self._get_executor(), event_outbox_crud.delete_published_events, db, before
+            )
+        finally:
+            db.close()
+        if deleted:
+            logger.info(f"🧹 Outbox: xóa {deleted} event đã gửi")
+
+    async def drain(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Gửi hết event đang chờ rồi trả về (dùng cho pod chạy một lần như scheduler).
+        Event gửi lỗi được để lại cho lần thử sau, không gửi lại ngay trong lần drain này.
+        """
+        batches = 0
+        failed_before = self.counters["failed"]
+        while max_batches is None or batches < max_batches:
+            sent = await self.relay_batch()
+            batches += 1
+            if sent < self.batch_size or self.counters["failed"] > failed_before:
+                break
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters["batches"]
+        publish_seconds = self.counters["publish_seconds"]
+        return {
+            **self.counters,
+            "running": self.running,
+            "batch_size": self.batch_size,
+            "avg_batch_size": round(self.counters["published"] / batches, 2) if batches else 0.0,
+            "events_per_second": round(self.counters["published"] / publish_seconds, 1) if publish_seconds else 0.0,
+        }
+
+
+# Singleton instance
+outbox_relay = OutboxRelay()
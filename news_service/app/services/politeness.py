@@ -0,0 +1,170 @@
+import os
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tốc độ mặc định cho mỗi domain: số request/giây và số request được phép dồn (burst)
+CRAWL_DOMAIN_RATE = float(os.getenv("CRAWL_DOMAIN_RATE", "1.0"))
+CRAWL_DOMAIN_BURST = float(os.getenv("CRAWL_DOMAIN_BURST", "2"))
+# Cấu hình riêng theo domain, ví dụ: "vnexpress.net=2:4,cafef.vn=0.5:1" (rate:burst)
+CRAWL_DOMAIN_LIMITS = os.getenv("CRAWL_DOMAIN_LIMITS", "")
+CRAWL_BACKOFF_BASE_SECONDS = float(os.getenv("CRAWL_BACKOFF_BASE_SECONDS", "5"))
+CRAWL_MAX_BACKOFF_SECONDS = float(os.getenv("CRAWL_MAX_BACKOFF_SECONDS", "300"))
+
+# Mã trạng thái báo server đang quá tải / giới hạn tốc độ
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_domain_limits(spec: str) -> Dict[str, tuple]:
+    """Parse "domain=rate:burst,..." thành {domain: (rate, burst)}"""
+    limits = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        domain, value = item.split("=", 1)
+        rate, _, burst = value.partition(":")
+        try:
+            limits[domain.strip().lower()] = (float(rate), float(burst or rate))
+        except ValueError:
+            logger.warning(f"⚠️ Bỏ qua cấu hình politeness không hợp lệ: {item}")
+    return limits
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After có thể là số giây hoặc HTTP-date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def domain_of(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class DomainBucket:
+    """
+    Token bucket cho một domain, kèm backoff thích ứng:
+    - Bị 429/503: chặn tới hết Retry-After (hoặc backoff lũy thừa) và giảm một nửa tốc độ
+    - Thành công: tăng dần tốc độ trở lại mức cấu hình
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.base_rate = max(rate, 0.001)
+        self.rate = self.base_rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Đặt trước một token, trả về số giây cần chờ trước khi được gửi request"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def on_throttled(self, retry_after: Optional[float]) -> float:
+        self.consecutive_throttles += 1
+        if retry_after is None:
+            backoff = CRAWL_BACKOFF_BASE_SECONDS * (2 ** (self.consecutive_throttles - 1))
+            retry_after = backoff * (0.5 + random.random() / 2)
+        delay = min(retry_after, CRAWL_MAX_BACKOFF_SECONDS)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        return delay
+
+    def on_success(self):
+        self.consecutive_throttles = 0
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+class PolitenessLimiter:
+    """
+    Giới hạn tốc độ request theo domain cho crawler chạy đồng thời.
+    Các domain khác nhau chạy song song, mỗi domain có token bucket riêng.
+    """
+
+    def __init__(self, default_rate: Optional[float] = None, default_burst: Optional[float] = None,
+                 domain_limits: Optional[Dict[str, tuple]] = None):
+        self.default_rate = default_rate or CRAWL_DOMAIN_RATE
+        self.default_burst = default_burst or CRAWL_DOMAIN_BURST
+        self.domain_limits = domain_limits if domain_limits is not None else parse_domain_limits(CRAWL_DOMAIN_LIMITS)
+        self._buckets: Dict[str, DomainBucket] = {}
+
+    def _bucket(self, url: str) -> DomainBucket:
+        domain = domain_of(url)
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            rate, burst = self.domain_limits.get(domain, (self.default_rate, self.default_burst))
+            bucket = DomainBucket(rate, burst)
+            self._buckets[domain] = bucket
+        return bucket
+
+    async def acquire(self, url: str) -> float:
+        """Chờ tới lượt gửi request tới domain của url, trả về số giây đã chờ"""
+        bucket = self._bucket(url)
+        waited = 0.0
+        wait = bucket.reserve()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+            # Domain có thể vừa bị 429/503 trong lúc chờ
+            wait = bucket.blocked_until - time.monotonic()
+        return waited
+
+    def record_response(self, url: str, status_code: Optional[int], retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Cập nhật trạng thái domain theo response.
+        Trả về số giây backoff nếu domain đang bị giới hạn (429/503), ngược lại None.
+        """
+        bucket = self._bucket(url)
+        if status_code in THROTTLE_STATUS_CODES:
+            delay = bucket.on_throttled(parse_retry_after(retry_after))
+            logger.info(f"🐢 {domain_of(url)} trả {status_code}, tạm dừng {delay:.1f}s, tốc độ còn {bucket.rate:.2f} req/s")
+            return delay
+        if status_code is not None and status_code < 400:
+            bucket.on_success()
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            domain: {
+                "rate": round(bucket.rate, 3),
+                "base_rate": bucket.base_rate,
+                "burst": bucket.burst,
+                "blocked_for_seconds": round(max(0.0, bucket.blocked_until - now), 1),
+                "consecutive_throttles": bucket.consecutive_throttles,
+            }
+            for domain, bucket in self._buckets.items()
+        }
+
+
+# Singleton instance
+politeness_limiter = PolitenessLimiter()
@@ -0,0 +1,129 @@
+import os
+import re
+import unicodedata
+from typing import List, Optional
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tìm kiếm toàn văn trên articles.search_text (tiêu đề + tóm tắt + tóm tắt AI, đã bỏ dấu):
+# - Postgres: cột sinh search_vector (tsvector) + GIN index
+# - SQLite: bảng ảo FTS5 articles_fts đồng bộ bằng trigger
+# Cấu hình text search của Postgres; "simple" vì đã tự bỏ dấu, không có stemmer tiếng Việt
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+# Giới hạn số từ trong truy vấn để câu truy vấn dài không làm chậm DB
+SEARCH_MAX_QUERY_TERMS = int(os.getenv("SEARCH_MAX_QUERY_TERMS", "12"))
+
+SEARCH_VECTOR_COLUMN = "search_vector"
+SEARCH_FTS_TABLE = "articles_fts"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Ký tự có nghĩa trong cú pháp websearch_to_tsquery: cụm "..." và loại trừ -từ, or
+_WEBSEARCH_STRIP_RE = re.compile(r"[^\w\s\"-]", re.UNICODE)
+
+
+def fold_vietnamese(value: Optional[str]) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt (kể cả đ -> d), gộp khoảng trắng: "Đồng Việt" -> "dong viet" """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFD", value.lower().replace("đ", "d"))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(unicodedata.normalize("NFC", stripped).split())
+
+
+def build_search_text(title: Optional[str], summary: Optional[str], ai_summary: Optional[str] = None) -> str:
+    """Nội dung đánh chỉ mục tìm kiếm của một bài"""
+    return fold_vietnamese(" ".join(part for part in (title, summary, ai_summary) if part))
+
+
+def query_terms(query: Optional[str]) -> List[str]:
+    return _WORD_RE.findall(fold_vietnamese(query))[:SEARCH_MAX_QUERY_TERMS]
+
+
+def websearch_query(query: Optional[str]) -> str:
+    """Truy vấn cho websearch_to_tsquery: giữ "cụm từ" và -loại trừ, bỏ dấu như search_text"""
+    return _WEBSEARCH_STRIP_RE.sub(" ", fold_vietnamese(query))
+
+
+def fts5_match_query(query: Optional[str]) -> str:
+    """
+    Biểu thức MATCH của FTS5: mọi từ đều phải có (AND), -từ bị loại trừ;
+    mỗi từ được quote để bỏ qua cú pháp FTS5 trong truy vấn của người dùng.
+    """
+    included, excluded = [], []
+    for token in fold_vietnamese(query).split():
+        for index, term in enumerate(_WORD_RE.findall(token)):
+            # "-sjc" loại trừ, "covid-19" vẫn là hai từ bắt buộc
+            (excluded if index == 0 and token.startswith("-") else included).append(f'"{term}"')
+    included, excluded = included[:SEARCH_MAX_QUERY_TERMS], excluded[:SEARCH_MAX_QUERY_TERMS]
+    if not included:
+        return ""
+    return " ".join(included) + "".join(f" NOT {term}" for term in excluded)
+
+
+def ensure_search_index(engine) -> bool:
+    """
+    Tạo cấu trúc tìm kiếm cho articles.search_text nếu chưa có (chạy lại an toàn, gọi từ init_db).
+    Trả về False nếu không tạo được (DB khác Postgres / SQLite thì search_articles lọc bằng LIKE).
+    """
+    dialect = engine.dialect.name
+    try:
+        if dialect == "postgresql":
+            _ensure_postgres_index(engine)
+        elif dialect == "sqlite":
+            _ensure_sqlite_fts(engine)
+        else:
+            return False
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Không thể tạo chỉ mục tìm kiếm ({dialect}): {e}")
+        return False
+
+
+def _ensure_postgres_index(engine):
+    # Cột sinh tự cập nhật khi search_text đổi, không cần trigger
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE articles ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_TS_CONFIG}', coalesce(search_text, ''))) STORED"
+        ))
+    # CONCURRENTLY để không khóa ghi bảng lớn; phải chạy ngoài transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_articles_{SEARCH_VECTOR_COLUMN} "
+            f"ON articles USING gin ({SEARCH_VECTOR_COLUMN})"
+        ))
+
+
+def _ensure_sqlite_fts(engine):
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": SEARCH_FTS_TABLE}
+        ).first()
+        # Bảng external content: FTS5 chỉ lưu chỉ mục, nội dung đọc từ articles
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5("
+            f"search_text, content='articles', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_ai AFTER INSERT ON articles BEGIN "
+            f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_ad AFTER DELETE ON articles BEGIN "
+            f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, search_text) "
+            f"VALUES ('delete', old.id, old.search_text); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_au AFTER UPDATE OF search_text ON articles BEGIN "
+            f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, search_text) "
+            f"VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        ))
+        if not exists:
+            # Đánh chỉ mục các bài đã có trước khi tạo bảng FTS
+            conn.execute(text(f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) VALUES ('rebuild')"))
+            logger.info(f"✅ Đã tạo chỉ mục FTS5 {SEARCH_FTS_TABLE}")
@@ -0,0 +1,281 @@
+import os
+import json
+import math
+import time
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bloom filter đứng trước bảng articles: chỉ các URL/hash "có thể đã có" mới phải hỏi DB
+SEEN_FILTER_ENABLED = os.getenv("SEEN_FILTER_ENABLED", "true").lower() == "true"
+SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", "1000000"))
+SEEN_FILTER_FP_RATE = float(os.getenv("SEEN_FILTER_FP_RATE", "0.001"))
+# Số key gần đây được xác nhận đã có trong DB, trả lời chắc chắn mà không cần truy vấn
+SEEN_FILTER_LRU_SIZE = int(os.getenv("SEEN_FILTER_LRU_SIZE", "20000"))
+# Định kỳ nạp thêm các article do pod khác vừa chèn
+SEEN_FILTER_REFRESH_SECONDS = float(os.getenv("SEEN_FILTER_REFRESH_SECONDS", "30"))
+# Quét lùi một khoảng ID vì transaction có ID nhỏ hơn có thể commit muộn hơn
+SEEN_FILTER_REFRESH_OVERLAP = int(os.getenv("SEEN_FILTER_REFRESH_OVERLAP", "1000"))
+# File lưu filter giữa các lần chạy pod scheduler (cần volume bền vững), bỏ trống để tắt
+SEEN_FILTER_PATH = os.getenv("SEEN_FILTER_PATH", "")
+
+# Version 2: key "url" là canonical_url
+_FILE_VERSION = 2
+
+
+class BloomFilter:
+    """Bloom filter dùng double hashing trên blake2b, không có false negative"""
+
+    def __init__(self, capacity: int, fp_rate: float, num_bits: Optional[int] = None,
+                 num_hashes: Optional[int] = None, bits: Optional[bytearray] = None):
+        self.capacity = capacity = max(1, capacity)
+        self.num_bits = num_bits or max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        added = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        # Chỉ đếm key chưa có để nạp lại phần chồng lấn không làm filter "đầy" giả
+        if added:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _LRUSet:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def add(self, key: str):
+        self._items[key] = None
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._items:
+            self._items.move_to_end(key)
+            return True
+        return False
+
+
+class SeenFilter:
+    """
+    Bộ lọc URL / content hash đã lưu, nằm trước các truy vấn kiểm tra trùng:
+    - Không có trong Bloom filter -> chắc chắn là bài mới, không cần hỏi DB
+    - Có trong LRU các key gần đây -> chắc chắn đã có
+    - Còn lại ("có thể đã có") mới gửi truy vấn IN xuống DB
+    Được nạp từ bảng articles (hoặc từ file đã lưu) ở lần dùng đầu tiên.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, fp_rate: Optional[float] = None,
+                 lru_size: Optional[int] = None, path: Optional[str] = None):
+        self.capacity = capacity or SEEN_FILTER_CAPACITY
+        self.fp_rate = fp_rate or SEEN_FILTER_FP_RATE
+        self.lru_size = lru_size or SEEN_FILTER_LRU_SIZE
+        self.path = SEEN_FILTER_PATH if path is None else path
+        self._lock = threading.Lock()
+        self._reset(self.capacity)
+        self.counters = {"checks": 0, "definitely_new": 0, "lru_hits": 0, "db_checks": 0, "false_positives": 0}
+
+    def _reset(self, capacity: int):
+        self._filters = {
+            "url": BloomFilter(capacity, self.fp_rate),
+            "hash": BloomFilter(capacity, self.fp_rate),
+        }
+        self._recent = {"url": _LRUSet(self.lru_size), "hash": _LRUSet(self.lru_size)}
+        self.loaded = False
+        self.last_article_id = 0
+        self.refreshed_at = 0.0
+
+    # ---- Nạp dữ liệu ----
+
+    def _load_rows(self, db, min_id: int) -> int:
+        from sqlalchemy import func
+        from app.models.article_model import Article
+
+        # Bài cũ chưa backfill canonical_url dùng tạm url gốc
+        rows = db.query(Article.id, func.coalesce(Article.canonical_url, Article.url), Article.content_hash)\
+                 .filter(Article.id > min_id)\
+                 .execution_options(yield_per=10000)
+        loaded = 0
+        for article_id, url, content_hash in rows:
+            self._add_unlocked(url, content_hash, remember=False)
+            self.last_article_id = max(self.last_article_id, article_id)
+            loaded += 1
+        return loaded
+
+    def warm_load(self, db):
+        """Nạp filter từ file đã lưu (nếu có) rồi bổ sung các article mới hơn từ DB"""
+        from app.models.article_model import Article
+
+        started = time.monotonic()
+        with self._lock:
+            if not (self.path and self._load_file(self.path)):
+                # Chừa chỗ để filter không đầy quá nhanh khi bảng lớn dần
+                total = db.query(Article).count()
+                self._reset(max(self.capacity, total * 2))
+            loaded = self._load_rows(db, max(0, self.last_article_id - SEEN_FILTER_REFRESH_OVERLAP))
+            self.loaded = True
+            self.refreshed_at = time.monotonic()
+        logger.info(
+            f"🧮 Seen filter: nạp {loaded} article từ DB trong {time.monotonic() - started:.2f}s "
+            f"({self._filters['url'].count} key, last_id={self.last_article_id})"
+        )
+
+    def ensure_fresh(self, db):
+        """Lần đầu nạp toàn bộ, sau đó định kỳ nạp thêm các article do tiến trình khác chèn"""
+        if not self.loaded:
+            self.warm_load(db)
+            return
+        if time.monotonic() - self.refreshed_at < SEEN_FILTER_REFRESH_SECONDS:
+            return
+        with self._lock:
+            self._load_rows(db, max(0, self.last_article_id - SEEN_FILTER_REFRESH_OVERLAP))
+            self.refreshed_at = time.monotonic()
+
+    # ---- Thêm / kiểm tra ----
+
+    def _add_unlocked(self, url: Optional[str], content_hash: Optional[str], remember: bool = True):
+        for kind, key in (("url", url), ("hash", content_hash)):
+            if not key:
+                continue
+            self._filters[kind].add(key)
+            if remember:
+                self._recent[kind].add(key)
+
+    def add(self, url: Optional[str], content_hash: Optional[str]):
+        """
+        Ghi nhận article vừa lưu (gọi sau khi commit), url là canonical_url.
+        Không dời last_article_id để lần refresh sau vẫn quét được bài của pod khác chèn xen kẽ.
+        """
+        with self._lock:
+            self._add_unlocked(url, content_hash)
+
+    def split(self, kind: str, keys: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Chia keys thành (chắc chắn đã có, cần hỏi DB).
+        Các key không nằm trong hai tập này chắc chắn là mới.
+        """
+        known, maybe = set(), set()
+        with self._lock:
+            bloom, recent = self._filters[kind], self._recent[kind]
+            for key in keys:
+                self.counters["checks"] += 1
+                if key not in bloom:
+                    self.counters["definitely_new"] += 1
+                elif key in recent:
+                    self.counters["lru_hits"] += 1
+                    known.add(key)
+                else:
+                    maybe.add(key)
+            self.counters["db_checks"] += len(maybe)
+        return known, maybe
+
+    def confirm(self, kind: str, maybe: Set[str], found: Set[str]):
+        """Ghi nhận kết quả DB cho các key "có thể đã có" để lần sau khỏi hỏi lại"""
+        with self._lock:
+            self.counters["false_positives"] += len(maybe - found)
+            for key in found:
+                self._recent[kind].add(key)
+
+    # ---- Lưu file ----
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path or not self.loaded:
+            return
+        with self._lock:
+            header = {
+                "version": _FILE_VERSION,
+                "fp_rate": self.fp_rate,
+                "last_article_id": self.last_article_id,
+                "filters": {
+                    kind: {
+                        "capacity": f.capacity, "num_bits": f.num_bits,
+                        "num_hashes": f.num_hashes, "count": f.count
+                    }
+                    for kind, f in self._filters.items()
+                },
+            }
+            blobs = [zlib.compress(bytes(self._filters[kind].bits)) for kind in ("url", "hash")]
+        header["sizes"] = [len(blob) for blob in blobs]
+        header_bytes = json.dumps(header).encode('utf-8')
+
+        tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(len(header_bytes).to_bytes(4, 'little'))
+            f.write(header_bytes)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, path)
+        logger.info(f"💾 Đã lưu seen filter vào {path} (last_id={self.last_article_id})")
+
+    def _load_file(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                header_len = int.from_bytes(f.read(4), 'little')
+                header = json.loads(f.read(header_len).decode('utf-8'))
+                if header.get("version") != _FILE_VERSION or header.get("fp_rate") != self.fp_rate:
+                    return False
+                filters = {}
+                for kind, size in zip(("url", "hash"), header["sizes"]):
+                    meta = header["filters"][kind]
+                    bloom = BloomFilter(
+                        meta["capacity"], self.fp_rate,
+                        num_bits=meta["num_bits"], num_hashes=meta["num_hashes"],
+                        bits=bytearray(zlib.decompress(f.read(size)))
+                    )
+                    bloom.count = meta["count"]
+                    filters[kind] = bloom
+        except Exception as e:
+            logger.warning(f"⚠️ Không đọc được seen filter {path}: {e}")
+            return False
+
+        # Filter đã đầy quá thiết kế thì dựng lại từ DB để giữ tỉ lệ dương tính giả
+        if any(bloom.count > bloom.capacity for bloom in filters.values()):
+            logger.info(f"🧮 Seen filter trong {path} đã đầy, dựng lại từ DB")
+            return False
+
+        self._filters = filters
+        self._recent = {"url": _LRUSet(self.lru_size), "hash": _LRUSet(self.lru_size)}
+        self.last_article_id = header["last_article_id"]
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        checks = self.counters["checks"]
+        return {
+            **self.counters,
+            "loaded": self.loaded,
+            "keys": self._filters["url"].count,
+            "last_article_id": self.last_article_id,
+            "db_check_ratio": round(self.counters["db_checks"] / checks, 4) if checks else 0.0,
+        }
+
+
+# Singleton instance
+seen_filter = SeenFilter()
@@ -0,0 +1,78 @@
+import os
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+# Chuẩn hóa URL bài viết để cùng một bài (khác tham số tracking, fragment, host mobile,
+# đường dẫn tương đối / tuyệt đối) luôn có cùng canonical_url
+
+# Tham số tracking bị bỏ: khớp chính xác hoặc theo tiền tố (utm_*, vn_* của VnExpress...)
+URL_TRACKING_PARAMS = {
+    p.strip().lower() for p in os.getenv(
+        "URL_TRACKING_PARAMS",
+        "fbclid,gclid,dclid,msclkid,yclid,igshid,zarsrc,mc_cid,mc_eid,_ga,ref,ref_src,cmpid,ncid"
+    ).split(",") if p.strip()
+}
+URL_TRACKING_PARAM_PREFIXES = tuple(
+    p.strip().lower() for p in os.getenv("URL_TRACKING_PARAM_PREFIXES", "utm_,vn_,pk_").split(",") if p.strip()
+)
+# Tiền tố host của bản mobile / AMP trỏ về cùng bài với bản desktop
+URL_MOBILE_HOST_PREFIXES = tuple(
+    p.strip().lower() for p in os.getenv("URL_MOBILE_HOST_PREFIXES", "www.,m.,mobile.,amp.").split(",") if p.strip()
+)
+
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_MULTI_SLASH_RE = re.compile(r"/{2,}")
+# Ký tự giữ nguyên khi mã hóa lại path (RFC 3986 unreserved + sub-delims + ':' '@' '/')
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in URL_TRACKING_PARAMS or name.startswith(URL_TRACKING_PARAM_PREFIXES)
+
+
+def _canonical_host(hostname: str) -> str:
+    host = hostname.lower().rstrip(".")
+    for prefix in URL_MOBILE_HOST_PREFIXES:
+        # Chỉ bỏ tiền tố khi phần còn lại vẫn là một domain (giữ nguyên "m.vn")
+        if host.startswith(prefix) and host.count(".") >= 2:
+            return host[len(prefix):]
+    return host
+
+
+def canonicalize_url(url: Optional[str], base_url: Optional[str] = None) -> str:
+    """
+    Trả về dạng chuẩn của URL:
+    - Ghép với base_url nếu là đường dẫn tương đối ("/a", "a.html", "//host/a", "?p=1")
+    - https, host chữ thường, bỏ port mặc định, bỏ tiền tố www./m./amp.
+    - Bỏ fragment và tham số tracking, sắp xếp các tham số còn lại
+    - Gộp "//" trong path, bỏ "/" cuối, mã hóa phần trăm thống nhất
+    URL không phải http(s) (mailto:, javascript:...) được trả về nguyên vẹn.
+    """
+    if not url:
+        return url or ""
+    url = url.strip()
+    if base_url:
+        url = urljoin(base_url, url)
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return url
+
+    host = _canonical_host(parts.hostname)
+    port = parts.port
+    netloc = host if port is None or str(port) == _DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+
+    path = _MULTI_SLASH_RE.sub("/", parts.path or "/")
+    path = quote(unquote(path), safe=_PATH_SAFE)
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ))
+
+    return urlunsplit(("https", netloc, path, query, ""))
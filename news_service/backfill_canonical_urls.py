@@ -0,0 +1,87 @@
+import sys
+import argparse
+from datetime import datetime
+from sqlalchemy import update
+
+from app.database import SessionLocal, init_db
+from app.models import article_model as models
+from app.services.url_canonicalizer import canonicalize_url
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill_canonical_urls(batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """
+    Điền canonical_url cho các bài cũ theo lô id tăng dần (chạy lại an toàn, chỉ xử lý dòng còn NULL).
+    Bài có canonical_url trùng với bài khác (cùng bài, khác dạng URL) được giữ canonical_url NULL
+    và trỏ canonical_article_id về bài có id nhỏ hơn.
+    """
+    stats = {"scanned": 0, "updated": 0, "duplicates": 0}
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = db.query(models.Article.id, models.Article.url, models.Article.canonical_article_id)\
+                     .filter(models.Article.canonical_url.is_(None))\
+                     .filter(models.Article.id > last_id)\
+                     .order_by(models.Article.id)\
+                     .limit(batch_size)\
+                     .all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats["scanned"] += len(rows)
+
+            canonical_by_id = {row.id: canonicalize_url(row.url) for row in rows}
+            # canonical_url đã thuộc về bài khác trong DB
+            owners = dict(
+                db.query(models.Article.canonical_url, models.Article.id)
+                  .filter(models.Article.canonical_url.in_(set(canonical_by_id.values())))
+                  .all()
+            )
+
+            updates, duplicates = [], []
+            for row in rows:
+                canonical_url = canonical_by_id[row.id]
+                owner_id = owners.get(canonical_url)
+                if owner_id is None:
+                    owners[canonical_url] = row.id
+                    updates.append({"id": row.id, "canonical_url": canonical_url})
+                elif row.canonical_article_id is None:
+                    duplicates.append({"id": row.id, "canonical_article_id": owner_id, "duplicate_similarity": 1.0})
+                    logger.info(f"🔗 Article #{row.id} trùng URL với #{owner_id}: {row.url}")
+
+            stats["updated"] += len(updates)
+            stats["duplicates"] += len(duplicates)
+            if dry_run:
+                continue
+            if updates:
+                db.execute(update(models.Article), updates)
+            if duplicates:
+                db.execute(update(models.Article), duplicates)
+            db.commit()
+            logger.info(f"✅ Đã xử lý đến article #{last_id}: {stats}")
+    finally:
+        db.close()
+    return stats
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Backfill canonical_url cho bảng articles")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm, không ghi DB")
+    args = parser.parse_args()
+
+    logger.info(f"🚀 Backfill canonical_url - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("=" * 60)
+
+    # Tạo cột / index canonical_url nếu DB chưa có
+    init_db()
+    stats = backfill_canonical_urls(batch_size=args.batch_size, dry_run=args.dry_run)
+    logger.info(f"✅ Backfill hoàn tất{' (dry run)' if args.dry_run else ''}: {stats}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
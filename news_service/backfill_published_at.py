@@ -0,0 +1,84 @@
+import sys
+import time
+import argparse
+from datetime import datetime
+from sqlalchemy import update
+
+from app.database import SessionLocal, init_db
+from app.models import article_model as models
+from app.crud.article_crud import parse_published_at
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill_published_at(batch_size: int = 5000, retry_failed: bool = False, dry_run: bool = False) -> dict:
+    """
+    Đọc published_date_str thành published_at cho các bài chưa xử lý, theo lô id tăng dần.
+    Chuỗi tương đối ("2 giờ trước") được tính từ created_at - thời điểm bài được thu thập.
+    retry_failed=True đọc lại cả các bài đã failed (sau khi bổ sung định dạng mới vào parser).
+    """
+    statuses = [models.PUBLISHED_AT_FAILED] if retry_failed else []
+    stats = {"scanned": 0, "parsed": 0, "failed": 0, "missing": 0}
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            query = db.query(
+                models.Article.id, models.Article.published_date_str, models.Article.created_at
+            )
+            if statuses:
+                query = query.filter(
+                    models.Article.published_at_status.is_(None) |
+                    models.Article.published_at_status.in_(statuses)
+                )
+            else:
+                query = query.filter(models.Article.published_at_status.is_(None))
+            rows = query.filter(models.Article.id > last_id)\
+                        .order_by(models.Article.id)\
+                        .limit(batch_size)\
+                        .all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats["scanned"] += len(rows)
+
+            updates = []
+            for row in rows:
+                values = parse_published_at(row.published_date_str, row.created_at)
+                stats[values["published_at_status"]] += 1
+                updates.append({"id": row.id, **values})
+
+            if not dry_run:
+                db.execute(update(models.Article), updates)
+                db.commit()
+            logger.info(f"✅ Đã xử lý đến article #{last_id}: {stats}")
+    finally:
+        db.close()
+    elapsed = time.monotonic() - started
+    stats["rows_per_second"] = round(stats["scanned"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Backfill published_at cho bảng articles")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--retry-failed", action="store_true", help="Đọc lại các bài đã failed")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm, không ghi DB")
+    args = parser.parse_args()
+
+    logger.info(f"🚀 Backfill published_at - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("=" * 60)
+
+    # Tạo cột / index published_at nếu DB chưa có
+    init_db()
+    stats = backfill_published_at(
+        batch_size=args.batch_size, retry_failed=args.retry_failed, dry_run=args.dry_run
+    )
+    logger.info(f"✅ Backfill hoàn tất{' (dry run)' if args.dry_run else ''}: {stats}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
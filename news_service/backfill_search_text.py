@@ -0,0 +1,72 @@
+import sys
+import argparse
+from datetime import datetime
+from sqlalchemy import update
+
+from app.database import SessionLocal, init_db
+from app.models import article_model as models
+from app.models.ai_analysis_model import ArticleAIAnalysis
+from app.services.search_index import build_search_text
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill_search_text(batch_size: int = 2000, rebuild: bool = False, dry_run: bool = False) -> dict:
+    """
+    Điền search_text (tiêu đề + tóm tắt + tóm tắt AI đã bỏ dấu) cho các bài cũ theo lô id tăng dần.
+    tsvector (Postgres) / FTS5 (SQLite) tự cập nhật theo search_text.
+    rebuild=True tính lại cho mọi bài (sau khi đổi cách bỏ dấu).
+    """
+    stats = {"scanned": 0, "updated": 0}
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            query = db.query(
+                models.Article.id, models.Article.title, models.Article.summary, ArticleAIAnalysis.summary
+            ).outerjoin(ArticleAIAnalysis, ArticleAIAnalysis.article_id == models.Article.id)
+            if not rebuild:
+                query = query.filter(models.Article.search_text.is_(None))
+            rows = query.filter(models.Article.id > last_id)\
+                        .order_by(models.Article.id)\
+                        .limit(batch_size)\
+                        .all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            stats["scanned"] += len(rows)
+
+            updates = [
+                {"id": article_id, "search_text": build_search_text(title, summary, ai_summary)}
+                for article_id, title, summary, ai_summary in rows
+            ]
+            stats["updated"] += len(updates)
+            if not dry_run:
+                db.execute(update(models.Article), updates)
+                db.commit()
+            logger.info(f"✅ Đã xử lý đến article #{last_id}: {stats}")
+    finally:
+        db.close()
+    return stats
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Backfill search_text cho tìm kiếm articles")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--rebuild", action="store_true", help="Tính lại search_text cho mọi bài")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm, không ghi DB")
+    args = parser.parse_args()
+
+    logger.info(f"🚀 Backfill search_text - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("=" * 60)
+
+    # Tạo cột search_text và chỉ mục tìm kiếm nếu DB chưa có
+    init_db()
+    stats = backfill_search_text(batch_size=args.batch_size, rebuild=args.rebuild, dry_run=args.dry_run)
+    logger.info(f"✅ Backfill hoàn tất{' (dry run)' if args.dry_run else ''}: {stats}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""
+Benchmark thông lượng crawler trên fixture đã ghi, không truy cập trang tin thật.
+
+Đo hai đường:
+- scrape:   scrape_news_from_website trên từng trang (pages/sec, articles/sec, p95, heap Python đỉnh),
+            lặp ít nhất --repeat lượt và --min-seconds giây
+- pipeline: fetch_and_process_all_active_sources trên DB SQLite tạm
+            (lần đầu - DB trống, lần hai - nguồn đã crawl, đi qua nhánh 304/incremental),
+            chạy --pipeline-runs lần, mỗi lần trong một process mới với DB mới như CronJob scheduler;
+            kết quả là trung vị các lần chạy
+
+GC không bị tắt / freeze trong phần đo (production cũng trả chi phí này); thời gian GC
+và số lượt GC toàn phần trong phần đo được ghi lại (gc_ms, gc_full_collections) để phân biệt
+chậm đi do code với một lượt GC gen2 rơi vào một lần chạy ngắn.
+
+Gemini và RabbitMQ bị tắt trong harness để chỉ đo phần crawl + lưu DB.
+
+Cách dùng:
+    python benchmarks/record_fixtures.py              # ghi fixture một lần
+    python benchmarks/bench_crawl.py --repeat 5 --output bench.json
+    python benchmarks/bench_crawl.py --baseline bench.json --max-regression 20
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cấu hình phải có trước khi import app (các module đọc env lúc import)
+_BENCH_DIR = tempfile.mkdtemp(prefix="news-bench-")
+# Mỗi lần chạy pipeline dùng một DB SQLite mới, trừ khi NEWS_DATABASE_URL được chỉ định
+_FRESH_DB_PER_RUN = "NEWS_DATABASE_URL" not in os.environ
+os.environ.setdefault("NEWS_DATABASE_URL", f"sqlite:///{os.path.join(_BENCH_DIR, 'bench.db')}")
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ.setdefault("CRAWL_DUE_ONLY", "false")
+os.environ.setdefault("CRAWL_WORKER_ID", "bench")
+# Server cục bộ: không cần giới hạn lịch sự
+os.environ.setdefault("CRAWL_DOMAIN_LIMITS", "127.0.0.1=10000:10000")
+
+from record_fixtures import DEFAULT_FIXTURES_DIR  # noqa: E402
+from replay_server import ReplayServer  # noqa: E402
+
+# Các chỉ số dùng để so sánh với baseline: (đường, chỉ số, càng lớn càng tốt?)
+TRACKED_METRICS = (
+    ("scrape", "pages_per_sec", True),
+    ("scrape", "articles_per_sec", True),
+    ("scrape", "p95_page_ms", False),
+    ("scrape", "peak_python_heap_mb", False),
+    ("pipeline_cold", "pages_per_sec", True),
+    ("pipeline_cold", "articles_per_sec", True),
+    ("pipeline_warm", "pages_per_sec", True),
+)
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _peak_rss_mb() -> float:
+    # Linux trả về KB, macOS trả về byte
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class _GCPauses:
+    """Cộng thời gian các lượt GC xảy ra trong khối with (chỉ đo, không thay đổi GC)"""
+
+    def __enter__(self):
+        self.ms = 0.0
+        self.collections = 0
+        self.full_collections = 0
+        self._started = None
+        gc.callbacks.append(self._callback)
+        return self
+
+    def _callback(self, phase: str, info: dict):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            self.ms += (time.perf_counter() - self._started) * 1000
+            self.collections += 1
+            self.full_collections += info["generation"] == 2
+            self._started = None
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+
+    def stats(self) -> dict:
+        return {
+            "gc_ms": round(self.ms, 1),
+            "gc_collections": self.collections,
+            "gc_full_collections": self.full_collections,
+        }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return ""
+
+
+def _scrape_once(source: dict, max_articles: int, parser_backend):
+    from app.services.generic_crawler import scrape_news_from_website
+    return scrape_news_from_website(
+        page_url=source["url"],
+        article_container_selector=source["article_container_selector"],
+        title_selector=source["title_selector"],
+        link_selector=source["link_selector"],
+        summary_selector=source.get("summary_selector"),
+        date_selector=source.get("date_selector"),
+        source_name=source["name"],
+        max_articles=max_articles,
+        parser_backend=parser_backend
+    )
+
+
+def bench_scrape(sources, repeat: int, max_articles: int, parser_backend=None, min_seconds: float = 0.0) -> dict:
+    # Làm nóng: selector plan, session HTTP
+    for source in sources:
+        _scrape_once(source, max_articles, parser_backend)
+
+    # Đo bộ nhớ ở một lượt riêng vì tracemalloc làm chậm đáng kể
+    tracemalloc.start()
+    for source in sources:
+        _scrape_once(source, max_articles, parser_backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    articles = 0
+    rounds = 0
+    with _GCPauses() as gc_pauses:
+        started = time.perf_counter()
+        # Đủ dài để một lượt GC gen2 chỉ là một phần nhỏ của thời gian đo
+        while rounds < repeat or time.perf_counter() - started < min_seconds:
+            for source in sources:
+                page_started = time.perf_counter()
+                articles += len(_scrape_once(source, max_articles, parser_backend))
+                timings.append((time.perf_counter() - page_started) * 1000)
+            rounds += 1
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rounds": rounds,
+        "pages": len(timings),
+        "articles": articles,
+        "duration_seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(timings) / elapsed, 2),
+        "articles_per_sec": round(articles / elapsed, 2),
+        "mean_page_ms": round(statistics.mean(timings), 3),
+        "p50_page_ms": round(_percentile(timings, 0.50), 3),
+        "p95_page_ms": round(_percentile(timings, 0.95), 3),
+        # tracemalloc chỉ thấy heap Python, bộ nhớ C của lxml nằm trong peak_rss_mb
+        "peak_python_heap_mb": round(peak / (1024 * 1024), 2),
+        "peak_rss_mb": _peak_rss_mb(),
+        **gc_pauses.stats(),
+    }
+
+
+def seed_sources(sources):
+    from app.database import SessionLocal, init_db
+    from app.crud import crawl_source_crud
+    from app.schemas.crawl_source_schema import CrawlSourceCreate
+
+    init_db()
+    db = SessionLocal()
+    try:
+        for source in sources:
+            crawl_source_crud.create_crawl_source(db, CrawlSourceCreate(
+                name=source["name"],
+                url=source["url"],
+                article_container_selector=source["article_container_selector"],
+                title_selector=source["title_selector"],
+                link_selector=source["link_selector"],
+                summary_selector=source.get("summary_selector"),
+                date_selector=source.get("date_selector"),
+                is_active=True
+            ))
+    finally:
+        db.close()
+
+
+def disable_event_publishing():
+    """Không có RabbitMQ trong harness: publish thành no-op"""
+    from app.services.event_publisher import event_publisher
+
+    async def _noop(event_data: dict):
+        return True
+
+    async def _noop_batch(messages):
+        return [None] * len(messages)
+
+    event_publisher.publish_article_created = _noop
+    event_publisher.publish_batch = _noop_batch
+
+
+def bench_pipeline(pages: int) -> dict:
+    from scheduler_script import fetch_and_process_all_active_sources
+
+    rss_before = _peak_rss_mb()
+    with _GCPauses() as gc_pauses:
+        started = time.perf_counter()
+        stats = asyncio.run(fetch_and_process_all_active_sources())
+        elapsed = time.perf_counter() - started
+
+    return {
+        "pages": pages,
+        "articles_processed": stats.get("articles_processed", 0),
+        "articles_found": stats.get("articles_found", 0),
+        "duration_seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 2),
+        "articles_per_sec": round(stats.get("articles_found", 0) / elapsed, 2),
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_growth_mb": round(_peak_rss_mb() - rss_before, 1),
+        "sources_not_modified": stats.get("sources_not_modified", 0),
+        "sources_unchanged": stats.get("sources_unchanged", 0),
+        "sources_failed": stats.get("sources_failed", 0),
+        "bytes_downloaded": stats.get("bytes_downloaded", 0),
+        **gc_pauses.stats(),
+    }
+
+
+def run_pipeline_once(fixtures: str) -> dict:
+    """Một lần chạy pipeline (process con): server, DB và cache trong process đều mới"""
+    with ReplayServer(fixtures) as server:
+        sources = server.sources()
+        seed_sources(sources)
+        disable_event_publishing()
+        return {
+            "pipeline_cold": bench_pipeline(len(sources)),
+            "pipeline_warm": bench_pipeline(len(sources)),
+            "requests_served": server.requests_served,
+        }
+
+
+def _median_results(runs) -> dict:
+    """Trung vị từng chỉ số qua các lần chạy, kèm pages/sec của từng lần để thấy độ dao động"""
+    result = {}
+    for key, value in runs[0].items():
+        values = [run[key] for run in runs]
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            median = statistics.median(values)
+            result[key] = round(median, 3) if isinstance(median, float) else median
+        else:
+            result[key] = value
+    result["runs"] = len(runs)
+    result["pages_per_sec_runs"] = [run["pages_per_sec"] for run in runs]
+    return result
+
+
+def bench_pipeline_runs(fixtures: str, runs: int) -> dict:
+    """Chạy pipeline `runs` lần, mỗi lần một process con, trả về trung vị cho cold / warm"""
+    collected = {"pipeline_cold": [], "pipeline_warm": []}
+    requests_served = 0
+    for index in range(runs):
+        env = dict(os.environ)
+        if _FRESH_DB_PER_RUN:
+            env["NEWS_DATABASE_URL"] = f"sqlite:///{os.path.join(_BENCH_DIR, f'pipeline-{index}.db')}"
+        output = os.path.join(_BENCH_DIR, f"pipeline-{index}.json")
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--fixtures", fixtures, "--pipeline-child", output],
+            env=env, check=True, stdout=subprocess.DEVNULL
+        )
+        with open(output, encoding="utf-8") as f:
+            run = json.load(f)
+        for section in collected:
+            collected[section].append(run[section])
+        requests_served += run["requests_served"]
+    results = {section: _median_results(values) for section, values in collected.items()}
+    results["requests_served"] = requests_served
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, max_regression: float):
+    """Trả về danh sách chỉ số bị chậm đi quá max_regression phần trăm"""
+    regressions = []
+    for section, metric, higher_is_better in TRACKED_METRICS:
+        old = baseline.get(section, {}).get(metric)
+        new = results.get(section, {}).get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        results.setdefault("comparison", {})[f"{section}.{metric}"] = {
+            "baseline": old, "current": new, "change_pct": round(change, 1)
+        }
+        if worse > max_regression:
+            regressions.append(f"{section}.{metric}: {old} -> {new} ({change:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crawler trên fixture đã ghi")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=5, help="Số lượt scrape toàn bộ fixture tối thiểu")
+    parser.add_argument("--min-seconds", type=float, default=3.0, help="Thời gian đo scrape tối thiểu")
+    parser.add_argument("--pipeline-runs", type=int, default=5,
+                        help="Số lần chạy pipeline (mỗi lần một process mới), lấy trung vị")
+    parser.add_argument("--max-articles", type=int, default=50)
+    parser.add_argument("--parser-backend", default=None, help="lxml hoặc html.parser")
+    parser.add_argument("--skip-pipeline", action="store_true", help="Chỉ đo scrape_news_from_website")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file")
+    parser.add_argument("--baseline", help="File JSON của lần chạy trước để so sánh")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Phần trăm chậm đi tối đa so với baseline trước khi trả exit code 1")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    parser.add_argument("--pipeline-child", metavar="OUTPUT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.pipeline_child:
+        with open(args.pipeline_child, "w", encoding="utf-8") as f:
+            json.dump(run_pipeline_once(args.fixtures), f)
+        return
+
+    if not os.path.exists(os.path.join(args.fixtures, "manifest.json")):
+        print(f"❌ Không có fixture trong {args.fixtures}, chạy benchmarks/record_fixtures.py trước")
+        sys.exit(1)
+
+    from app.services.generic_crawler import CRAWL_STREAMING
+    from app.services.html_parser import CRAWL_PARSER_BACKEND
+
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "parser_backend": args.parser_backend or CRAWL_PARSER_BACKEND,
+            "streaming": CRAWL_STREAMING,
+            "max_articles": args.max_articles,
+            "repeat": args.repeat,
+            "min_seconds": args.min_seconds,
+            "pipeline_runs": args.pipeline_runs,
+        }
+    }
+
+    with ReplayServer(args.fixtures) as server:
+        sources = server.sources()
+        results["meta"]["fixtures"] = len(sources)
+
+        results["scrape"] = bench_scrape(
+            sources, args.repeat, args.max_articles, args.parser_backend, args.min_seconds
+        )
+        results["meta"]["requests_served"] = server.requests_served
+
+    if not args.skip_pipeline:
+        pipeline = bench_pipeline_runs(args.fixtures, max(1, args.pipeline_runs))
+        results["meta"]["requests_served"] += pipeline.pop("requests_served")
+        results.update(pipeline)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f), args.max_regression)
+        results["regressions"] = regressions
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        scrape = results["scrape"]
+        print(f"📊 {results['meta']['fixtures']} trang x {scrape['rounds']} lượt ({results['meta']['parser_backend']})")
+        print(
+            f"   scrape        {scrape['pages_per_sec']:>8.2f} pages/s  {scrape['articles_per_sec']:>9.2f} articles/s  "
+            f"p95={scrape['p95_page_ms']:.2f}ms  heap={scrape['peak_python_heap_mb']}MB  rss={scrape['peak_rss_mb']}MB  "
+            f"gc={scrape['gc_ms']}ms"
+        )
+        for section in ("pipeline_cold", "pipeline_warm"):
+            if section in results:
+                r = results[section]
+                print(
+                    f"   {section:<13} {r['pages_per_sec']:>8.2f} pages/s  {r['articles_per_sec']:>9.2f} articles/s  "
+                    f"processed={r['articles_processed']}  304={r['sources_not_modified']}  rss={r['peak_rss_mb']}MB  "
+                    f"gc={r['gc_ms']}ms  (trung vị {r['runs']} lần: {r['pages_per_sec_runs']})"
+                )
+        for line in regressions:
+            print(f"   ⚠️ Chậm đi: {line}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
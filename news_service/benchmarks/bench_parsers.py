@@ -0,0 +1,99 @@
+"""
+Micro-benchmark so sánh các parser backend trên các trang danh sách đã lưu.
+
+Cách dùng:
+    python benchmarks/bench_parsers.py --pages benchmarks/pages --repeat 20
+    python benchmarks/bench_parsers.py --pages saved/cafef.html --container ".tlitem" --title "h3 a" --link "h3 a"
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.html_parser import available_backends, get_selector_plan
+
+
+def load_pages(path: str):
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.html")))
+    else:
+        files = [path]
+    pages = []
+    for file_path in files:
+        with open(file_path, "rb") as f:
+            pages.append((os.path.basename(file_path), f.read()))
+    return pages
+
+
+def bench_backend(backend_name: str, pages, selectors, repeat: int, max_articles: int):
+    plan = get_selector_plan(*selectors, backend_name=backend_name)
+    timings = []
+    containers_found = 0
+    for _ in range(repeat):
+        for _, content in pages:
+            started = time.perf_counter()
+            root = plan.parse(content)
+            containers = plan.containers(root)
+            for container in containers[:max_articles]:
+                plan.extract(container)
+            timings.append((time.perf_counter() - started) * 1000)
+            containers_found = max(containers_found, len(containers))
+    timings.sort()
+    return {
+        "backend": backend_name,
+        "pages": len(pages),
+        "runs": len(timings),
+        "max_containers": containers_found,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh tốc độ các parser backend")
+    parser.add_argument("--pages", default=os.path.join(os.path.dirname(__file__), "pages"),
+                        help="File .html hoặc thư mục chứa các trang đã lưu")
+    parser.add_argument("--container", default=".item-news")
+    parser.add_argument("--title", default="h3 a, h2 a")
+    parser.add_argument("--link", default="h3 a, h2 a")
+    parser.add_argument("--summary", default=".description")
+    parser.add_argument("--date", default=".time")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-articles", type=int, default=1000,
+                        help="Số container được trích xuất mỗi trang")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    if not pages:
+        print(f"❌ Không tìm thấy trang .html nào trong {args.pages}")
+        sys.exit(1)
+
+    selectors = (args.container, args.title, args.link, args.summary or None, args.date or None)
+    results = [
+        bench_backend(name, pages, selectors, args.repeat, args.max_articles)
+        for name in available_backends()
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = next((r for r in results if r["backend"] == "html.parser"), results[0])
+    print(f"📊 {len(pages)} trang x {args.repeat} lần")
+    for r in results:
+        speedup = baseline["median_ms"] / r["median_ms"] if r["median_ms"] else 0
+        print(
+            f"   {r['backend']:<12} median={r['median_ms']:>8.3f}ms  p95={r['p95_ms']:>8.3f}ms  "
+            f"containers={r['max_containers']:<4} x{speedup:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Ghi lại trang danh sách của các nguồn mẫu (setup_sample_sources.SAMPLE_SOURCES) ra đĩa
+để benchmark crawler mà không cần truy cập trang tin thật.
+
+Cách dùng:
+    python benchmarks/record_fixtures.py
+    python benchmarks/record_fixtures.py --output benchmarks/fixtures --delay 2
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from setup_sample_sources import SAMPLE_SOURCES
+from app.services.http_client import http_client
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST_NAME = "manifest.json"
+SELECTOR_FIELDS = (
+    "article_container_selector",
+    "title_selector",
+    "link_selector",
+    "summary_selector",
+    "date_selector",
+)
+
+
+def fixture_file_name(url: str) -> str:
+    """vnexpress.net/chu-de/gia-vang-1403 -> vnexpress.net_chu-de_gia-vang-1403.html"""
+    parsed = urlparse(url)
+    slug = re.sub(r"[^A-Za-z0-9.-]+", "_", f"{parsed.netloc}{parsed.path}").strip("_")
+    return f"{slug or 'index'}.html"
+
+
+def load_manifest(fixtures_dir: str):
+    with open(os.path.join(fixtures_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(fixtures_dir: str, delay: float):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    manifest = []
+    seen_urls = set()
+
+    for source in SAMPLE_SOURCES:
+        # Danh sách mẫu có nguồn trùng URL, chỉ ghi một lần
+        if source["url"] in seen_urls:
+            continue
+        seen_urls.add(source["url"])
+
+        file_name = fixture_file_name(source["url"])
+        try:
+            response = http_client.get(source["url"])
+            response.raise_for_status()
+        except Exception as e:
+            print(f"   ❌ {source['name']}: {e}")
+            continue
+
+        with open(os.path.join(fixtures_dir, file_name), "wb") as f:
+            f.write(response.content)
+
+        manifest.append({
+            "name": source["name"],
+            "url": source["url"],
+            "file": file_name,
+            "content_type": response.headers.get("Content-Type", "text/html; charset=utf-8"),
+            "bytes": len(response.content),
+            "recorded_at": datetime.utcnow().isoformat(),
+            **{field: source.get(field) for field in SELECTOR_FIELDS},
+        })
+        print(f"   ✅ {source['name']}: {len(response.content)} bytes -> {file_name}")
+        time.sleep(delay)  # Ghi fixture thủ công, không cần vội
+
+    with open(os.path.join(fixtures_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ghi lại trang danh sách của các nguồn mẫu")
+    parser.add_argument("--output", default=DEFAULT_FIXTURES_DIR, help="Thư mục lưu fixture")
+    parser.add_argument("--delay", type=float, default=1.0, help="Số giây nghỉ giữa hai request")
+    args = parser.parse_args()
+
+    print(f"📼 Ghi fixture vào {args.output}")
+    manifest = record(args.output, args.delay)
+    if not manifest:
+        print("❌ Không ghi được trang nào")
+        sys.exit(1)
+    print(f"🎉 Đã ghi {len(manifest)} trang")
+
+
+if __name__ == "__main__":
+    main()
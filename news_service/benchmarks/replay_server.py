@@ -0,0 +1,130 @@
+"""
+HTTP server cục bộ phát lại các fixture đã ghi bằng record_fixtures.py.
+Hỗ trợ keep-alive và ETag/If-None-Match để lần crawl lặp lại đi qua nhánh 304 như trang thật.
+
+Cách dùng:
+    python benchmarks/replay_server.py --port 8765
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+from record_fixtures import DEFAULT_FIXTURES_DIR, load_manifest
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Crawler stream dừng sớm sẽ đóng kết nối giữa chừng - không phải lỗi
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class ReplayServer:
+    """Phục vụ fixture tại /<file>, chạy trong thread nền"""
+
+    def __init__(self, fixtures_dir: str = DEFAULT_FIXTURES_DIR, host: str = "127.0.0.1", port: int = 0):
+        self.fixtures_dir = fixtures_dir
+        self.manifest = load_manifest(fixtures_dir)
+        self._pages: Dict[str, Tuple[bytes, str, str]] = {}
+        for entry in self.manifest:
+            with open(os.path.join(fixtures_dir, entry["file"]), "rb") as f:
+                body = f.read()
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            self._pages["/" + entry["file"]] = (body, entry.get("content_type") or "text/html", etag)
+
+        self.requests_served = 0
+        self.not_modified_served = 0
+        self._httpd = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, entry: dict) -> str:
+        return f"{self.base_url}/{entry['file']}"
+
+    def sources(self) -> List[dict]:
+        """Manifest với url đã trỏ về server cục bộ"""
+        return [{**entry, "url": self.url_for(entry)} for entry in self.manifest]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Cho phép client tái sử dụng kết nối
+
+            def do_GET(self):
+                page = server._pages.get(self.path.split("?", 1)[0])
+                server.requests_served += 1
+                if page is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body, content_type, etag = page
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified_served += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phát lại fixture trang danh sách qua HTTP")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ReplayServer(args.fixtures, args.host, args.port)
+    print(f"📼 Phát lại {len(server.manifest)} trang tại {server.base_url}")
+    for source in server.sources():
+        print(f"   {source['name']}: {source['url']}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.database import init_db
 from app.endpoints import article_endpoints, ai_analysis_endpoints, crawl_source_endpoints, scheduler_endpoints
 from app.services.event_publisher import event_publisher
+from app.services.analysis_worker import analysis_worker_pool, ANALYSIS_WORKERS_IN_APP
+from app.services.outbox_relay import outbox_relay, OUTBOX_RELAY_IN_APP
 
 app = FastAPI(
     title="News Service",
@@ -20,10 +23,20 @@ async def on_startup():
         print("✅ Connected to RabbitMQ for event publishing")
     except Exception as e:
         print(f"⚠️ Failed to connect to RabbitMQ: {e}")
+    
+    # Phân tích AI chạy nền, không chặn việc lưu bài
+    if ANALYSIS_WORKERS_IN_APP:
+        await analysis_worker_pool.start()
+    
+    # Gửi event từ bảng event_outbox sang RabbitMQ
+    if OUTBOX_RELAY_IN_APP:
+        await outbox_relay.start()
 
 @app.on_event("shutdown")
 async def on_shutdown():
     print("👋 Shutting down News Service...")
+    await analysis_worker_pool.stop()
+    await outbox_relay.stop()
     await event_publisher.close()
 
 # Thêm các router
@@ -37,6 +50,11 @@ def health_check():
     """Kiểm tra sức khỏe của service"""
     return {"status": "ok", "service": "News Service"}
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Metrics cho Prometheus"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 from fastapi.middleware.cors import CORSMiddleware
 
 app.add_middleware(
@@ -45,4 +63,6 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Cho frontend (Flutter web) đọc cursor trang sau của các endpoint danh sách
+    expose_headers=["X-Next-Cursor"],
 )
\ No newline at end of file
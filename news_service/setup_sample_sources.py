@@ -4,99 +4,100 @@ from app.database import SessionLocal, init_db
 from app.crud import crawl_source_crud as crud
 from app.schemas import crawl_source_schema as schemas
 
+# Dùng chung với benchmarks/record_fixtures.py để ghi lại trang danh sách của các nguồn mẫu
+SAMPLE_SOURCES = [
+    {
+    "name": "VnExpress - Doanh nghiệp",
+    "url": "https://vnexpress.net/kinh-doanh/doanh-nghiep",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Chính trị",
+    "url": "https://vnexpress.net/thoi-su/chinh-tri",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Luật doanh nghiệp",
+    "url": "https://vnexpress.net/chu-de/luat-doanh-nghiep-7163",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Kinh doanh",
+    "url": "https://vnexpress.net/kinh-doanh",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Giá vàng",
+    "url": "https://vnexpress.net/chu-de/gia-vang-1403",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Giá USD",
+    "url": "https://vnexpress.net/tag/gia-usd-267904",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Kinh doanh",
+    "url": "https://vnexpress.net/kinh-doanh",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+    {
+    "name": "VnExpress - Khoa học công nghệ",
+    "url": "https://vnexpress.net/khoa-hoc-cong-nghe",
+    "article_container_selector": ".item-news",
+    "title_selector": "h3 a, h2 a",
+    "link_selector": "h3 a, h2 a",
+    "summary_selector": ".description",
+    "date_selector": ".time",
+    "is_active": True
+    },
+]
+
 def setup_sample_sources():
     """Setup initial crawl sources for news service"""
     
-    sample_sources = [
-        {
-        "name": "VnExpress - Doanh nghiệp",
-        "url": "https://vnexpress.net/kinh-doanh/doanh-nghiep",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Chính trị",
-        "url": "https://vnexpress.net/thoi-su/chinh-tri",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Luật doanh nghiệp",
-        "url": "https://vnexpress.net/chu-de/luat-doanh-nghiep-7163",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Kinh doanh",
-        "url": "https://vnexpress.net/kinh-doanh",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Giá vàng",
-        "url": "https://vnexpress.net/chu-de/gia-vang-1403",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Giá USD",
-        "url": "https://vnexpress.net/tag/gia-usd-267904",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Kinh doanh",
-        "url": "https://vnexpress.net/kinh-doanh",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-        {
-        "name": "VnExpress - Khoa học công nghệ",
-        "url": "https://vnexpress.net/khoa-hoc-cong-nghe",
-        "article_container_selector": ".item-news",
-        "title_selector": "h3 a, h2 a",
-        "link_selector": "h3 a, h2 a",
-        "summary_selector": ".description",
-        "date_selector": ".time",
-        "is_active": True
-        },
-    ]
-    
     db = SessionLocal()
     added_sources = []
     
     try:
         print("📰 NEWS SERVICE: Setting up crawl sources...")
         
-        for source_data in sample_sources:
+        for source_data in SAMPLE_SOURCES:
             try:
                 # Check if source already exists
                 existing_sources = crud.get_crawl_sources(db, limit=1000)
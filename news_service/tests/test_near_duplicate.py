@@ -0,0 +1,35 @@
+from app.services.near_duplicate import NearDuplicateIndex, title_numbers
+
+GOLD_14 = (
+    "Giá vàng hôm nay 14/7: SJC tăng 500.000 đồng mỗi lượng",
+    "Sáng 14/7, giá vàng miếng SJC được các doanh nghiệp niêm yết tăng 500.000 đồng mỗi lượng "
+    "so với phiên trước, vàng nhẫn cũng tăng theo xu hướng thế giới.",
+)
+GOLD_15 = (
+    "Giá vàng hôm nay 15/7: SJC giảm 300.000 đồng mỗi lượng",
+    "Sáng 15/7, giá vàng miếng SJC được các doanh nghiệp niêm yết giảm 300.000 đồng mỗi lượng "
+    "so với phiên trước, vàng nhẫn cũng giảm theo xu hướng thế giới.",
+)
+
+
+def _index_with(article_id, title, summary, threshold=None):
+    index = NearDuplicateIndex(threshold=threshold)
+    index.add(article_id, index.signature_for(title, summary), numbers=title_numbers(title))
+    return index
+
+
+def test_next_day_templated_price_story_is_not_linked():
+    title, summary = GOLD_15
+    # Kể cả với ngưỡng thấp (mặc định cũ), số trong tiêu đề khác nhau thì không liên kết
+    for threshold in (None, 0.5):
+        index = _index_with(1, *GOLD_14, threshold=threshold)
+        signature = index.signature_for(title, summary)
+        assert index.find(signature, exclude_id=2, numbers=title_numbers(title)) is None
+
+
+def test_republished_story_is_linked():
+    index = _index_with(1, *GOLD_14)
+    title = "Giá vàng hôm nay 14/7: SJC tăng 500.000 đồng mỗi lượng"
+    summary = GOLD_14[1] + " (Theo VnExpress)"
+    match = index.find(index.signature_for(title, summary), exclude_id=2, numbers=title_numbers(title))
+    assert match is not None and match[0] == 1